@@ -1,34 +1,171 @@
 import logging
 import random
-from langchain_ollama.llms import OllamaLLM
-import streamlit as st
-from langchain_core.prompts import PromptTemplate
+import threading
+import urllib.request
+from config import get_setting
+from circuit_breaker import CircuitBreaker
+from errors import CircuitOpenError
+from llm_router import DEFAULT_HEDGE_PERCENTILE, ModelRouter, Route
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_OLLAMA_BASE_URL = "http://localhost:11434"
+
+
+DEFAULT_OLLAMA_MODEL = "llama3.2:1b"
+
+# Tasks routed to their own model ([llm] <task>_model, default ollama_model)
+LLM_TASKS = ("quote", "analysis")
+
+# Seconds a caller waits for each task before using its fallback text ([llm] <task>_deadline)
+DEFAULT_DEADLINES = {"quote": 15.0, "analysis": 60.0}
+# Upper bound on a single HTTP request to Ollama, so abandoned calls free their thread
+DEFAULT_REQUEST_TIMEOUT = 120.0
+# Consecutive failed calls that open the breaker, and seconds between recovery probes
+DEFAULT_BREAKER_THRESHOLD = 3
+DEFAULT_BREAKER_RESET = 30.0
+
+# Returned when the LLM is unavailable or too slow
+FALLBACK_QUOTES = [
+    '"The only journey is the one within." - Rainer Maria Rilke',
+    '"Know thyself." - Socrates',
+    '"Self-awareness is the key to self-mastery." - Gretchen Rubin',
+    '"Reflection is the lamp of the heart." - Al-Ghazali'
+]
+FALLBACK_INSIGHT = ("I'm currently unable to provide insights, but I appreciate you sharing your thoughts. "
+                    "Consider reflecting on what you've written and be kind to yourself. 🌱")
+
+
+def _ollama_llm(model):
+    # Imported here: langchain is slow to import and only needed for LLM calls
+    from langchain_ollama.llms import OllamaLLM
+    return OllamaLLM(
+        model=model,
+        base_url=get_setting("llm", "ollama_base_url", DEFAULT_OLLAMA_BASE_URL),
+        client_kwargs={"timeout": float(get_setting("llm", "request_timeout", DEFAULT_REQUEST_TIMEOUT))},
+    )
+
+
+def _ollama_probe():
+    # Cheap liveness check: no model is loaded or run
+    base_url = get_setting("llm", "ollama_base_url", DEFAULT_OLLAMA_BASE_URL).rstrip("/")
+    with urllib.request.urlopen(f"{base_url}/api/version", timeout=5) as response:
+        response.read()
+
+
+def _fake_llm(model):
+    from fake_llm import FakeLLM, DEFAULT_LATENCY, DEFAULT_TOKENS_PER_SECOND
+    return FakeLLM(
+        latency=float(get_setting("llm", "fake_latency", DEFAULT_LATENCY)),
+        tokens_per_second=float(get_setting("llm", "fake_tokens_per_second", DEFAULT_TOKENS_PER_SECOND)),
+        failure_rate=float(get_setting("llm", "fake_failure_rate", 0.0)),
+        seed=int(get_setting("llm", "fake_seed", 0)),
+        model=model,
+        slow_rate=float(get_setting("llm", "fake_slow_rate", 0.0)),
+        slow_latency=float(get_setting("llm", "fake_slow_latency", 0.0)),
+    )
+
+
+# Provider name -> factory taking a model name and returning an object with ``invoke(prompt) -> str``
+LLM_PROVIDERS = {
+    "ollama": _ollama_llm,
+    "fake": _fake_llm,
+}
+
+# Provider name -> health check run in the background while its breaker is open.
+# Providers without one get a single trial request after the reset timeout instead.
+LLM_PROBES = {
+    "ollama": _ollama_probe,
+}
+
+
+def routes_from_settings():
+    """Per-task routes from the ``[llm]`` settings.
+
+    ``<task>_model`` defaults to ``ollama_model``; ``<task>_fallback_model``
+    enables hedging after the model's p95 latency (``hedge_percentile``) or
+    ``<task>_latency_budget`` seconds, whichever is lower. Callers give up
+    after ``<task>_deadline`` seconds.
+    """
+    default_model = get_setting("llm", "ollama_model", DEFAULT_OLLAMA_MODEL)
+    percentile = float(get_setting("llm", "hedge_percentile", DEFAULT_HEDGE_PERCENTILE))
+    routes = {}
+    for task in LLM_TASKS:
+        budget = get_setting("llm", f"{task}_latency_budget")
+        routes[task] = Route(
+            model=get_setting("llm", f"{task}_model", default_model),
+            fallback=get_setting("llm", f"{task}_fallback_model"),
+            latency_budget=float(budget) if budget is not None else None,
+            hedge_percentile=percentile,
+            deadline=float(get_setting("llm", f"{task}_deadline", DEFAULT_DEADLINES[task])),
+        )
+    return routes
+
+
+_routers: dict = {}
+_routers_lock = threading.Lock()
+
+
+def breaker_from_settings(provider: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        provider,
+        failure_threshold=int(get_setting("llm", "breaker_failure_threshold", DEFAULT_BREAKER_THRESHOLD)),
+        reset_timeout=float(get_setting("llm", "breaker_reset_timeout", DEFAULT_BREAKER_RESET)),
+        probe=LLM_PROBES.get(provider),
+    )
+
+
+def get_router(provider: str) -> ModelRouter:
+    """Process-wide router for ``provider``, so latency history and the
+    circuit breaker are shared by all sessions."""
+    with _routers_lock:
+        router = _routers.get(provider)
+        if router is None:
+            router = _routers[provider] = ModelRouter(LLM_PROVIDERS[provider], routes_from_settings(),
+                                                      breaker=breaker_from_settings(provider))
+        return router
+
+
+def llm_status() -> dict:
+    """Routing stats and breaker state of each provider in use, for monitoring."""
+    with _routers_lock:
+        routers = dict(_routers)
+    return {provider: router.snapshot() for provider, router in routers.items()}
+
+
+def reset_routers():
+    """Forget the process-wide routers so changed settings take effect."""
+    with _routers_lock:
+        _routers.clear()
+
+
 class AIService:
-    def __init__(self, provider="ollama"):
+    def __init__(self, provider=None, llm=None):
         try:
-            self.provider = provider
-            # Get settings from .streamlit/secrets.toml
-            llm_secrets = st.secrets.get("llm", {})
-            ollama_model = llm_secrets.get("ollama_model", "llama3.2:1b")
-            
-            if provider == "ollama":
-                self.llm = OllamaLLM(
-                    model=ollama_model,
-                    base_url="http://localhost:11434",
-                )
-            logger.info(f"AI Service initialized successfully with {provider}")
+            # Settings come from .streamlit/secrets.toml (or REFLECTIONS_LLM_* env vars)
+            self.provider = provider or get_setting("llm", "default_provider", "ollama")
+            if llm is not None:
+                # A fixed LLM for every task, without hedging (used by tests)
+                self.router = ModelRouter(lambda model: llm, {task: Route(model="custom") for task in LLM_TASKS})
+            elif self.provider in LLM_PROVIDERS:
+                self.router = get_router(self.provider)
+            else:
+                raise ValueError(f"Unknown LLM provider '{self.provider}'. "
+                                 f"Choose from: {', '.join(sorted(LLM_PROVIDERS))}")
+            # The analysis model, built eagerly so configuration errors surface here
+            self.llm = self.router.llm(self.router.routes["analysis"].model)
+            logger.info(f"AI Service initialized successfully with {self.provider}")
         except Exception as e:
             logger.error(f"Error initializing AI service: {str(e)}")
+            self.router = None
             self.llm = None
 
     def generate_daily_quote(self):
         try:
-            if not self.llm:
+            if not self.router:
                 raise Exception("LLM not initialized")
 
+            from langchain_core.prompts import PromptTemplate
             prompt = PromptTemplate(
                 input_variables=[],
                 template="""Generate an inspiring and thoughtful quote about self-reflection, mindfulness, or personal growth. 
@@ -36,24 +173,22 @@ class AIService:
                 Format: "Quote" - Author"""
             )
             
-            response = self.llm.invoke(prompt.format())
-            return response.strip()  # String from Ollama
+            response = self.router.invoke("quote", prompt.format())
+            return response.strip()  # String from the LLM
             
+        except CircuitOpenError as e:
+            logger.info(f"Using a fallback quote: {str(e)}")
+            return random.choice(FALLBACK_QUOTES)
         except Exception as e:
             logger.error(f"Error generating quote: {str(e)}")
-            fallback_quotes = [
-                '"The only journey is the one within." - Rainer Maria Rilke',
-                '"Know thyself." - Socrates',
-                '"Self-awareness is the key to self-mastery." - Gretchen Rubin',
-                '"Reflection is the lamp of the heart." - Al-Ghazali'
-            ]
-            return random.choice(fallback_quotes)
+            return random.choice(FALLBACK_QUOTES)
 
     def analyze_entry(self, content, mood, mood_factors):
         try:
-            if not self.llm:
+            if not self.router:
                 raise Exception("LLM not initialized")
 
+            from langchain_core.prompts import PromptTemplate
             prompt = PromptTemplate(
                 input_variables=["content", "mood", "factors"],
                 template="""Act as an empathetic therapist or personal development coach. 
@@ -69,15 +204,19 @@ class AIService:
                 🤔 [Your therapeutic insight and suggestion here]"""
             )
             
-            response = self.llm.invoke(
+            response = self.router.invoke(
+                "analysis",
                 prompt.format(
                     content=content,
                     mood=mood,
                     factors=mood_factors if mood_factors else "None specified"
                 )
             )
-            return response.strip()  # String from Ollama
+            return response.strip()  # String from the LLM
             
+        except CircuitOpenError as e:
+            logger.info(f"Using the fallback insight: {str(e)}")
+            return FALLBACK_INSIGHT
         except Exception as e:
             logger.error(f"Error analyzing entry: {str(e)}")
-            return "I'm currently unable to provide insights, but I appreciate you sharing your thoughts. Consider reflecting on what you've written and be kind to yourself. 🌱"
\ No newline at end of file
+            return FALLBACK_INSIGHT
\ No newline at end of file
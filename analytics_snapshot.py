@@ -0,0 +1,337 @@
+"""Memory-mapped columnar snapshot of the analytic columns, for the Insights page.
+
+The snapshot holds ``id, date, mood, sentiment, mood_factors`` of every entry
+as Arrow IPC segment files next to the journal. Loading memory-maps the
+segments, so the numeric columns reach pandas without being copied or
+decrypted again. Triggers on ``entries`` record changed ids in
+``entry_changes``; each refresh appends a segment with just those rows (and
+tombstones for deleted ones) rather than rereading the journal.
+
+The snapshot is NOT encrypted: it reveals entry dates, moods, sentiment and
+mood factors (never the text). It is therefore opt-in, via
+``[analytics] snapshot = true`` or ``REFLECTIONS_ANALYTICS_SNAPSHOT=1``.
+"""
+import os
+import json
+import hashlib
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+from config import get_setting
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+# Segments are merged into one once there are more than this
+MAX_SEGMENTS = 16
+# Rows read from SQLite per batch when building from scratch
+BUILD_BATCH = 100_000
+# Changed ids looked up per query (SQLite's default variable limit is 999)
+LOOKUP_BATCH = 500
+
+COLUMNS = ("id", "date", "mood", "sentiment", "mood_factors")
+
+CHANGELOG_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS entry_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        entry_id INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS entry_changes_insert AFTER INSERT ON entries
+    BEGIN INSERT INTO entry_changes (entry_id) VALUES (NEW.id); END
+    """,
+    # Text-only updates (e.g. recompression) don't touch the snapshot
+    """
+    CREATE TRIGGER IF NOT EXISTS entry_changes_update
+    AFTER UPDATE OF date, mood, sentiment, mood_factors ON entries
+    BEGIN INSERT INTO entry_changes (entry_id) VALUES (NEW.id); END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS entry_changes_delete AFTER DELETE ON entries
+    BEGIN INSERT INTO entry_changes (entry_id) VALUES (OLD.id); END
+    """,
+]
+
+
+def snapshot_enabled() -> bool:
+    return str(get_setting("analytics", "snapshot", "false")).lower() in ("1", "true", "yes", "on")
+
+
+def snapshot_dir(db_path: str) -> str:
+    """Directory of the snapshot of the journal at ``db_path``."""
+    root = os.getenv("REFLECTIONS_SNAPSHOT_DIR") or os.path.join(os.getcwd(), 'data', 'snapshots')
+    db_path = os.path.abspath(db_path)
+    name = os.path.splitext(os.path.basename(db_path))[0]
+    return os.path.join(root, f"{name}-{hashlib.sha256(db_path.encode()).hexdigest()[:12]}")
+
+
+def ensure_changelog(conn) -> bool:
+    """Create ``entry_changes`` and its triggers; True if they were missing.
+
+    Changes made while the triggers were missing are unknown, so a snapshot
+    taken before then must be rebuilt.
+    """
+    existing = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'entry_changes_%'"
+    ).fetchone()[0]
+    for statement in CHANGELOG_SQL:
+        conn.execute(statement)
+    conn.commit()
+    return existing < 3
+
+
+def drop_changelog(conn) -> bool:
+    """Remove ``entry_changes`` and its triggers; True if there were any."""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'entry_changes'").fetchone() is None:
+        return False
+    for name in ("insert", "update", "delete"):
+        conn.execute(f"DROP TRIGGER IF EXISTS entry_changes_{name}")
+    conn.execute("DROP TABLE entry_changes")
+    conn.commit()
+    return True
+
+
+def _arrow():
+    # Imported here: pyarrow is slow to import and only needed with snapshots on
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.ipc
+    return pyarrow
+
+
+def _schema():
+    pa = _arrow()
+    return pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.timestamp("us")),
+        ("mood", pa.int8()),
+        ("sentiment", pa.float64()),
+        # Few distinct factor combinations: dictionary-encode them
+        ("mood_factors", pa.dictionary(pa.int32(), pa.string())),
+        ("deleted", pa.bool_()),
+    ])
+
+
+def _batch(rows, deleted_ids=()):
+    """Arrow table for ``rows`` (id, date, mood, sentiment, mood_factors) plus tombstones."""
+    import pandas as pd
+    pa = _arrow()
+    live = pd.DataFrame.from_records(rows, columns=list(COLUMNS))
+    live["date"] = pd.to_datetime(live["date"], format="ISO8601", errors="coerce")
+    live["deleted"] = False
+    frame = pd.concat([live, pd.DataFrame({"id": list(deleted_ids), "deleted": True})], ignore_index=True) \
+        if deleted_ids else live
+    return pa.Table.from_pandas(frame, schema=_schema(), preserve_index=False)
+
+
+@contextmanager
+def _file_lock(directory):
+    """Serializes refreshes by processes sharing a snapshot (POSIX only)."""
+    with open(os.path.join(directory, ".lock"), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield  # closing the file releases the lock
+
+
+class AnalyticsSnapshot:
+    """Snapshot of one journal; use :func:`get_snapshot` to share it per process.
+
+    Lock order: the snapshot lock, then the refresh file lock, then the
+    journal's connection lease (``db.connection()``). Never call
+    :meth:`reset`, :meth:`remove`, :meth:`refresh` or :meth:`load` while
+    holding a lease on the journal.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        # Last loaded frame, valid while the manifest's seq is unchanged
+        self._frame = None
+        self._frame_seq = None
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, "manifest.json")
+
+    def _manifest(self) -> dict | None:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get("format") == FORMAT_VERSION else None
+
+    def _write_manifest(self, manifest: dict):
+        tmp = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self.manifest_path)
+
+    def _write_segment(self, name: str, tables) -> int:
+        pa = _arrow()
+        # An IPC file allows one dictionary per column, so merge the factor dictionaries
+        table = pa.concat_tables(list(tables) or [_batch([])]).unify_dictionaries().combine_chunks()
+        path = os.path.join(self.directory, name)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, _schema()) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+        return table.num_rows
+
+    def _remove_unlisted(self, manifest: dict):
+        listed = set(manifest["segments"]) | {"manifest.json", ".lock"}
+        for name in os.listdir(self.directory):
+            if name not in listed:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:  # still mapped on Windows; removed next time
+                    pass
+
+    def reset(self):
+        """Forget the snapshot; the next refresh rebuilds it."""
+        with self._lock:
+            try:
+                os.remove(self.manifest_path)
+            except FileNotFoundError:
+                pass
+            self._frame = self._frame_seq = None
+
+    def remove(self):
+        """Delete the snapshot files."""
+        with self._lock:
+            self._frame = self._frame_seq = None
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def refresh(self, db) -> dict:
+        """Bring the snapshot up to date with ``db`` (a :class:`~database.ReflectionDB`).
+
+        Builds it from scratch the first time, then appends one segment per
+        refresh with the rows changed since. Returns the manifest.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, _file_lock(self.directory):
+            manifest = self._manifest()
+            with db.connection() as conn:
+                row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'entry_changes'").fetchone()
+                seq = row[0] if row else 0
+                if manifest is not None and seq < manifest["seq"]:
+                    # The journal was replaced (e.g. restored from a backup)
+                    logger.info("Analytics snapshot is ahead of the journal; rebuilding")
+                    manifest = None
+                if manifest is None:
+                    manifest = self._build(conn, seq)
+                elif seq > manifest["seq"]:
+                    oldest = conn.execute("SELECT MIN(seq) FROM entry_changes").fetchone()[0]
+                    if oldest is None or oldest > manifest["seq"] + 1:
+                        # Changes were pruned by another snapshot of this journal
+                        logger.info("Analytics snapshot missed changes; rebuilding")
+                        manifest = self._build(conn, seq)
+                    else:
+                        manifest = self._append(conn, manifest, seq)
+                else:
+                    return manifest
+            if len(manifest["segments"]) > MAX_SEGMENTS:
+                manifest = self._compact(manifest)
+            self._write_manifest(manifest)
+            self._remove_unlisted(manifest)
+        # Changes up to seq are in the snapshot now
+        db.submit_write(lambda conn: conn.execute("DELETE FROM entry_changes WHERE seq <= ?", (seq,)).rowcount)
+        return manifest
+
+    def _build(self, conn, seq: int) -> dict:
+        cursor = conn.execute("SELECT id, date, mood, sentiment, mood_factors FROM entries ORDER BY id")
+
+        def batches():
+            while True:
+                rows = cursor.fetchmany(BUILD_BATCH)
+                if not rows:
+                    return
+                yield _batch(rows)
+
+        name = f"seg-{seq:012d}.arrow"
+        rows = self._write_segment(name, batches())
+        max_id = conn.execute("SELECT MAX(id) FROM entries").fetchone()[0] or 0
+        logger.info(f"Built analytics snapshot of {rows} entries")
+        return {"format": FORMAT_VERSION, "seq": seq, "max_id": max_id, "dedup": False,
+                "segments": [name], "rows": rows}
+
+    def _append(self, conn, manifest: dict, seq: int) -> dict:
+        changed = [row[0] for row in conn.execute(
+            "SELECT DISTINCT entry_id FROM entry_changes WHERE seq > ? AND seq <= ? ORDER BY entry_id",
+            (manifest["seq"], seq))]
+        rows = []
+        for start in range(0, len(changed), LOOKUP_BATCH):
+            chunk = changed[start:start + LOOKUP_BATCH]
+            rows += conn.execute(
+                f"SELECT id, date, mood, sentiment, mood_factors FROM entries "
+                f"WHERE id IN ({', '.join('?' * len(chunk))}) ORDER BY id", chunk).fetchall()
+        found = {row[0] for row in rows}
+        deleted = [entry_id for entry_id in changed if entry_id not in found]
+        name = f"seg-{seq:012d}.arrow"
+        added = self._write_segment(name, [_batch(rows, deleted)])
+        # Rows for ids seen before supersede the older ones when loading
+        dedup = manifest["dedup"] or bool(deleted) or (bool(changed) and changed[0] <= manifest["max_id"])
+        logger.info(f"Appended {len(rows)} changed and {len(deleted)} deleted entries to the analytics snapshot")
+        return {**manifest, "seq": seq, "max_id": max([manifest["max_id"], *found]), "dedup": dedup,
+                "segments": manifest["segments"] + [name], "rows": manifest["rows"] + added}
+
+    def _compact(self, manifest: dict) -> dict:
+        table = self._live_table(manifest)
+        name = f"seg-{manifest['seq']:012d}-c.arrow"
+        rows = self._write_segment(name, [table])
+        logger.info(f"Compacted analytics snapshot to {rows} entries")
+        return {**manifest, "dedup": False, "segments": [name], "rows": rows}
+
+    def _live_table(self, manifest: dict):
+        """Concatenate the memory-mapped segments, keeping the newest row per id."""
+        import numpy as np
+        pa = _arrow()
+        tables = [pa.ipc.open_file(pa.memory_map(os.path.join(self.directory, name))).read_all()
+                  for name in manifest["segments"]]
+        table = pa.concat_tables(tables)
+        if not manifest["dedup"]:
+            return table
+        ids = table.column("id").to_numpy()
+        # Index of the last occurrence of each id
+        _unique, first_from_end = np.unique(ids[::-1], return_index=True)
+        keep = np.sort(len(ids) - 1 - first_from_end)
+        table = table.take(pa.array(keep))
+        return table.filter(pa.compute.invert(table.column("deleted")))
+
+    def load(self, db):
+        """Refresh and return the snapshot as a DataFrame sorted by date.
+
+        Repeated loads without changes return the same (read-only) frame.
+        """
+        manifest = self.refresh(db)
+        with self._lock:
+            if self._frame is not None and self._frame_seq == (manifest["seq"], tuple(manifest["segments"])):
+                return self._frame
+            table = self._live_table(manifest).drop_columns(["deleted"])
+            frame = table.to_pandas()
+            if not frame["date"].is_monotonic_increasing:
+                frame = frame.sort_values("date", kind="stable", ignore_index=True)
+            self._frame, self._frame_seq = frame, (manifest["seq"], tuple(manifest["segments"]))
+            return frame
+
+
+_snapshots: dict = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_snapshot(db_path: str) -> AnalyticsSnapshot:
+    """Process-wide snapshot of the journal at ``db_path``."""
+    directory = snapshot_dir(db_path)
+    with _snapshots_lock:
+        snapshot = _snapshots.get(directory)
+        if snapshot is None:
+            snapshot = _snapshots[directory] = AnalyticsSnapshot(directory)
+        return snapshot
@@ -1,19 +1,23 @@
-from textblob import TextBlob
 import plotly.express as px
 import pandas as pd
 import random
 import streamlit as st
-from database import ReflectionDB
-from ai_services import AIService
+from database import ReflectionDB, journal_db_path
+from ai_services import AIService, LLM_PROVIDERS, llm_status
 from import_db import import_legacy_db
+from backup import backup_database, ensure_scheduler
 from weather_service import WeatherService
-import json
+from profiling import RerunProfiler, section
+from downsampling import DEFAULT_POINTS, downsample_series, mood_sentiment_density, window
 import pathlib, tempfile
+from datetime import timedelta
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MOOD_FACTORS = ["Work", "Relationships", "Health", "Family", "Hobbies", "Weather", "Sleep"]
+
 def display_daily_quote():
     if 'daily_quote' not in st.session_state:
         ai_service = AIService(provider=st.session_state.llm_provider)
@@ -22,6 +26,63 @@ def display_daily_quote():
     st.markdown(f"*{st.session_state.daily_quote}*", help="Daily AI-generated inspiration")
     st.markdown("---")
 
+def display_backup_status():
+    if 'db' not in st.session_state:
+        return
+    scheduler = ensure_scheduler(st.session_state.db)
+    with st.sidebar.expander("Backups"):
+        if st.button("Back up now", key="backup_now"):
+            with st.spinner("Backing up..."):
+                report = scheduler.run_once() if scheduler else {
+                    "backup": backup_database(st.session_state.db)
+                }
+            if report.get("error"):
+                st.error(f"Backup failed: {report['error']}")
+        report = scheduler.last_report if scheduler else None
+        if report and report.get("backup"):
+            backup = report["backup"]
+            st.caption(f"Last backup {report['time']}: {backup['bytes'] / 1024:,.0f} KiB in {backup['seconds']:.1f}s")
+            compaction = report.get("compaction")
+            if compaction and compaction["compacted"]:
+                st.caption(f"Compaction reclaimed {compaction['reclaimed_bytes'] / 1024:,.0f} KiB "
+                           f"in {compaction['seconds']:.1f}s")
+        else:
+            st.caption("No backup taken by this server yet.")
+
+def display_llm_status():
+    status = llm_status().get(st.session_state.get('llm_provider'))
+    if not status:
+        return
+    breaker = status["breaker"]
+    with st.sidebar.expander("LLM status"):
+        if breaker["state"] == "closed":
+            st.caption("🟢 Available")
+        else:
+            st.caption(f"🔴 Unavailable for {breaker['open_for'] or 0:.0f}s: using fallback texts. "
+                       f"Last error: {breaker['last_error']}")
+            if breaker["last_probe"]:
+                st.caption(f"Last recovery probe: {breaker['last_probe']}")
+        rows = [{"task": task, **stats} for task, stats in status["tasks"].items()]
+        st.dataframe(pd.DataFrame(rows), hide_index=True)
+
+def session_profiler():
+    if 'profiler' not in st.session_state:
+        st.session_state.profiler = RerunProfiler()
+    return st.session_state.profiler
+
+def display_profiling_summary(profiler):
+    if not profiler.enabled:
+        return
+    with st.sidebar.expander("Profiling"):
+        rows = profiler.summary()
+        if rows:
+            st.caption(f"Slowest of the last {len(profiler.records)} reruns")
+            st.dataframe(pd.DataFrame(rows), hide_index=True)
+            if profiler.mode == "cprofile":
+                st.caption(f"cProfile dumps: {profiler.profile_dir}")
+        else:
+            st.caption("No reruns recorded yet.")
+
 def generate_prompt(mood):
     prompts = {
         5: [
@@ -87,7 +148,8 @@ def new_entry_page():
     st.header("New Journal Entry")
     
     # Get weather data
-    weather_data = display_weather()
+    with section("weather"):
+        weather_data = display_weather()
     
     mood = st.slider("How are you feeling today?", 1, 5, 3,
                      help="1 = Very Low, 5 = Very High")
@@ -97,7 +159,7 @@ def new_entry_page():
     
     mood_factors = st.multiselect(
         "What factors are influencing your mood?",
-        ["Work", "Relationships", "Health", "Family", "Hobbies", "Weather", "Sleep"]
+        MOOD_FACTORS
     )
     
     content = st.text_area("Your reflection", height=200)
@@ -105,21 +167,23 @@ def new_entry_page():
     if st.button("Save Entry"):
         if content:
             # Get AI analysis first
-            ai_service = AIService(provider=st.session_state.llm_provider)
-            analysis = ai_service.analyze_entry(
-                content,
-                mood,
-                ", ".join(mood_factors) if mood_factors else None
-            )
+            with section("ai insight"):
+                ai_service = AIService(provider=st.session_state.llm_provider)
+                analysis = ai_service.analyze_entry(
+                    content,
+                    mood,
+                    ", ".join(mood_factors) if mood_factors else None
+                )
             
             # Save the entry with the AI insight
-            success = st.session_state.db.add_entry(
-                content=content,
-                mood=mood,
-                mood_factors=", ".join(mood_factors) if mood_factors else None,
-                ai_insight=analysis,
-                weather_data=weather_data
-            )
+            with section("save entry"):
+                success = st.session_state.db.add_entry(
+                    content=content,
+                    mood=mood,
+                    mood_factors=", ".join(mood_factors) if mood_factors else None,
+                    ai_insight=analysis,
+                    weather_data=weather_data
+                )
             
             if success:
                 st.session_state.last_analysis = analysis
@@ -148,7 +212,7 @@ def edit_entry(entry):
     edited_mood = st.slider("Mood", 1, 5, int(entry['mood']))
     edited_factors = st.multiselect(
         "Factors",
-        ["Work", "Relationships", "Health", "Family", "Hobbies", "Weather", "Sleep"],
+        MOOD_FACTORS,
         default=current_factors
     )
     edited_content = st.text_area("Content", entry['content'], height=200)
@@ -174,15 +238,59 @@ def edit_entry(entry):
             st.session_state.editing = None
             st.rerun()
 
+def bulk_actions(entries):
+    """Actions on the entries ticked in the list below, each run as one transaction."""
+    db = st.session_state.db
+    # Actions rerun the page to refresh the list, so their outcome is shown on the next run
+    if 'bulk_result' in st.session_state:
+        st.success(st.session_state.pop('bulk_result'))
+    selected = [entry['id'] for entry in entries if st.session_state.get(f"select_{entry['id']}")]
+    with st.expander(f"Bulk actions ({len(selected)} selected)"):
+        col1, col2 = st.columns(2)
+        with col1:
+            mood = st.slider("Mood", 1, 5, 3, key="bulk_mood")
+            if st.button("Set mood", disabled=not selected):
+                st.session_state.bulk_result = f"Updated {db.update_entries(selected, mood=mood)} entries"
+                st.rerun()
+        with col2:
+            factor = st.selectbox("Factor", MOOD_FACTORS, key="bulk_factor")
+            add_col, remove_col = st.columns(2)
+            if add_col.button("Add factor", disabled=not selected):
+                count = db.update_entries(selected, add_factors=[factor])
+                st.session_state.bulk_result = f"Added {factor} to {count} entries"
+                st.rerun()
+            if remove_col.button("Remove factor", disabled=not selected):
+                count = db.update_entries(selected, remove_factors=[factor])
+                st.session_state.bulk_result = f"Removed {factor} from {count} entries"
+                st.rerun()
+        if st.button(f"Delete {len(selected)} selected entries", disabled=not selected, type="primary"):
+            count = db.delete_entries(selected)
+            for entry_id in selected:
+                del st.session_state[f"select_{entry_id}"]
+            st.session_state.bulk_result = f"Deleted {count} entries"
+            st.rerun()
+
+        st.markdown("---")
+        dates = st.date_input("Delete every entry dated", value=(), help="Pick the first and last day")
+        if len(dates) == 2:
+            confirm = st.checkbox(f"Yes, delete all entries from {dates[0]} to {dates[1]}")
+            if st.button("Delete date range", disabled=not confirm):
+                count = db.delete_entries_between(dates[0], dates[1] + timedelta(days=1))
+                st.session_state.bulk_result = f"Deleted {count} entries"
+                st.rerun()
+
 def past_entries_page():
     st.header("Past Entries")
     
     if st.button("Refresh Entries"):
         st.rerun()
     
-    entries = st.session_state.db.get_entries()
+    with section("get_entries"):
+        entries = st.session_state.db.get_entries()
     if entries:
+        bulk_actions(entries)
         for entry in entries:
+            st.checkbox(f"Select entry from {entry['date'][:16].replace('T', ' ')}", key=f"select_{entry['id']}")
             with st.expander(f"Entry from {entry['date'][:10]}"):
                 st.write(f"**Mood:** {'😊' * int(entry['mood'])}")
                 if entry.get('mood_factors'):
@@ -195,14 +303,18 @@ def past_entries_page():
                     st.markdown(entry['ai_insight'])
 
                 # Display weather if available
-                if entry.get('weather_data'):
-                    weather = json.loads(entry['weather_data'])
+                if entry.get('weather_id') and entry.get('temperature') is not None:
                     st.markdown("### Weather During Entry")
-                    st.write(f"🌡️ {weather['temperature']}°F - {weather['description']}")
-                    st.write(f"💧 Humidity: {weather['humidity']}%")
+                    # Legacy blobs and some API responses have no humidity or description
+                    description = entry.get('weather_description')
+                    st.write(f"🌡️ {entry['temperature']:.0f}°F" + (f" - {description}" if description else ""))
+                    if entry.get('humidity') is not None:
+                        st.write(f"💧 Humidity: {entry['humidity']:.0f}%")
 
-                sentiment = TextBlob(entry['content']).sentiment  # type: ignore[attr-defined]
-                score = sentiment.polarity  # type: ignore[attr-defined]
+                # Sentiment is scored once on write; only rescore legacy rows without one
+                score = entry.get('sentiment')
+                if score is None:
+                    score = st.session_state.db.sentiment.score(entry['content'])
                 sent = ""
                 if score > 0:
                     sent = "Positive"
@@ -230,25 +342,90 @@ def past_entries_page():
     else:
         st.info("No entries yet. Start journaling to see your entries here!")
 
+def factor_counts(mood_factors):
+    """How often each mood factor was chosen, from the comma-joined factor column."""
+    # Count each distinct combination once, then split: far fewer strings than entries
+    combos = mood_factors.value_counts()
+    combos = combos[combos > 0]
+    combos.index = combos.index.astype(str).str.split(', ')
+    return combos.rename_axis('factor').reset_index().explode('factor') \
+        .groupby('factor')['count'].sum().sort_values(ascending=False)
+
+def display_themes(start, end):
+    """Top keywords of the period and their trend, from the keyword indexes."""
+    db = st.session_state.db
+    pending = db.keyword_backfill_pending()
+    if pending:
+        st.info(f"{pending:,} older entries haven't been scanned for themes yet.")
+        if st.button("Extract themes from older entries"):
+            with st.spinner("Extracting keywords..."):
+                db.backfill_keywords()
+            st.rerun()
+    top = pd.DataFrame(db.top_keywords(start, end, limit=15))
+    if top.empty:
+        return
+    st.subheader("Themes")
+    st.plotly_chart(px.bar(top, x='entries', y='keyword', orientation='h', title='Top Themes',
+                           labels={'entries': 'Entries', 'keyword': ''}).update_yaxes(autorange='reversed'))
+    # No range means every entry is from the same day
+    span = (end - start).days if start and end else 0
+    period = 'day' if span <= 62 else 'month' if span <= 3 * 366 else 'year'
+    trends = pd.DataFrame(db.keyword_trends(top['keyword'].head(5), start, end, period=period))
+    if not trends.empty:
+        st.plotly_chart(px.line(trends, x='period', y='entries', color='keyword', markers=True,
+                                title='Top Themes Over Time', labels={'period': period.capitalize()}))
+
 def insights_page():
     st.header("Insights & Analytics")
-    raw_entries = st.session_state.db.get_entries(limit=100)
-    entries = pd.DataFrame(raw_entries) if raw_entries else pd.DataFrame()
+    with section("get_entries"):
+        entries = st.session_state.db.analytics_frame()
     
     if not entries.empty:
-        fig_mood = px.line(entries, x='date', y='mood',
-                          title='Mood Trends Over Time')
-        st.plotly_chart(fig_mood)
-
-        fig_sentiment = px.scatter(entries, x='mood', y='sentiment',
-                                 title='Mood vs. Sentiment Analysis')
-        st.plotly_chart(fig_sentiment)
-
-        if entries['mood_factors'].notna().any():
-            factors = entries['mood_factors'].str.split(', ').explode()
-            factor_counts = factors.value_counts()
-            fig_factors = px.bar(factor_counts, title='Common Mood Factors')
-            st.plotly_chart(fig_factors)
+        with section("charts"):
+            # Charts get a bounded number of points, however long the history
+            visible = entries
+            start = end = None
+            dates = entries['date'].dropna()
+            if not dates.empty and dates.min().date() < dates.max().date():
+                first, last = dates.min().date(), dates.max().date()
+                start, end = st.slider("Date range", min_value=first, max_value=last, value=(first, last),
+                                       help="Zoom into a period; the charts are redrawn at full detail for it")
+                visible = window(entries, 'date', start, end + timedelta(days=1))
+            points = downsample_series(visible, 'date', 'mood', DEFAULT_POINTS)
+            fig_mood = px.line(points, x='date', y='mood',
+                              title='Mood Trends Over Time')
+            if len(points) < len(visible):
+                st.caption(f"Showing {len(points):,} of {len(visible):,} entries (largest-triangle downsampling)")
+            st.plotly_chart(fig_mood)
+
+            density = mood_sentiment_density(visible)
+            # One marker per (mood, sentiment bin), sized by the number of entries in it
+            fig_sentiment = px.scatter(density, x='mood', y='sentiment', size='entries', color='entries',
+                                     title='Mood vs. Sentiment Analysis')
+            st.plotly_chart(fig_sentiment)
+
+            if visible['mood_factors'].notna().any():
+                fig_factors = px.bar(factor_counts(visible['mood_factors']), title='Common Mood Factors')
+                st.plotly_chart(fig_factors)
+
+        with section("themes"):
+            display_themes(start, None if end is None else end + timedelta(days=1))
+
+        with section("weather correlations"):
+            correlations = st.session_state.db.weather_mood_correlations()
+        if correlations['entries'] > 1:
+            st.subheader("Weather vs. Mood")
+            col1, col2 = st.columns(2)
+            for col, measure in ((col1, 'temperature'), (col2, 'humidity')):
+                r = correlations[measure]
+                col.metric(f"Mood / {measure} correlation", "n/a" if r is None else f"{r:+.2f}",
+                           help=f"Pearson correlation over {correlations['entries']} entries with weather")
+            bands = pd.DataFrame(st.session_state.db.mood_by_temperature())
+            if not bands.empty:
+                fig_weather = px.bar(bands, x='temperature_band', y='avg_mood', hover_data=['entries'],
+                                     labels={'temperature_band': 'Temperature (°F)', 'avg_mood': 'Average mood'},
+                                     title='Average Mood by Temperature')
+                st.plotly_chart(fig_weather)
     else:
         st.info("Add some journal entries to see insights!")
 
@@ -280,18 +457,32 @@ def import_legacy_page():
 
 def main():
     st.set_page_config(page_title="AI Reflection Journal", layout="wide")
-    
+    profiler = session_profiler()
+    # Opt-in (REFLECTIONS_PROFILE): time this rerun, split by section
+    with profiler.rerun(page=lambda: st.session_state.get('page', 'Login')):
+        render_app()
+    display_profiling_summary(profiler)
+
+def render_app():
     # Prompt for encrypted DB password and store it in session state
     if not st.session_state.get('logged_in', False):
         login_placeholder = st.empty()
         with login_placeholder.form("login_form"):
+            journal = st.text_input('Journal', help='Leave blank for the default journal. Each journal is a separate encrypted file.')
             pwd = st.text_input('Database password', type='password')
             submitted = st.form_submit_button('Login')
             if submitted:
+                try:
+                    journal_db_path(journal or None)
+                    valid_journal = True
+                except ValueError as e:
+                    st.warning(str(e))
+                    valid_journal = False
                 if not pwd:
                     st.warning('Please enter the database password to continue.')
-                else:
-                    st.session_state.db = ReflectionDB(password=pwd)
+                elif valid_journal:
+                    with section("open journal"):
+                        st.session_state.db = ReflectionDB(password=pwd, journal=journal or None, on_error=st.error)
                     st.session_state.logged_in = True
                     login_placeholder.empty()
                     st.rerun()
@@ -306,9 +497,10 @@ def main():
         st.sidebar.title("Settings")
         llm_provider = st.sidebar.selectbox(
             "Select LLM Provider",
-            options=["ollama"],
+            options=list(LLM_PROVIDERS),
             index=0,
-            help="Ollama only option for now. Public LLM providers cannot be trusted with personal info."
+            help="Local providers only: public LLM providers cannot be trusted with personal info. "
+                 "'fake' is a deterministic offline stand-in for testing."
         )
         
         # Store the selected provider in session state
@@ -320,7 +512,11 @@ def main():
             if 'daily_quote' in st.session_state:
                 del st.session_state.daily_quote
     
-    display_daily_quote()  # Add the daily quote right under the title
+    with section("backup status"):
+        display_backup_status()
+    with section("daily quote"):
+        display_daily_quote()  # Add the daily quote right under the title
+    display_llm_status()
     
     # Replace radio buttons with sidebar links
     st.sidebar.title("Navigation")
@@ -346,14 +542,15 @@ def main():
         st.session_state.page = "New Entry"
     
     # Display the selected page
-    if st.session_state.page == "New Entry":
-        new_entry_page()
-    elif st.session_state.page == "Past Entries":
-        past_entries_page()
-    elif st.session_state.page == "Insights":
-        insights_page()
-    elif st.session_state.page == "Legacy DB Import":
-        import_legacy_page()
+    with section(f"page: {st.session_state.page}"):
+        if st.session_state.page == "New Entry":
+            new_entry_page()
+        elif st.session_state.page == "Past Entries":
+            past_entries_page()
+        elif st.session_state.page == "Insights":
+            insights_page()
+        elif st.session_state.page == "Legacy DB Import":
+            import_legacy_page()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,323 @@
+import os
+import glob
+import time
+import argparse
+import logging
+import threading
+from datetime import datetime
+from initialize_db import CIPHER_DEFAULTS, open_encrypted_db, read_cipher_settings, write_cipher_settings
+
+logger = logging.getLogger(__name__)
+
+# Pages copied per backup step; writers get the database between steps
+BACKUP_PAGES_PER_STEP = 64
+BACKUP_STEP_SLEEP = 0.005
+# SQLite restarts a stepped backup whenever another connection writes the journal;
+# after more than this many restarts the copy is finished in a single step instead
+BACKUP_MAX_RESTARTS = 3
+DEFAULT_INTERVAL_HOURS = float(os.getenv("REFLECTIONS_BACKUP_INTERVAL_HOURS", "24"))
+DEFAULT_KEEP_LAST = int(os.getenv("REFLECTIONS_BACKUP_KEEP", "7"))
+DEFAULT_MAX_AGE_DAYS = float(os.getenv("REFLECTIONS_BACKUP_MAX_AGE_DAYS", "30"))
+# Compact once at least this fraction of the file is free pages (e.g. after heavy deletes)
+DEFAULT_MIN_FREE_RATIO = float(os.getenv("REFLECTIONS_COMPACT_FREE_RATIO", "0.25"))
+
+
+def backup_dir_for(db) -> str:
+    """Directory holding snapshots of ``db``'s journal (``REFLECTIONS_BACKUP_DIR``)."""
+    return os.getenv("REFLECTIONS_BACKUP_DIR") or os.path.join(os.path.dirname(db.db_path), 'backups')
+
+
+def _stem(db_path: str) -> str:
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+
+def _files_size(db_path: str) -> int:
+    """Size of the database including its WAL file."""
+    return sum(os.path.getsize(p) for p in (db_path, db_path + "-wal") if os.path.exists(p))
+
+
+def verify_snapshot(path: str, password: str | None) -> None:
+    """Raise ``RuntimeError`` unless ``path`` opens with ``password`` (and only with it)."""
+    conn = open_encrypted_db(path, password)
+    try:
+        result = conn.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        conn.close()
+    if result != "ok":
+        raise RuntimeError(f"Snapshot {path} failed integrity check: {result}")
+    if password:
+        conn = open_encrypted_db(path, None)
+        try:
+            conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            readable_without_key = True
+        except Exception:
+            readable_without_key = False
+        finally:
+            conn.close()
+        if readable_without_key:
+            raise RuntimeError(f"Snapshot {path} is not encrypted")
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def backup_database(db, backup_dir: str | None = None, pages: int = BACKUP_PAGES_PER_STEP,
+                    step_sleep: float = BACKUP_STEP_SLEEP, progress=None,
+                    max_restarts: int = BACKUP_MAX_RESTARTS) -> dict:
+    """Write an encrypted snapshot of ``db`` using SQLite's online backup API.
+
+    Pages are copied ``pages`` at a time on a dedicated connection, sleeping
+    ``step_sleep`` seconds between steps, so the app keeps reading and writing
+    throughout. A write to the journal restarts the copy from the first page;
+    after more than ``max_restarts`` restarts it is copied in one step, which
+    keeps a single read snapshot (WAL writers are not blocked). The snapshot
+    is keyed with the journal's password, verified and then moved into place.
+    ``progress(remaining, total)`` is called after each step. Returns
+    ``{"path", "bytes", "seconds", "restarts"}``.
+    """
+    start = time.perf_counter()
+    backup_dir = backup_dir or backup_dir_for(db)
+    os.makedirs(backup_dir, exist_ok=True)
+    dest = os.path.join(backup_dir, f"{_stem(db.db_path)}-{datetime.now():%Y%m%d-%H%M%S-%f}.db")
+    tmp = dest + ".part"
+    restarts = 0
+    last_remaining = None
+
+    def step(_status, remaining, total):
+        nonlocal restarts, last_remaining
+        if last_remaining is not None and remaining >= last_remaining:
+            restarts += 1
+            if restarts > max_restarts:
+                raise _TooManyRestarts()
+        last_remaining = remaining
+        if progress:
+            progress(remaining, total)
+        if remaining and step_sleep:
+            time.sleep(step_sleep)
+
+    # The backup API copies pages as they are, so the snapshot needs the journal's cipher settings
+    settings = read_cipher_settings(db.db_path)
+    write_cipher_settings(tmp, settings)
+    src = open_encrypted_db(db.db_path, db.password)
+    dst = open_encrypted_db(tmp, db.password)
+    try:
+        try:
+            src.backup(dst, pages=pages, progress=step)
+        except _TooManyRestarts:
+            logger.warning(f"Backup of {db.db_path} restarted {restarts} times by writes; copying in one step")
+            src.backup(dst, pages=-1)
+    finally:
+        dst.close()
+        src.close()
+    try:
+        verify_snapshot(tmp, db.password)
+    except Exception:
+        os.remove(tmp)
+        write_cipher_settings(tmp, None)
+        raise
+    os.replace(tmp, dest)
+    write_cipher_settings(dest, settings)
+    write_cipher_settings(tmp, None)
+    report = {"path": dest, "bytes": os.path.getsize(dest), "seconds": time.perf_counter() - start,
+              "restarts": restarts}
+    logger.info(f"Backed up {db.db_path} to {dest} ({report['bytes']} bytes in {report['seconds']:.2f}s, "
+                f"{restarts} restarts)")
+    return report
+
+
+def prune_backups(backup_dir: str, stem: str, keep_last: int = DEFAULT_KEEP_LAST,
+                  max_age_days: float = DEFAULT_MAX_AGE_DAYS) -> list:
+    """Apply retention rules to ``<stem>-*.db`` snapshots in ``backup_dir``.
+
+    Keeps at most ``keep_last`` snapshots and drops any older than
+    ``max_age_days``, but never the newest one. Returns the removed paths.
+    """
+    snapshots = sorted(glob.glob(os.path.join(backup_dir, f"{stem}-*.db")),
+                       key=os.path.getmtime, reverse=True)
+    cutoff = time.time() - max_age_days * 86400
+    removed = []
+    for i, path in enumerate(snapshots):
+        if i == 0:
+            continue
+        if i >= keep_last or os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            write_cipher_settings(path, None)
+            removed.append(path)
+    if removed:
+        logger.info(f"Removed {len(removed)} expired backups of {stem}")
+    return removed
+
+
+def free_page_ratio(db) -> float:
+    with db.connection() as conn:
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return freelist / page_count if page_count else 0.0
+
+
+def compact_database(db, min_free_ratio: float = DEFAULT_MIN_FREE_RATIO, force: bool = False) -> dict:
+    """Rewrite ``db`` without free pages using ``VACUUM INTO`` and swap it in.
+
+    Skipped unless at least ``min_free_ratio`` of the pages are free (or
+    ``force``). While the compacted copy is written and swapped in, the
+    journal's writer is paused (queued writes wait) and the pooled connection
+    is held, so nothing writes to the old file. Journals migrated to a
+    non-default ``cipher_page_size`` are rewritten by
+    :func:`rekey.rekey_database` instead. Returns ``{"compacted",
+    "free_ratio", "reclaimed_bytes", "seconds"}``.
+    """
+    ratio = free_page_ratio(db)
+    report = {"compacted": False, "free_ratio": ratio, "reclaimed_bytes": 0, "seconds": 0.0}
+    if not force and ratio < min_free_ratio:
+        return report
+    start = time.perf_counter()
+    before = _files_size(db.db_path)
+    settings = read_cipher_settings(db.db_path)
+    if db.password and settings.get("cipher_page_size", CIPHER_DEFAULTS["cipher_page_size"]) != CIPHER_DEFAULTS["cipher_page_size"]:
+        # SQLCipher writes VACUUM INTO output with the default page size; copy the rows instead
+        from rekey import rekey_database
+        rekey_database(db)
+    else:
+        _vacuum_into_place(db, settings)
+    report.update(compacted=True, reclaimed_bytes=before - _files_size(db.db_path),
+                  seconds=time.perf_counter() - start)
+    logger.info(f"Compacted {db.db_path}: reclaimed {report['reclaimed_bytes']} bytes in {report['seconds']:.2f}s")
+    return report
+
+
+def _vacuum_into_place(db, settings: dict):
+    tmp = db.db_path + ".compact"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    write_cipher_settings(tmp, settings)
+    with db.writer.paused():
+        with db.connection() as conn:
+            conn.execute("VACUUM INTO ?", (tmp,))
+            try:
+                verify_snapshot(tmp, db.password)
+                out = open_encrypted_db(tmp, db.password)
+                out.execute("PRAGMA journal_mode = WAL")
+                out.close()
+            except Exception:
+                os.remove(tmp)
+                write_cipher_settings(tmp, None)
+                raise
+            # Empty the WAL so nothing stale is left next to the new file
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            # The pool reopens a closed connection on the next lease
+            conn.close()
+            os.replace(tmp, db.db_path)
+            write_cipher_settings(tmp, None)
+
+
+class BackupScheduler:
+    """Background thread that periodically backs up, prunes and compacts a journal."""
+
+    def __init__(self, db, interval_hours: float = DEFAULT_INTERVAL_HOURS, keep_last: int = DEFAULT_KEEP_LAST,
+                 max_age_days: float = DEFAULT_MAX_AGE_DAYS, min_free_ratio: float = DEFAULT_MIN_FREE_RATIO,
+                 backup_dir: str | None = None):
+        self.db = db
+        self.interval = interval_hours * 3600
+        self.keep_last = keep_last
+        self.max_age_days = max_age_days
+        self.min_free_ratio = min_free_ratio
+        self.backup_dir = backup_dir or backup_dir_for(db)
+        self.last_report = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self) -> dict:
+        """Compact if worthwhile, take a snapshot and apply retention."""
+        report = {"time": datetime.now().isoformat(timespec="seconds")}
+        try:
+            report["compaction"] = compact_database(self.db, self.min_free_ratio)
+            report["backup"] = backup_database(self.db, self.backup_dir)
+            report["pruned"] = prune_backups(self.backup_dir, _stem(self.db.db_path),
+                                             self.keep_last, self.max_age_days)
+        except Exception as e:
+            logger.error(f"Scheduled backup failed: {str(e)}")
+            report["error"] = str(e)
+        self.last_report = report
+        return report
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="reflections-backup", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _seconds_until_due(self) -> float:
+        snapshots = glob.glob(os.path.join(self.backup_dir, f"{_stem(self.db.db_path)}-*.db"))
+        if not snapshots:
+            return 0.0
+        age = time.time() - max(os.path.getmtime(p) for p in snapshots)
+        return max(0.0, self.interval - age)
+
+    def _loop(self):
+        # Catch up straight away if the newest snapshot is older than the interval
+        delay = self._seconds_until_due()
+        while not self._stop.wait(delay):
+            self.run_once()
+            delay = self.interval
+
+
+# One scheduler per journal file, whichever session (and key) started it
+_schedulers: dict = {}
+_schedulers_lock = threading.Lock()
+
+
+def ensure_scheduler(db) -> BackupScheduler | None:
+    """Start (once per journal and process) the backup scheduler for ``db``.
+
+    Only journals that opened successfully get one, so a wrong password does
+    not start a thread. If the scheduler's own journal object failed its last
+    run (e.g. its key is out of date), it switches to ``db``. Disabled when
+    ``REFLECTIONS_BACKUP_INTERVAL_HOURS`` is 0.
+    """
+    if DEFAULT_INTERVAL_HOURS <= 0 or not db.opened:
+        return None
+    with _schedulers_lock:
+        scheduler = _schedulers.get(os.path.abspath(db.db_path))
+        if scheduler is None:
+            scheduler = _schedulers[os.path.abspath(db.db_path)] = BackupScheduler(db)
+        elif scheduler.db is not db and scheduler.last_report and scheduler.last_report.get("error"):
+            logger.info(f"Backup scheduler for {db.db_path} switched to a session that opened the journal")
+            scheduler.db = db
+        scheduler.start()
+        return scheduler
+
+
+def rebind_scheduler(db):
+    """Make the journal's scheduler, if any, use ``db`` (e.g. after its password changed)."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(os.path.abspath(db.db_path))
+        if scheduler is not None:
+            scheduler.db = db
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Back up and compact an encrypted reflections journal.")
+    parser.add_argument("--password", help="Password (encryption key) for the SQLite database")
+    parser.add_argument("--journal", help="Journal name (default journal if omitted)")
+    parser.add_argument("--compact", action="store_true", help="Compact even if few pages are free")
+    args = parser.parse_args()
+    pwd = args.password
+    if not pwd:
+        import getpass
+        pwd = getpass.getpass('Enter database password (leave blank for none): ') or None
+    from database import ReflectionDB
+    journal_db = ReflectionDB(password=pwd, journal=args.journal)
+    compaction = compact_database(journal_db, force=args.compact)
+    if compaction["compacted"]:
+        print(f"Compacted: reclaimed {compaction['reclaimed_bytes']:,} bytes in {compaction['seconds']:.2f}s")
+    else:
+        print(f"Compaction skipped ({compaction['free_ratio']:.0%} free pages)")
+    result = backup_database(journal_db)
+    print(f"Backup written to {result['path']} ({result['bytes']:,} bytes in {result['seconds']:.2f}s, "
+          f"restarted {result['restarts']} times by writes)")
+    pruned = prune_backups(backup_dir_for(journal_db), _stem(journal_db.db_path))
+    print(f"Removed {len(pruned)} expired backups")
@@ -0,0 +1,44 @@
+"""Per-entry calls versus the bulk APIs for inserts, updates and deletes.
+
+Usage: python benchmarks/bench_bulk.py [--entries N] [--password PW]
+"""
+import sys, os
+import argparse
+import logging
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def timed(label, fn, entries):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<34} {elapsed * 1000:>9.0f} ms {entries / elapsed:>10,.0f} entries/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--password", default=None, help="encrypt the benchmark journal")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["REFLECTIONS_JOURNAL_DIR"] = tmp
+        from database import ReflectionDB
+        from write_queue import close_all_writers
+        logging.getLogger().setLevel(logging.WARNING)
+        db = ReflectionDB(password=args.password, journal="bulk", raise_errors=True)
+        n = args.entries
+        records = [{"content": f"Entry number {i} about a calm day", "mood": 3, "mood_factors": "Work"}
+                   for i in range(n)]
+        print(f"{n:,} entries")
+        timed("add_entry, one call per entry", lambda: [db.add_entry(**r) for r in records], n)
+        one_by_one = [e["id"] for e in db.get_entries(limit=-1)]
+        ids = []
+        timed("add_entries", lambda: ids.extend(db.add_entries(records)), n)
+        timed("update_entry, one call per entry",
+              lambda: [db.update_entry(i, "Edited", 4, "Work, Sleep") for i in one_by_one], n)
+        timed("update_entries (mood + factor)", lambda: db.update_entries(ids, mood=4, add_factors=["Sleep"]), n)
+        timed("delete_entry, one call per entry", lambda: [db.delete_entry(i) for i in one_by_one], n)
+        timed("delete_entries", lambda: db.delete_entries(ids), n)
+        close_all_writers()
@@ -0,0 +1,51 @@
+"""Plotly payload size and build time of the Insights charts, raw vs. downsampled.
+
+Usage: python benchmarks/bench_charts.py [--entries N ...]
+
+Builds the mood trend and mood vs. sentiment figures for synthetic histories
+and reports the JSON sent to the browser for each.
+"""
+import sys, os
+import argparse
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from downsampling import DEFAULT_POINTS, downsample_series, mood_sentiment_density
+
+
+def history(entries):
+    rng = np.random.default_rng(42)
+    return pd.DataFrame({
+        "date": pd.date_range("2000-01-01", periods=entries, freq="10min"),
+        "mood": rng.integers(1, 6, entries),
+        "sentiment": rng.uniform(-1, 1, entries),
+    })
+
+
+def payload(build):
+    start = time.perf_counter()
+    size = len(build().to_json())
+    return size, time.perf_counter() - start
+
+
+def report(name, size, seconds):
+    print(f"  {name:<28} {size / 1024:>10,.0f} KiB {seconds * 1000:>8.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    for entries in args.entries:
+        frame = history(entries)
+        print(f"{entries:,} entries")
+        report("trend, raw", *payload(lambda: px.line(frame, x="date", y="mood")))
+        report("mood vs sentiment, raw", *payload(lambda: px.scatter(frame, x="mood", y="sentiment")))
+        report(f"trend, LTTB {DEFAULT_POINTS}", *payload(
+            lambda: px.line(downsample_series(frame, "date", "mood"), x="date", y="mood")))
+        report("mood vs sentiment, binned", *payload(
+            lambda: px.scatter(mood_sentiment_density(frame), x="mood", y="sentiment", size="entries")))
@@ -0,0 +1,108 @@
+"""Time opening and reading a journal under different SQLCipher settings and recommend some.
+
+Usage: python benchmarks/bench_cipher.py [--entries N | --journal NAME --password PW] [--open-budget S]
+
+Fills a synthetic journal the size of your own (``--journal``) or with N
+entries, re-encrypts it with ``rekey.rekey_database`` for every combination
+of ``cipher_page_size`` and ``kdf_iter``, and times: opening a connection
+(key derivation and first read), the Past Entries page query and a full scan
+of the entries. The recommendation keeps the most PBKDF2 iterations whose
+open time fits ``--open-budget`` and the page size with the fastest reads.
+"""
+import sys, os
+import argparse
+import logging
+import statistics
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+PAGE_SIZES = [1024, 4096, 8192, 16384]
+KDF_ITERS = [64000, 256000]
+PASSWORD = "benchmark key"
+
+
+def median_time(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def measure(db_path):
+    from initialize_db import open_encrypted_db
+
+    def open_only():
+        conn = open_encrypted_db(db_path, PASSWORD)
+        conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        conn.close()
+
+    def on_fresh_connection(sql):
+        def run():
+            conn = open_encrypted_db(db_path, PASSWORD)
+            conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            start = time.perf_counter()
+            conn.execute(sql).fetchall()
+            elapsed = time.perf_counter() - start
+            conn.close()
+            return elapsed
+        return lambda: statistics.median(run() for _ in range(3))
+
+    return {
+        "open": median_time(open_only),
+        "page": on_fresh_connection("SELECT * FROM entries ORDER BY date DESC, id DESC LIMIT 20")(),
+        "scan": on_fresh_connection("SELECT date, mood, sentiment, content FROM entries")(),
+        "bytes": os.path.getsize(db_path),
+    }
+
+
+def journal_entries(journal, password):
+    from database import journal_db_path
+    from initialize_db import open_encrypted_db
+    conn = open_encrypted_db(journal_db_path(journal), password)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20_000)
+    parser.add_argument("--journal", help="size the benchmark like this journal (\"default\" for the default one)")
+    parser.add_argument("--password", default=None, help="password of --journal")
+    parser.add_argument("--open-budget", type=float, default=0.5, help="acceptable seconds to open a connection")
+    args = parser.parse_args()
+    from database import ReflectionDB
+    from rekey import rekey_database
+    from write_queue import close_all_writers
+    logging.getLogger().setLevel(logging.WARNING)
+    entries = args.entries
+    if args.journal:
+        entries = journal_entries(None if args.journal == "default" else args.journal, args.password)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["REFLECTIONS_DB_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ["REFLECTIONS_ANALYTICS_SNAPSHOT"] = "0"
+        db = ReflectionDB(password=PASSWORD, raise_errors=True)
+        db.add_entries([{"content": f"Entry {i}: " + "a quiet reflective day with some thoughts " * 8,
+                         "mood": 1 + i % 5, "mood_factors": "Work, Sleep"} for i in range(entries)])
+        print(f"{entries:,} entries")
+        print(f"  {'page size':>9} {'kdf_iter':>9} {'rekey':>9} {'open':>9} {'page':>9} {'scan':>9} {'file MiB':>9}")
+        results = {}
+        for kdf_iter in KDF_ITERS:
+            for page_size in PAGE_SIZES:
+                rekey_s = rekey_database(db, page_size=page_size, kdf_iter=kdf_iter)["seconds"]
+                close_all_writers()
+                r = results[page_size, kdf_iter] = measure(db.db_path)
+                print(f"  {page_size:>9} {kdf_iter:>9} {rekey_s * 1000:>7.0f}ms {r['open'] * 1000:>7.0f}ms "
+                      f"{r['page'] * 1000:>7.1f}ms {r['scan'] * 1000:>7.0f}ms {r['bytes'] / 2**20:>9.1f}")
+        close_all_writers()
+    affordable = [k for k in KDF_ITERS if max(results[p, k]["open"] for p in PAGE_SIZES) <= args.open_budget]
+    kdf_iter = max(affordable) if affordable else min(KDF_ITERS)
+    page_size = min(PAGE_SIZES, key=lambda p: results[p, kdf_iter]["scan"] + results[p, kdf_iter]["page"])
+    print(f"Recommended: --page-size {page_size} --kdf-iter {kdf_iter}")
+    print(f"  python rekey.py --page-size {page_size} --kdf-iter {kdf_iter}")
+    if kdf_iter < max(KDF_ITERS):
+        print("  (fewer PBKDF2 iterations make a stolen journal cheaper to brute-force; prefer a long password)")
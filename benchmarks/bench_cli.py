@@ -0,0 +1,58 @@
+"""Startup time and scripted throughput of the headless `reflections` CLI.
+
+Usage: python benchmarks/bench_cli.py [--entries N] [--runs N] [--password PW]
+
+Startup compares importing the core (``database``) with importing Streamlit,
+which every script paid before the core became Streamlit-free. Throughput
+compares one CLI process per entry with a single ``add --jsonl`` batch.
+"""
+import sys, os
+import argparse
+import json
+import statistics
+import subprocess
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _run(args, env, stdin=None):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=ROOT, env=env, input=stdin, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, text=True)
+    return time.perf_counter() - start
+
+
+def _median(args, env, runs):
+    return statistics.median(_run(args, env) for _ in range(runs))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=5, help="repetitions for startup timings")
+    parser.add_argument("--password", default="benchmark")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, REFLECTIONS_JOURNAL_DIR=tmp, REFLECTIONS_DB_PASSWORD=args.password)
+        cli = ["-m", "reflections", "--journal", "bench"]
+        _run([*cli, "add", "warm-up entry"], env)
+
+        python = _median(["-c", "pass"], env, args.runs)
+        core = _median(["-c", "import database"], env, args.runs)
+        streamlit = _median(["-c", "import streamlit, database"], env, args.runs)
+        listing = _median([*cli, "list"], env, args.runs)
+
+        per_process = sum(_run([*cli, "add", f"Entry {i}: a calm walk after work", "--mood", "4"], env)
+                          for i in range(args.entries))
+        lines = "\n".join(json.dumps({"content": f"Entry {i}: a calm walk after work", "mood": 4})
+                          for i in range(args.entries))
+        batch = _run([*cli, "add", "--jsonl", "-"], env, stdin=lines)
+
+    print(f"interpreter startup:        {python * 1000:8.0f} ms")
+    print(f"import core (no Streamlit): {core * 1000:8.0f} ms")
+    print(f"import core + Streamlit:    {streamlit * 1000:8.0f} ms")
+    print(f"reflections list:           {listing * 1000:8.0f} ms")
+    print(f"{args.entries} x `reflections add`:    {args.entries / per_process:8.1f} entries/s")
+    print(f"`reflections add --jsonl`:  {args.entries / batch:8.1f} entries/s")
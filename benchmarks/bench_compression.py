@@ -0,0 +1,87 @@
+"""Compare file size and read/write latency of the compression codecs.
+
+Usage: python benchmarks/bench_compression.py [--entries N] [--password PW]
+
+Each codec gets its own journal filled with the same synthetic entries (short
+reflections with longer AI insights, as the app writes them). Dictionaries are
+trained from the first quarter of the entries, then the rest are written.
+"""
+import sys, os
+import argparse
+import random
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import database
+from database import ReflectionDB
+from compression import available_codecs, compress_existing_rows
+from connection_pool import get_pool
+from write_queue import close_all_writers
+
+SENTENCES = [
+    "Today I felt {} about work and the deadlines coming up.",
+    "I went for a walk in the park and the weather was {}.",
+    "Dinner with my family made me feel {} and grateful.",
+    "I struggled to focus in the afternoon and felt {}.",
+    "Meditation in the morning left me {} for the rest of the day.",
+]
+INSIGHTS = [
+    "It sounds like you are balancing a lot right now. Noticing how you felt {} is a valuable first step.",
+    "Consider what helped you feel {} today, and how you could make room for more of it tomorrow.",
+    "Be gentle with yourself: feeling {} is a natural response to a busy week.",
+    "What is one small thing you could do tomorrow to protect that {} feeling?",
+]
+WORDS = ["calm", "anxious", "hopeful", "tired", "energised", "content", "restless", "proud"]
+
+
+def _entry(rng):
+    content = " ".join(rng.choice(SENTENCES).format(rng.choice(WORDS)) for _ in range(rng.randint(2, 6)))
+    insight = "🤔 " + " ".join(rng.choice(INSIGHTS).format(rng.choice(WORDS)) for _ in range(rng.randint(3, 5)))
+    return content, insight
+
+
+def bench(codec, dictionary, entries, password, tmp):
+    os.environ["REFLECTIONS_JOURNAL_DIR"] = tmp
+    journal = f"{codec}{'_dict' if dictionary else ''}"
+    db = ReflectionDB(password=password, journal=journal, compression=codec)
+    rng = random.Random(42)
+    rows = [_entry(rng) for _ in range(entries)]
+    warmup = len(rows) // 4
+    for content, insight in rows[:warmup]:
+        db.add_entry(content=content, mood=3, mood_factors=None, ai_insight=insight)
+    if codec != "off":
+        compress_existing_rows(db, train=dictionary)
+    start = time.perf_counter()
+    futures = [db.add_entry_async(content=c, mood=3, mood_factors=None, ai_insight=i) for c, i in rows[warmup:]]
+    for f in futures:
+        f.result()
+    write_us = (time.perf_counter() - start) / (len(rows) - warmup) * 1e6
+    start = time.perf_counter()
+    db.clear_cache()
+    read = db.get_entries(limit=entries)
+    read_us = (time.perf_counter() - start) / len(read) * 1e6
+    close_all_writers()
+    get_pool().close_all()
+    with database.open_encrypted_db(db.db_path, password) as conn:
+        conn.execute("VACUUM")
+    return os.path.getsize(db.db_path), write_us, read_us
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--password", default=None, help="encrypt the benchmark journals")
+    args = parser.parse_args()
+    variants = [("off", False), ("zlib", False), ("zlib", True)]
+    if "zstd" in available_codecs():
+        variants += [("zstd", False), ("zstd", True)]
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [(codec, dictionary, *bench(codec, dictionary, args.entries, args.password, tmp))
+                   for codec, dictionary in variants]
+    baseline = results[0][2]
+    print(f"{args.entries} entries")
+    print(f"{'codec':<12}{'file size':>14}{'ratio':>8}{'write us':>10}{'read us':>10}")
+    for codec, dictionary, size, write_us, read_us in results:
+        label = codec + ("+dict" if dictionary else "")
+        print(f"{label:<12}{size:>14,}{size / baseline:>8.2f}{write_us:>10.1f}{read_us:>10.1f}")
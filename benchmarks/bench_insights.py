@@ -0,0 +1,74 @@
+"""Time loading the Insights data from SQL versus the memory-mapped snapshot.
+
+Usage: python benchmarks/bench_insights.py [--entries N] [--password PW]
+
+Fills a journal with N synthetic entries (inserted directly, in bulk), then
+times: the SQL path of ``analytics_frame``, the first snapshot build, a cold
+load of the snapshot (as in a new process), a warm load, and a load after a
+few edits (one appended segment).
+"""
+import sys, os
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+FACTORS = ["work", "family", "sleep", "exercise", "weather", "health", "friends"]
+
+
+def fill(db, entries):
+    rng = random.Random(42)
+    start = datetime(2000, 1, 1)
+    rows = []
+    for i in range(entries):
+        factors = ", ".join(rng.sample(FACTORS, rng.randint(0, 3))) or None
+        rows.append(((start + timedelta(minutes=10 * i)).isoformat(), "Synthetic entry", rng.randint(1, 5),
+                     factors, rng.uniform(-1, 1), "text"))
+    db.submit_write(lambda conn: conn.executemany(
+        "INSERT INTO entries (date, content, mood, mood_factors, sentiment, entry_type) VALUES (?, ?, ?, ?, ?, ?)",
+        rows)).result()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--password", default=None, help="encrypt the benchmark journal")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["REFLECTIONS_DB_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ["REFLECTIONS_SNAPSHOT_DIR"] = os.path.join(tmp, "snapshots")
+        os.environ["REFLECTIONS_ANALYTICS_SNAPSHOT"] = "0"
+        from database import ReflectionDB
+        from analytics_snapshot import AnalyticsSnapshot
+        from write_queue import close_all_writers
+        plain = ReflectionDB(password=args.password, raise_errors=True)
+        fill(plain, args.entries)
+        frame, sql_s = timed(plain.analytics_frame)
+        print(f"{len(frame):,} entries")
+        print(f"SQL (get rows, build DataFrame): {sql_s * 1000:8.0f} ms")
+
+        os.environ["REFLECTIONS_ANALYTICS_SNAPSHOT"] = "1"
+        db = ReflectionDB(password=args.password, raise_errors=True)
+        _manifest, build_s = timed(lambda: db.snapshot.refresh(db))
+        print(f"Snapshot build (once):           {build_s * 1000:8.0f} ms")
+        _frame, cold_s = timed(lambda: AnalyticsSnapshot(db.snapshot.directory).load(db))
+        print(f"Snapshot load, cold:             {cold_s * 1000:8.0f} ms")
+        _frame, warm_s = timed(db.analytics_frame)
+        _frame, warm_s = timed(db.analytics_frame)
+        print(f"Snapshot load, warm:             {warm_s * 1000:8.0f} ms")
+        for entry_id in (1, 2, 3):
+            db.update_entry(entry_id, "Edited", 5, "work")
+        db.add_entry("New entry", 4, None)
+        _frame, append_s = timed(db.analytics_frame)
+        print(f"Load after 4 writes (append):    {append_s * 1000:8.0f} ms")
+        _frame, cold_s = timed(lambda: AnalyticsSnapshot(db.snapshot.directory).load(db))
+        print(f"Snapshot load, cold, 2 segments: {cold_s * 1000:8.0f} ms")
+        close_all_writers()
@@ -0,0 +1,70 @@
+"""Time keyword backfill and the indexed theme queries against re-parsing every entry.
+
+Usage: python benchmarks/bench_keywords.py [--entries N] [--password PW]
+
+Fills a journal with N synthetic entries inserted directly (as if written
+before keywords existed), backfills their keywords, then times the Insights
+theme queries (top keywords of the whole history and of one month, and the
+monthly trend of the top five) against extracting keywords from every entry
+on each visit.
+"""
+import sys, os
+import argparse
+import logging
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+SUBJECTS = ["work", "my sister", "the garden", "a long run", "the new project", "yoga class", "dinner with friends",
+            "the deadline", "my health", "the weekend trip", "coffee", "the book club"]
+TEMPLATES = ["Spent the morning thinking about {}.", "Talked about {} and {} for hours.",
+             "{} went better than expected, but {} was tiring.", "Mostly {}; also some time on {}."]
+
+
+def fill(db, entries):
+    rng = random.Random(7)
+    start = datetime(2015, 1, 1)
+    rows = []
+    for i in range(entries):
+        text = " ".join(rng.choice(TEMPLATES).format(*rng.sample(SUBJECTS, 2)).capitalize() for _ in range(3))
+        rows.append(((start + timedelta(hours=6 * i)).isoformat(), text, rng.randint(1, 5), "text"))
+
+    def op(conn):
+        conn.executemany("INSERT INTO entries (date, content, mood, entry_type) VALUES (?, ?, ?, ?)", rows)
+        conn.execute("UPDATE keyword_backfill SET pending_through = (SELECT MAX(id) FROM entries)")
+    db.submit_write(op).result()
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"  {label:<44} {(time.perf_counter() - start) * 1000:>9.1f} ms")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20_000)
+    parser.add_argument("--password", default=None, help="encrypt the benchmark journal")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["REFLECTIONS_DB_PATH"] = os.path.join(tmp, "bench.db")
+        from database import ReflectionDB
+        from write_queue import close_all_writers
+        logging.getLogger().setLevel(logging.WARNING)
+        db = ReflectionDB(password=args.password, raise_errors=True)
+        fill(db, args.entries)
+        print(f"{args.entries:,} entries")
+        start = time.perf_counter()
+        db.backfill_keywords()
+        elapsed = time.perf_counter() - start
+        print(f"  {'backfill_keywords':<44} {elapsed * 1000:>9.0f} ms {args.entries / elapsed:>8,.0f} entries/s")
+        top = timed("top_keywords, whole history", lambda: db.top_keywords(limit=15))
+        timed("top_keywords, one month", lambda: db.top_keywords("2016-03-01", "2016-04-01", limit=15))
+        timed("keyword_trends, top 5 by month", lambda: db.keyword_trends([t["keyword"] for t in top[:5]]))
+        with db.connection() as conn:
+            texts = [row[0] for row in conn.execute("SELECT content FROM entries")]
+        timed("re-extracting every entry instead", lambda: db.keywords.extract_many(texts))
+        close_all_writers()
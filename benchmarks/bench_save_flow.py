@@ -0,0 +1,89 @@
+"""End-to-end latency of the save flow (AI analysis + add_entry) under load.
+
+Usage: python benchmarks/bench_save_flow.py [--sessions N] [--saves N] [--http]
+       [--latency S] [--tokens-per-second N] [--failure-rate F] [--password PW]
+
+Each simulated session is a thread doing what the New Entry page does on
+"Save Entry": build an AIService, analyse the entry, then add_entry. The LLM
+is the deterministic fake, either in-process or (--http) behind a local
+Ollama-compatible server reached through the real client and base URL.
+"""
+import sys, os
+import argparse
+import tempfile
+import threading
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from fake_llm import FakeLLM, FakeOllamaServer
+from ai_services import AIService
+from database import ReflectionDB
+from connection_pool import get_pool
+from write_queue import close_all_writers
+
+
+def run_session(session, saves, provider, password, timings):
+    db = ReflectionDB(password=password, journal="bench", raise_errors=True)
+    for i in range(saves):
+        start = time.perf_counter()
+        ai_service = AIService(provider=provider)
+        analysis = ai_service.analyze_entry(f"Session {session}, day {i}: busy but fine", 3, "Work")
+        analysed = time.perf_counter()
+        db.add_entry(content=f"Session {session}, day {i}: busy but fine", mood=3, mood_factors="Work",
+                     ai_insight=analysis)
+        saved = time.perf_counter()
+        timings.append((analysed - start, saved - analysed, saved - start))
+
+
+def percentiles(values):
+    return "  ".join(f"p{p} {np.percentile(values, p) * 1000:7.1f}ms" for p in (50, 95, 99))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--saves", type=int, default=10, help="saves per session")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--http", action="store_true", help="go through the Ollama client and a local fake server")
+    parser.add_argument("--password", default=None, help="encrypt the benchmark journal")
+    args = parser.parse_args()
+
+    llm = FakeLLM(args.latency, args.tokens_per_second, args.failure_rate)
+    server = None
+    if args.http:
+        server = FakeOllamaServer(llm).start()
+        os.environ["REFLECTIONS_LLM_OLLAMA_BASE_URL"] = server.url
+        provider = "ollama"
+    else:
+        os.environ["REFLECTIONS_LLM_FAKE_LATENCY"] = str(args.latency)
+        os.environ["REFLECTIONS_LLM_FAKE_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+        os.environ["REFLECTIONS_LLM_FAKE_FAILURE_RATE"] = str(args.failure_rate)
+        provider = "fake"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["REFLECTIONS_JOURNAL_DIR"] = tmp
+        timings = []
+        threads = [threading.Thread(target=run_session, args=(s, args.saves, provider, args.password, timings))
+                   for s in range(args.sessions)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        close_all_writers()
+        get_pool().close_all()
+    if server:
+        server.stop()
+
+    analysis, save, total = (np.array(column) for column in zip(*timings))
+    print(f"{args.sessions} sessions x {args.saves} saves via {'HTTP' if args.http else 'in-process'} fake LLM "
+          f"({args.latency * 1000:.0f}ms first token, {args.tokens_per_second:.0f} tok/s, "
+          f"{args.failure_rate:.0%} failures)")
+    print(f"analysis:  {percentiles(analysis)}")
+    print(f"add_entry: {percentiles(save)}")
+    print(f"save flow: {percentiles(total)}")
+    print(f"throughput: {len(timings) / elapsed:.1f} saves/s")
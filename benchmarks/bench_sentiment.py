@@ -0,0 +1,47 @@
+"""Compare sentiment backends by entries scored per second.
+
+Usage: python benchmarks/bench_sentiment.py [--entries N]
+"""
+import sys, os
+import argparse
+import random
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sentiment import LexiconSentiment, TextBlobSentiment
+
+SENTENCES = [
+    "Today was a long day at work, but I felt really productive.",
+    "I am so tired and sad, nothing went right.",
+    "Feeling anxious about the exam, but hopeful!",
+    "The weather was terrible and I was not happy with it.",
+    "My family visited and it was wonderful, truly amazing.",
+    "Slept badly and the meetings were never ending.",
+    "A quiet evening with a good book :)",
+    "I should call my friend, I miss her a lot.",
+]
+
+
+def make_entries(n, seed=42):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(SENTENCES, k=rng.randint(2, 6))) for _ in range(n)]
+
+
+def bench(backend, entries):
+    start = time.perf_counter()
+    backend.score_many(entries)
+    return len(entries) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=5000)
+    args = parser.parse_args()
+    entries = make_entries(args.entries)
+    # Warm up: lexicon compilation and TextBlob's lazy lexicon load
+    LexiconSentiment().score_many(entries[:10])
+    TextBlobSentiment().score_many(entries[:10])
+    results = {b.name: bench(b, entries) for b in (TextBlobSentiment(), LexiconSentiment())}
+    for name, rate in results.items():
+        print(f"{name:>10}: {rate:12,.0f} entries/s")
+    print(f"speedup: {results['lexicon'] / results['textblob']:.1f}x")
@@ -0,0 +1,97 @@
+"""Compare write throughput: per-write connections vs. the group-commit writer.
+
+Usage: python benchmarks/bench_write_queue.py [--writers N] [--writes N] [--password PW]
+
+The baseline mirrors the old ReflectionDB write path (open a keyed connection,
+write, commit, close) from every writer thread. With a password each open pays
+SQLCipher's key derivation, so keep --writes small in that mode.
+"""
+import sys, os
+import argparse
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from initialize_db import open_encrypted_db, CREATE_TABLE_SQL
+from write_queue import WriteQueue
+
+INSERT_SQL = '''
+    INSERT INTO entries (date, content, mood, mood_factors, sentiment, entry_type)
+    VALUES (?, ?, ?, ?, ?, 'text')
+'''
+
+
+def _row(i):
+    return (datetime.now().isoformat(), f"Benchmark entry {i}", i % 5 + 1, "Work", 0.1)
+
+
+def _create(path, password):
+    conn = open_encrypted_db(path, password)
+    conn.executescript(CREATE_TABLE_SQL)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.commit()
+    conn.close()
+
+
+def _run_threads(writers, target):
+    threads = [threading.Thread(target=target, args=(w,)) for w in range(writers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def bench_per_write(path, password, writers, writes):
+    errors = []
+
+    def worker(w):
+        for i in range(writes):
+            for _attempt in range(50):
+                try:
+                    conn = open_encrypted_db(path, password, timeout=5)
+                    conn.execute(INSERT_SQL, _row(w * writes + i))
+                    conn.commit()
+                    conn.close()
+                    break
+                except sqlite3.OperationalError as e:  # "database is locked"
+                    errors.append(e)
+                    time.sleep(0.001)
+    elapsed = _run_threads(writers, worker)
+    return writers * writes / elapsed, len(errors)
+
+
+def bench_write_queue(path, password, writers, writes):
+    queue = WriteQueue(lambda: open_encrypted_db(path, password, check_same_thread=False))
+
+    def worker(w):
+        futures = [queue.submit(lambda conn, i=i: conn.execute(INSERT_SQL, _row(w * writes + i)).lastrowid)
+                   for i in range(writes)]
+        for f in futures:
+            f.result()
+    elapsed = _run_threads(writers, worker)
+    queue.close()
+    return writers * writes / elapsed, queue.operations / max(queue.batches, 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200, help="writes per writer thread")
+    parser.add_argument("--password", default=None, help="encrypt the benchmark database")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline_path = os.path.join(tmp, "baseline.db")
+        queued_path = os.path.join(tmp, "queued.db")
+        _create(baseline_path, args.password)
+        _create(queued_path, args.password)
+        baseline, retries = bench_per_write(baseline_path, args.password, args.writers, args.writes)
+        queued, batch_size = bench_write_queue(queued_path, args.password, args.writers, args.writes)
+    print(f"{args.writers} writers x {args.writes} writes")
+    print(f"per-write connection: {baseline:10,.0f} writes/s ({retries} lock retries)")
+    print(f"group-commit writer:  {queued:10,.0f} writes/s (avg {batch_size:.1f} writes/commit)")
+    print(f"speedup: {queued / baseline:.1f}x")
@@ -0,0 +1,115 @@
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Callable
+from errors import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Fails fast after repeated errors of a shared dependency (e.g. Ollama).
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    :meth:`allow` returns ``False``, so callers skip straight to their
+    fallbacks instead of waiting on a dead server. Recovery is detected by
+    ``probe()``, run on a background thread every ``reset_timeout`` seconds
+    while open; the first successful probe closes the breaker. Without a
+    probe, one trial call is let through (half-open) after ``reset_timeout``.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 probe: Callable[[], object] | None = None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe = probe
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.rejected = 0
+        self.opened_at: float | None = None
+        self.last_error: str | None = None
+        self.last_probe: str | None = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._closed.set()
+        self._prober: threading.Thread | None = None
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.probe is None and time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Let a single trial call through
+                self.state = HALF_OPEN
+                return True
+            self.rejected += 1
+            return False
+
+    def check(self):
+        """Raise :class:`~errors.CircuitOpenError` unless a call may go ahead."""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open after "
+                                   f"{self.consecutive_failures} failures: {self.last_error})")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self._close_locked()
+
+    def record_failure(self, error):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.total_failures += 1
+            self.last_error = str(error)
+            if self.state == HALF_OPEN or (self.state == CLOSED and
+                                           self.consecutive_failures >= self.failure_threshold):
+                self._open_locked()
+
+    def _close_locked(self):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._closed.set()
+
+    def _open_locked(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._closed.clear()
+        logger.warning(f"Circuit for {self.name} opened after {self.consecutive_failures} failures: "
+                       f"{self.last_error}")
+        if self.probe is not None and (self._prober is None or not self._prober.is_alive()):
+            self._prober = threading.Thread(target=self._probe_loop, name=f"probe-{self.name}", daemon=True)
+            self._prober.start()
+
+    def _probe_loop(self):
+        # Exits once the breaker is closed (by a probe or a successful call)
+        while not self._closed.wait(self.reset_timeout):
+            try:
+                self.probe()
+            except Exception as e:
+                self.last_probe = f"{datetime.now():%H:%M:%S} failed: {str(e)}"
+                continue
+            self.last_probe = f"{datetime.now():%H:%M:%S} ok"
+            self.record_success()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "total_failures": self.total_failures,
+                "rejected": self.rejected,
+                "open_for": round(time.monotonic() - self.opened_at, 1) if self.opened_at else None,
+                "last_error": self.last_error,
+                "last_probe": self.last_probe,
+            }
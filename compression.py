@@ -0,0 +1,253 @@
+import os
+import re
+import zlib
+import struct
+import logging
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Environment variable choosing the codec for new writes: "off", "zlib" or "zstd"
+COMPRESSION_ENV = "REFLECTIONS_COMPRESSION"
+
+# Columns stored compressed
+COMPRESSED_COLUMNS = ("content", "ai_insight")
+
+# Compressed values are BLOBs: MAGIC, codec id, dictionary id (0 = none), payload.
+# Plain values stay TEXT, so old and new rows can be mixed freely.
+MAGIC = b"\x00RJ"
+_HEADER = struct.Struct(">3sBI")
+_CODEC_IDS = {"zlib": 1, "zstd": 2}
+_CODEC_NAMES = {v: k for k, v in _CODEC_IDS.items()}
+
+# Values shorter than this are not worth compressing
+MIN_COMPRESS_BYTES = 64
+DICT_SIZE = 16 * 1024
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 6
+
+DICTIONARY_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS compression_dicts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    codec TEXT NOT NULL,
+    data BLOB NOT NULL,
+    created TEXT NOT NULL
+)
+"""
+
+
+def available_codecs():
+    return ["off", "zlib"] + (["zstd"] if zstandard is not None else [])
+
+
+def is_compressed(value) -> bool:
+    return isinstance(value, (bytes, memoryview)) and bytes(value[:3]) == MAGIC
+
+
+def train_dictionary(codec: str, samples, size: int = DICT_SIZE) -> bytes | None:
+    """Build a compression dictionary from sample texts.
+
+    zstd uses its own trainer. zlib has no trainer, so its preset dictionary is
+    made of the most frequent phrases in the samples, most frequent last (zlib
+    finds matches near the end of the dictionary most cheaply). Returns
+    ``None`` if there is too little data.
+    """
+    samples = [s.encode("utf-8") for s in samples if s]
+    if len(samples) < 8:
+        return None
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression needs the 'zstandard' package")
+        try:
+            return zstandard.train_dictionary(size, samples).as_bytes()
+        except zstandard.ZstdError as e:
+            logger.warning(f"Could not train zstd dictionary: {str(e)}")
+            return None
+    phrases = Counter()
+    for sample in samples:
+        words = re.findall(rb"\S+\s*", sample)
+        for n in (1, 2, 3, 4):
+            for i in range(len(words) - n + 1):
+                phrases[b"".join(words[i:i + n])] += 1
+    # Weight by bytes saved, keep phrases seen more than once
+    ranked = sorted((p for p, c in phrases.items() if c > 1), key=lambda p: phrases[p] * len(p))
+    selected, total = [], 0
+    for phrase in reversed(ranked):
+        if total + len(phrase) > size:
+            break
+        selected.append(phrase)
+        total += len(phrase)
+    return b"".join(reversed(selected)) or None
+
+
+class Compressor:
+    """Encodes and decodes the compressed text columns of one journal.
+
+    ``codec`` applies to new writes ("off" writes plain text). Decoding always
+    works, whatever codec or dictionary a row was written with, as long as its
+    dictionary is loaded (see :meth:`load_dictionaries`).
+    """
+
+    def __init__(self, codec: str | None = None):
+        codec = (codec or os.getenv(COMPRESSION_ENV) or "off").lower()
+        if codec not in ("off", "zlib", "zstd"):
+            raise ValueError(f"Unknown compression codec '{codec}'. Choose from: off, zlib, zstd")
+        if codec == "zstd" and zstandard is None:
+            raise RuntimeError("zstd compression needs the 'zstandard' package")
+        self.codec = codec
+        self._dicts: dict = {}
+        self._dict_id = 0  # dictionary used for new writes
+        self._local = threading.local()  # zstd (de)compressors are not thread-safe
+
+    def load_dictionaries(self, conn):
+        """(Re)load dictionaries from ``compression_dicts``; the newest one for
+        the active codec is used for new writes."""
+        rows = conn.execute("SELECT id, codec, data FROM compression_dicts ORDER BY id").fetchall()
+        self._dicts = {row[0]: (row[1], bytes(row[2])) for row in rows}
+        self._dict_id = max((i for i, (c, _d) in self._dicts.items() if c == self.codec), default=0)
+        self._local = threading.local()
+
+    def has_dictionary(self, dict_id: int) -> bool:
+        return dict_id == 0 or dict_id in self._dicts
+
+    def _zstd(self, kind, dict_id):
+        cache = self._local.__dict__.setdefault(kind, {})
+        if dict_id not in cache:
+            zdict = zstandard.ZstdCompressionDict(self._dicts[dict_id][1]) if dict_id else None
+            if kind == "c":
+                cache[dict_id] = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=zdict)
+            else:
+                cache[dict_id] = zstandard.ZstdDecompressor(dict_data=zdict)
+        return cache[dict_id]
+
+    def encode(self, text):
+        """Compress ``text`` for storage, or return it unchanged if not worthwhile."""
+        if text is None or self.codec == "off":
+            return text
+        raw = text.encode("utf-8")
+        if len(raw) < MIN_COMPRESS_BYTES:
+            return text
+        dict_id = self._dict_id
+        if self.codec == "zstd":
+            payload = self._zstd("c", dict_id).compress(raw)
+        else:
+            zdict = self._dicts[dict_id][1] if dict_id else None
+            compressor = zlib.compressobj(ZLIB_LEVEL, zdict=zdict) if zdict else zlib.compressobj(ZLIB_LEVEL)
+            payload = compressor.compress(raw) + compressor.flush()
+        if len(payload) + _HEADER.size >= len(raw):
+            return text
+        return _HEADER.pack(MAGIC, _CODEC_IDS[self.codec], dict_id) + payload
+
+    def dictionary_id(self, value) -> int:
+        return _HEADER.unpack_from(bytes(value[:_HEADER.size]))[2]
+
+    def decode(self, value):
+        """Return the text for a stored value (plain or compressed)."""
+        if not is_compressed(value):
+            return value
+        value = bytes(value)
+        _magic, codec_id, dict_id = _HEADER.unpack_from(value)
+        payload = value[_HEADER.size:]
+        codec = _CODEC_NAMES.get(codec_id)
+        if dict_id and dict_id not in self._dicts:
+            raise KeyError(f"Compression dictionary {dict_id} is not loaded")
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("This journal has zstd-compressed rows; install the 'zstandard' package")
+            return self._zstd("d", dict_id).decompress(payload).decode("utf-8")
+        if codec == "zlib":
+            if dict_id:
+                decompressor = zlib.decompressobj(zdict=self._dicts[dict_id][1])
+                return (decompressor.decompress(payload) + decompressor.flush()).decode("utf-8")
+            return zlib.decompress(payload).decode("utf-8")
+        raise ValueError(f"Unknown compression codec id {codec_id}")
+
+    def decode_row(self, row: dict) -> dict:
+        for column in COMPRESSED_COLUMNS:
+            if column in row:
+                row[column] = self.decode(row[column])
+        return row
+
+
+def compress_existing_rows(db, codec: str | None = None, train: bool = True, batch_size: int = 500,
+                           progress=None) -> dict:
+    """Migrate every row of ``db`` to ``codec`` (default: the journal's codec).
+
+    Optionally trains and stores a new dictionary from the journal's own text
+    first. Rows are then rewritten through the writer queue in id ranges of
+    ``batch_size``; each range is read, re-encoded and updated in the same
+    write, so an entry edited during the migration is never overwritten with
+    its old text. ``"off"`` decompresses everything. ``progress(done, total)``
+    is called after each range. Returns ``{"rows", "dictionary_id"}``.
+    """
+    compressor = db.compressor
+    if codec is not None and codec != compressor.codec:
+        compressor = Compressor(codec)
+        with db.connection() as conn:
+            compressor.load_dictionaries(conn)
+    columns = ", ".join(COMPRESSED_COLUMNS)
+
+    dict_id = 0
+    if train and compressor.codec != "off":
+        with db.connection() as conn:
+            stored = conn.execute(f"SELECT {columns} FROM entries").fetchall()
+        # Decode with the journal's own compressor, which knows every stored dictionary
+        samples = [text for row in stored for text in map(db.compressor.decode, row) if text]
+        del stored
+        zdict = train_dictionary(compressor.codec, samples)
+        if zdict:
+            dict_id = db.submit_write(lambda conn: conn.execute(
+                "INSERT INTO compression_dicts (codec, data, created) VALUES (?, ?, ?)",
+                (compressor.codec, zdict, datetime.now().isoformat())
+            ).lastrowid).result()
+            with db.connection() as conn:
+                compressor.load_dictionaries(conn)
+                db.compressor.load_dictionaries(conn)
+
+    with db.connection() as conn:
+        total = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    assignments = ", ".join(f"{c} = ?" for c in COMPRESSED_COLUMNS)
+
+    def rewrite(conn, after):
+        rows = conn.execute(f"SELECT id, {columns} FROM entries WHERE id > ? ORDER BY id LIMIT ?",
+                            (after, batch_size)).fetchall()
+        params = [tuple(compressor.encode(db.compressor.decode(v)) for v in row[1:]) + (row[0],) for row in rows]
+        conn.executemany(f"UPDATE entries SET {assignments} WHERE id = ?", params)
+        return len(rows), rows[-1][0] if rows else after
+
+    done, after = 0, 0
+    while True:
+        count, after = db.submit_write(lambda conn, after=after: rewrite(conn, after)).result()
+        if not count:
+            break
+        done += count
+        if progress:
+            progress(done, max(total, done))
+    db.clear_cache()
+    logger.info(f"Rewrote {done} entries with {compressor.codec} compression (dictionary {dict_id or 'none'})")
+    return {"rows": done, "dictionary_id": dict_id}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compress (or decompress) the text columns of a reflections journal.")
+    parser.add_argument("codec", choices=available_codecs(), help="Codec to migrate existing rows to")
+    parser.add_argument("--password", help="Password (encryption key) for the SQLite database")
+    parser.add_argument("--journal", help="Journal name (default journal if omitted)")
+    parser.add_argument("--no-dictionary", action="store_true", help="Don't train a dictionary")
+    args = parser.parse_args()
+    pwd = args.password
+    if not pwd:
+        import getpass
+        pwd = getpass.getpass('Enter database password (leave blank for none): ') or None
+    from database import ReflectionDB
+    journal_db = ReflectionDB(password=pwd, journal=args.journal)
+    result = compress_existing_rows(journal_db, args.codec, train=not args.no_dictionary)
+    print(f"Rewrote {result['rows']} entries using {args.codec}")
+    print(f"Set {COMPRESSION_ENV}={args.codec} so new entries are written the same way.")
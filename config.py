@@ -0,0 +1,40 @@
+import os
+import logging
+import tomllib
+from functools import lru_cache
+from errors import ConfigError
+
+logger = logging.getLogger(__name__)
+
+# Same file Streamlit reads for st.secrets, so the app and scripts share settings
+DEFAULT_SECRETS_PATH = os.path.join(".streamlit", "secrets.toml")
+
+
+@lru_cache(maxsize=None)
+def load_settings(path: str | None = None) -> dict:
+    """Read settings from ``secrets.toml`` without importing Streamlit.
+
+    The file is ``path``, ``REFLECTIONS_SECRETS_FILE`` or
+    ``.streamlit/secrets.toml``; a missing file means no settings. Raises
+    :class:`ConfigError` if the file is not valid TOML.
+    """
+    path = path or os.getenv("REFLECTIONS_SECRETS_FILE") or DEFAULT_SECRETS_PATH
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    except (OSError, tomllib.TOMLDecodeError) as e:
+        raise ConfigError(f"Could not read settings from {path}: {str(e)}") from e
+
+
+def get_setting(section: str, key: str, default=None):
+    """Return ``[section] key`` from the settings file.
+
+    The environment variable ``REFLECTIONS_<SECTION>_<KEY>`` (e.g.
+    ``REFLECTIONS_WEATHER_ZIP_CODE``) takes precedence.
+    """
+    env_value = os.getenv(f"REFLECTIONS_{section}_{key}".upper())
+    if env_value is not None:
+        return env_value
+    return load_settings().get(section, {}).get(key, default)
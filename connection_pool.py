@@ -0,0 +1,158 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+# Process-wide defaults, overridable through the environment
+DEFAULT_MAX_CONNECTIONS = int(os.getenv("REFLECTIONS_POOL_SIZE", "32"))
+DEFAULT_IDLE_TIMEOUT = float(os.getenv("REFLECTIONS_POOL_IDLE_SECONDS", "600"))
+
+
+class _PooledConnection:
+    def __init__(self, conn):
+        self.conn = conn
+        # Per-journal lock: one caller at a time uses a journal's connection
+        self.lock = threading.RLock()
+        self.leases = 0
+        self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """Process-wide LRU pool of keyed database connections.
+
+    Each key (typically a journal file plus a hash of its key) maps to at most
+    one open connection. Callers lease a connection with :meth:`connection`,
+    which also holds that key's lock so a journal is used by one thread at a
+    time. At most ``max_connections`` connections are kept open; the least
+    recently used idle one is closed to make room, and connections idle for
+    longer than ``idle_timeout`` seconds are closed on the next lease.
+    """
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        if max_connections < 1:
+            raise ValueError("max_connections must be at least 1")
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self._entries: "OrderedDict[Hashable, _PooledConnection]" = OrderedDict()
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._entries)
+
+    @contextmanager
+    def connection(self, key: Hashable, connect: Callable[[], Any]):
+        """Lease the connection for ``key``, opening it with ``connect()`` if needed."""
+        entry = self._checkout(key, connect)
+        try:
+            with entry.lock:
+                if not _is_open(entry.conn):
+                    logger.info(f"Reopening closed pooled connection for {key!r}")
+                    entry.conn = connect()
+                yield entry.conn
+        finally:
+            with self._cond:
+                entry.leases -= 1
+                entry.last_used = time.monotonic()
+                self._cond.notify_all()
+
+    def _checkout(self, key, connect):
+        with self._cond:
+            self._evict_idle_locked()
+            while True:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    entry.leases += 1
+                    return entry
+                if len(self._entries) < self.max_connections or self._evict_lru_locked():
+                    break
+                # Every pooled connection is leased; wait for one to be released
+                self._cond.wait()
+            # Reserve the slot while the (possibly slow, keyed) open happens
+            entry = _PooledConnection(None)
+            entry.leases = 1
+            self._entries[key] = entry
+        try:
+            with entry.lock:
+                entry.conn = connect()
+        except Exception:
+            with self._cond:
+                self._entries.pop(key, None)
+                self._cond.notify_all()
+            raise
+        logger.info(f"Opened pooled connection ({len(self)}/{self.max_connections})")
+        return entry
+
+    def _evict_lru_locked(self):
+        for key, entry in self._entries.items():
+            if entry.leases == 0:
+                self._close_locked(key)
+                return True
+        return False
+
+    def _evict_idle_locked(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for key in [k for k, e in self._entries.items() if e.leases == 0 and e.last_used < cutoff]:
+            self._close_locked(key)
+
+    def _close_locked(self, key):
+        entry = self._entries.pop(key)
+        try:
+            if entry.conn is not None:
+                entry.conn.close()
+        except Exception as e:
+            logger.error(f"Error closing pooled connection: {str(e)}")
+        self._cond.notify_all()
+
+    def evict_idle(self):
+        """Close every connection that has been idle longer than ``idle_timeout``."""
+        with self._cond:
+            self._evict_idle_locked()
+
+    def discard(self, key: Hashable):
+        """Close and forget the connection for ``key`` (e.g. after a bad password)."""
+        with self._cond:
+            entry = self._entries.get(key)
+            if entry is not None and entry.leases == 0:
+                self._close_locked(key)
+
+    def close_all(self):
+        with self._cond:
+            for key in [k for k, e in self._entries.items() if e.leases == 0]:
+                self._close_locked(key)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "open": len(self._entries),
+                "leased": sum(1 for e in self._entries.values() if e.leases),
+                "max_connections": self.max_connections,
+            }
+
+
+def _is_open(conn):
+    try:
+        conn.execute("SELECT 1")
+        return True
+    except Exception:
+        return False
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool shared by all sessions."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
@@ -1,135 +1,675 @@
 import os
+import re
+import hashlib
+from collections import OrderedDict
 from initialize_db import open_encrypted_db
-import streamlit as st
+from migrate_db import migrate_weather_observations, weather_observation_id
+from connection_pool import get_pool
+from write_queue import get_write_queue
 import logging
-from sqlalchemy import create_engine, text
-from textblob import TextBlob
+from errors import DatabaseError
+from sentiment import SentimentBackend, get_sentiment_backend
+from compression import Compressor, DICTIONARY_TABLE_SQL
+from keywords import KEYWORD_BACKFILL_BATCH, ensure_keyword_tables, get_keyword_extractor, store_keywords
+from analytics_snapshot import (COLUMNS as ANALYTIC_COLUMNS, drop_changelog, ensure_changelog, get_snapshot,
+                                snapshot_enabled)
 from datetime import datetime
-import json
+from typing import Callable
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Journal names become file names, so keep them to a safe character set
+JOURNAL_NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Query results kept per session by the read cache, least recently used evicted first
+READ_CACHE_SIZE = 32
+
+
+def journal_db_path(journal: str | None = None) -> str:
+    """Return the database file for ``journal``.
+
+    ``None`` is the default journal (``REFLECTIONS_DB_PATH`` or
+    ``data/reflections.db``); named journals live in ``REFLECTIONS_JOURNAL_DIR``
+    (default ``data/journals``) as ``<journal>.db``.
+    """
+    if not journal:
+        return os.getenv("REFLECTIONS_DB_PATH") or os.path.join(os.getcwd(), 'data', 'reflections.db')
+    if not JOURNAL_NAME_RE.match(journal):
+        raise ValueError("Journal names may only contain letters, digits, '-' and '_' (max 64 characters)")
+    journal_dir = os.getenv("REFLECTIONS_JOURNAL_DIR") or os.path.join(os.getcwd(), 'data', 'journals')
+    return os.path.join(journal_dir, f"{journal}.db")
+
+
 class ReflectionDB:
-    def __init__(self, password: str | None = None):
+    """Encrypted journal database.
+
+    Failures are logged and reported to ``on_error`` (the app passes
+    ``st.error``), and methods return a neutral value (``False``, ``[]``...).
+    With ``raise_errors`` they raise :class:`~errors.DatabaseError` instead,
+    which is what scripts and the CLI want.
+    """
+
+    def __init__(self, password: str | None = None, sentiment_backend: SentimentBackend | None = None,
+                 journal: str | None = None, compression: str | None = None,
+                 on_error: Callable[[str], None] | None = None, raise_errors: bool = False):
+        self.on_error = on_error
+        self.raise_errors = raise_errors
+        # Set once the journal has been opened with this key and its tables checked
+        self.opened = False
         try:
-            self.db_path = os.getenv("REFLECTIONS_DB_PATH") or os.path.join(os.getcwd(), 'data', 'reflections.db')
+            self.sentiment = sentiment_backend or get_sentiment_backend()
+            self.keywords = get_keyword_extractor()
+            # Codec for content/ai_insight on write ("off", "zlib", "zstd"); reads handle any
+            self.compressor = Compressor(compression)
+            self.journal = journal
+            self.db_path = journal_db_path(journal)
             # Ensure the data directory exists
             os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
             self.password = password
+            # Connections are owned by the process-wide pool, keyed by file and key,
+            # so sessions only hold a key and file handles stay bounded.
+            key_hash = hashlib.sha256((password or "").encode()).hexdigest()
+            self._pool_key = (os.path.abspath(self.db_path), key_hash)
+            # Read-result cache, LRU order: {(query, params): (data_version, rows)}
+            self._read_cache = OrderedDict()
+            self._writes = 0
+            # Opt-in: the columnar snapshot is stored unencrypted
+            self.snapshot = get_snapshot(self.db_path) if snapshot_enabled() else None
             logger.info(f"Connecting to database at: {self.db_path}")
-            self.conn = open_encrypted_db(self.db_path, password)
-            # SQLAlchemy engine using the same encrypted connection creator
-            self.engine = create_engine('sqlite://', creator=lambda: open_encrypted_db(self.db_path, self.password))
-            logger.info("Database connection established")
             self.create_tables()
+            logger.info("Database connection established")
         except Exception as e:
-            logger.error(f"Error initializing database: {str(e)}")
-            st.error(f"Database initialization error: {str(e)}")
-    
+            self._fail("Database initialization error", e)
+
+    def _fail(self, message, error, default=None):
+        """Log and report ``error``; raise it as a DatabaseError if ``raise_errors``."""
+        if isinstance(error, DatabaseError):
+            # Already logged and reported by the method that raised it
+            raise error
+        logger.error(f"{message}: {str(error)}")
+        if self.raise_errors:
+            raise DatabaseError(f"{message}: {str(error)}") from error
+        if self.on_error:
+            self.on_error(f"{message}: {str(error)}")
+        return default
+
+    def _connect(self):
+        conn = open_encrypted_db(self.db_path, self.password, check_same_thread=False)
+        # Readers and the journal's writer thread use separate connections
+        conn.execute('PRAGMA busy_timeout = 5000')
+        return conn
+
+    def connection(self):
+        """Lease this journal's pooled connection, holding the journal lock.
+
+        Use as ``with db.connection() as conn: ...``.
+        """
+        return get_pool().connection(self._pool_key, self._connect)
+
+    @property
+    def conn(self):
+        """The journal's pooled connection, without taking the journal lock.
+
+        Kept for scripts and tests; concurrent code should use :meth:`connection`.
+        """
+        with self.connection() as conn:
+            return conn
+
     def create_tables(self):
         try:
             logger.info("Creating tables if they don't exist...")
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS entries (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    date TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    mood INTEGER NOT NULL,
-                    mood_factors TEXT,
-                    sentiment REAL,
-                    entry_type TEXT NOT NULL,
-                    ai_insight TEXT,
-                    weather_data TEXT
-                )
-            ''')
-            self.conn.commit()
+            with self.connection() as conn:
+                self._create_tables(conn)
+                self.compressor.load_dictionaries(conn)
+                if self.snapshot is not None:
+                    stale_snapshot = ensure_changelog(conn)
+                else:
+                    stale_snapshot = drop_changelog(conn)
+            # Outside the journal lease: the snapshot lock is taken before it (see analytics_snapshot)
+            if stale_snapshot and self.snapshot is not None:
+                self.snapshot.reset()
+            elif stale_snapshot:
+                # Snapshots were switched off: don't leave plaintext analytics behind
+                get_snapshot(self.db_path).remove()
+            self.opened = True
             logger.info("Tables created successfully")
         except Exception as e:
-            logger.error(f"Error creating tables: {str(e)}")
-            st.error(f"Error creating tables: {str(e)}")
+            # Don't keep a connection opened with a wrong key around
+            get_pool().discard(self._pool_key)
+            self._fail("Error creating tables", e)
 
-    def update_entry(self, entry_id, content, mood, mood_factors, ai_insight=None):
-        try:
-            sentiment = TextBlob(content).sentiment.polarity  # type: ignore[attr-defined]
-            conn = open_encrypted_db(self.db_path, self.password)
+    def _create_tables(self, conn):
+        cursor = conn.cursor()
+        # WAL lets the pooled readers keep reading while the writer commits
+        cursor.execute('PRAGMA journal_mode = WAL')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT NOT NULL,
+                content TEXT NOT NULL,
+                mood INTEGER NOT NULL,
+                mood_factors TEXT,
+                sentiment REAL,
+                entry_type TEXT NOT NULL,
+                ai_insight TEXT,
+                weather_data TEXT,
+                weather_id INTEGER REFERENCES weather_observations(id)
+            )
+        ''')
+        cursor.execute(DICTIONARY_TABLE_SQL)
+        if ensure_keyword_tables(conn):
+            logger.info("Created keyword tables; existing entries are marked for the keyword backfill")
+        conn.commit()
+        # Creates weather_observations and moves any legacy JSON blobs into it
+        migrate_weather_observations(conn)
+
+    @property
+    def writer(self):
+        """The journal's process-wide :class:`~write_queue.WriteQueue`."""
+        return get_write_queue(self._pool_key, self._connect)
+
+    def submit_write(self, fn):
+        """Queue ``fn(conn)`` on the journal's writer thread and return a Future.
+
+        Writes from every session sharing this journal are group-committed by a
+        single writer; ``fn`` must not commit itself.
+        """
+        return self.writer.submit(fn)
+
+    def _write(self, fn):
+        result = self.submit_write(fn).result()
+        self._writes += 1
+        return result
+
+    def update_entry_async(self, entry_id, content, mood, mood_factors, ai_insight=None):
+        """Queue an entry update; the Future resolves to the number of rows changed."""
+        sentiment = self.sentiment.score(content)
+        keywords = self.keywords.extract(content)
+        stored_content = self.compressor.encode(content)
+        stored_insight = self.compressor.encode(ai_insight)
+
+        def op(conn):
             cursor = conn.cursor()
             # Preserve existing entry_type (NOT NULL)
-            cursor.execute('SELECT entry_type FROM entries WHERE id = ?', (entry_id,))
+            cursor.execute('SELECT entry_type, date FROM entries WHERE id = ?', (entry_id,))
             row = cursor.fetchone()
             entry_type = row[0] if row else "text"
             cursor.execute('''
                 UPDATE entries
                 SET content = ?, mood = ?, mood_factors = ?, sentiment = ?, ai_insight = ?, entry_type = ?
                 WHERE id = ?
-            ''', (content, mood, mood_factors, sentiment, ai_insight, entry_type, entry_id))
-            conn.commit()
+            ''', (stored_content, mood, mood_factors, sentiment, stored_insight, entry_type, entry_id))
+            count = cursor.rowcount
+            if count:
+                store_keywords(cursor, [(entry_id, row[1], keywords)])
+            return count
+        return self.submit_write(op)
+
+    def update_entry(self, entry_id, content, mood, mood_factors, ai_insight=None):
+        try:
+            self.update_entry_async(entry_id, content, mood, mood_factors, ai_insight).result()
+            self._writes += 1
             logger.info(f"Entry {entry_id} updated successfully")
-            conn.close()
             return True
         except Exception as e:
-            logger.error(f"Error updating entry: {str(e)}")
-            st.error(f"Error updating entry: {str(e)}")
-            return False
+            return self._fail("Error updating entry", e, False)
 
     def delete_entry(self, entry_id):
         try:
-            conn = open_encrypted_db(self.db_path, self.password)
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM entries WHERE id = ?', (entry_id,))
-            conn.commit()
+            self._write(lambda conn: conn.execute('DELETE FROM entries WHERE id = ?', (entry_id,)).rowcount)
             logger.info(f"Entry {entry_id} deleted successfully")
-            conn.close()
             return True
         except Exception as e:
-            logger.error(f"Error deleting entry: {str(e)}")
-            st.error(f"Error deleting entry: {str(e)}")
-            return False
-    
-    def add_entry(self, content, mood, mood_factors, ai_insight=None, weather_data=None, entry_type="text"):
-        try:
-            conn = open_encrypted_db(self.db_path, self.password)
-            sentiment = TextBlob(content).sentiment.polarity # type: ignore[attr-defined]
-            cursor = conn.cursor()
+            return self._fail("Error deleting entry", e, False)
+
+    def add_entry_async(self, content, mood, mood_factors, ai_insight=None, weather_data=None, entry_type="text"):
+        """Queue a new entry; the Future resolves to its id once committed."""
+        sentiment = self.sentiment.score(content)
+        keywords = self.keywords.extract(content)
+        stored_content = self.compressor.encode(content)
+        stored_insight = self.compressor.encode(ai_insight)
+        now = datetime.now().isoformat()
 
+        def op(conn):
+            cursor = conn.cursor()
+            weather_id = weather_observation_id(cursor, weather_data, fallback_time=now)
             cursor.execute('''
                 INSERT INTO entries (
                     date, content, mood, mood_factors,
-                    sentiment, entry_type, ai_insight, weather_data
+                    sentiment, entry_type, ai_insight, weather_id
                 )
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
-                datetime.now().isoformat(), content, mood, mood_factors,
-                sentiment, entry_type, ai_insight,
-                json.dumps(weather_data) if weather_data else None
+                now, stored_content, mood, mood_factors,
+                sentiment, entry_type, stored_insight, weather_id
             ))
-            conn.commit()
+            entry_id = cursor.lastrowid
+            store_keywords(cursor, [(entry_id, now, keywords)])
+            return entry_id
+        return self.submit_write(op)
 
-            cursor.execute('SELECT COUNT(*) FROM entries')
-            count = cursor.fetchone()[0]
-            logger.info(f"Total entries after insert: {count}")
-            conn.close()
+    def add_entry(self, content, mood, mood_factors, ai_insight=None, weather_data=None, entry_type="text"):
+        try:
+            entry_id = self.add_entry_async(content, mood, mood_factors, ai_insight, weather_data, entry_type).result()
+            self._writes += 1
+            logger.info(f"Entry {entry_id} added successfully")
             return True
         except Exception as e:
-            logger.error(f"Error adding entry: {str(e)}")
-            st.error(f"Error saving entry: {str(e)}")
-            return False
-    
+            return self._fail("Error saving entry", e, False)
+
+    def add_entries_async(self, entries):
+        """Queue many new entries as one transaction; the Future resolves to their ids.
+
+        ``entries`` are dicts with ``content``, ``mood`` and optionally
+        ``mood_factors``, ``ai_insight``, ``weather_data``, ``entry_type`` and
+        ``date`` (ISO string, default now). Sentiment and keywords are
+        extracted in one batch each.
+        """
+        entries = list(entries)
+        scores = self.sentiment.score_many([entry["content"] for entry in entries])
+        keywords = self.keywords.extract_many([entry["content"] for entry in entries])
+        now = datetime.now().isoformat()
+        rows = [(
+            entry.get("date") or now, self.compressor.encode(entry["content"]), entry["mood"],
+            entry.get("mood_factors"), score, entry.get("entry_type") or "text",
+            self.compressor.encode(entry.get("ai_insight")), entry.get("weather_data"),
+        ) for entry, score in zip(entries, scores)]
+
+        def op(conn):
+            cursor = conn.cursor()
+            params = [row[:7] + (weather_observation_id(cursor, row[7], fallback_time=row[0]),) for row in rows]
+            cursor.executemany('''
+                INSERT INTO entries (
+                    date, content, mood, mood_factors,
+                    sentiment, entry_type, ai_insight, weather_id
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', params)
+            # The writer holds the write lock, so the newest rows are ours
+            ids = [row[0] for row in reversed(
+                cursor.execute('SELECT id FROM entries ORDER BY id DESC LIMIT ?', (len(rows),)).fetchall())]
+            store_keywords(cursor, [(entry_id, row[0], words) for entry_id, row, words in zip(ids, rows, keywords)])
+            return ids
+        return self.submit_write(op)
+
+    def add_entries(self, entries):
+        """Add many entries in one transaction; returns their ids."""
+        try:
+            ids = self.add_entries_async(entries).result()
+            self._writes += 1
+            logger.info(f"Added {len(ids)} entries")
+            return ids
+        except Exception as e:
+            return self._fail("Error saving entries", e, [])
+
+    def delete_entries(self, entry_ids):
+        """Delete the given entries in one transaction; returns how many were deleted."""
+        try:
+            params = [(entry_id,) for entry_id in entry_ids]
+            count = self._write(lambda conn: conn.executemany('DELETE FROM entries WHERE id = ?', params).rowcount)
+            logger.info(f"Deleted {count} entries")
+            return count
+        except Exception as e:
+            return self._fail("Error deleting entries", e, 0)
+
+    def delete_entries_between(self, start, end):
+        """Delete entries dated ``start <= date < end`` (dates, datetimes or ISO strings)."""
+        try:
+            bounds = tuple(b.isoformat() if hasattr(b, "isoformat") else str(b) for b in (start, end))
+            count = self._write(lambda conn: conn.execute(
+                'DELETE FROM entries WHERE date >= ? AND date < ?', bounds).rowcount)
+            logger.info(f"Deleted {count} entries dated {bounds[0]} to {bounds[1]}")
+            return count
+        except Exception as e:
+            return self._fail("Error deleting entries", e, 0)
+
+    def update_entries(self, entry_ids, mood=None, add_factors=(), remove_factors=()):
+        """Set the mood of, and add or remove mood factors on, many entries at once.
+
+        ``mood=None`` leaves moods unchanged. Content is untouched, so stored
+        sentiment stays valid. Returns the number of entries updated.
+        """
+        entry_ids = list(entry_ids)
+        add_factors, remove_factors = list(add_factors), set(remove_factors)
+
+        def op(conn):
+            params = []
+            for start in range(0, len(entry_ids), 500):
+                chunk = entry_ids[start:start + 500]
+                for entry_id, factors in conn.execute(
+                        f"SELECT id, mood_factors FROM entries WHERE id IN ({', '.join('?' * len(chunk))})", chunk):
+                    kept = [f for f in (factors.split(', ') if factors else []) if f not in remove_factors]
+                    kept += [f for f in add_factors if f not in kept]
+                    params.append((mood, ", ".join(kept) or None, entry_id))
+            return conn.executemany(
+                'UPDATE entries SET mood = COALESCE(?, mood), mood_factors = ? WHERE id = ?', params
+            ).rowcount
+
+        try:
+            count = self._write(op)
+            logger.info(f"Updated {count} entries")
+            return count
+        except Exception as e:
+            return self._fail("Error updating entries", e, 0)
+
+    def data_version(self):
+        """Return a token that changes whenever the database has been written.
+
+        Combines this object's write counter, the pooled connection's identity
+        and ``total_changes`` (writes by any session sharing it) and SQLite's
+        ``PRAGMA data_version`` (which moves when any other connection commits).
+        """
+        with self.connection() as conn:
+            version = conn.execute('PRAGMA data_version').fetchone()[0]
+            return (self._writes, id(conn), conn.total_changes, version)
+
+    def _decode_rows(self, rows):
+        """Decompress content/ai_insight in place, reloading dictionaries if a
+        row uses one trained since this object loaded them."""
+        try:
+            return [self.compressor.decode_row(row) for row in rows]
+        except KeyError:
+            with self.connection() as conn:
+                self.compressor.load_dictionaries(conn)
+            return [self.compressor.decode_row(row) for row in rows]
+
+    def _cached_read(self, query, params, decode=False):
+        """Run a read query, answering from memory while the data is unchanged.
+
+        With ``decode`` the compressed text columns are decoded once, before
+        the rows are cached.
+        """
+        key = (query, tuple(sorted(params.items())), decode)
+        with self.connection() as conn:
+            version = self.data_version()
+            cached = self._read_cache.get(key)
+            if cached is not None and cached[0] == version:
+                logger.debug(f"Read cache hit for query: {query}, params: {params}")
+                self._read_cache.move_to_end(key)
+                return [dict(row) for row in cached[1]]
+            logger.info(f"Fetching entries with query: {query}, params: {params}")
+            cursor = conn.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        # Convert to list of dicts for easier consumption without pandas
+        entries = [dict(zip(columns, row)) for row in rows]
+        if decode:
+            entries = self._decode_rows(entries)
+        # Results read before the last write can never be hit again
+        for stale in [k for k, (v, _rows) in self._read_cache.items() if v != version]:
+            del self._read_cache[stale]
+        self._read_cache[key] = (version, entries)
+        while len(self._read_cache) > READ_CACHE_SIZE:
+            self._read_cache.popitem(last=False)
+        # Hand out copies so callers can't mutate the cached rows
+        return [dict(row) for row in entries]
+
+    def clear_cache(self):
+        self._read_cache.clear()
+
     def get_entries(self, limit=10):
         try:
-            # Use SQLAlchemy engine to execute query and fetch results
-            query = 'SELECT * FROM entries ORDER BY date DESC LIMIT :limit'
-            logger.info(f"Fetching entries with query: {query}, limit: {limit}")
-            with self.engine.connect() as conn:
-                result = conn.execute(text(query), {"limit": limit})
-                rows = result.fetchall()
-            columns = result.keys()
-            # Convert to list of dicts for easier consumption without pandas
-            entries = [dict(zip(columns, row)) for row in rows]
+            query = '''
+                SELECT e.*, w.temperature, w.humidity,
+                       w.description AS weather_description, w.location AS weather_location
+                FROM entries e
+                LEFT JOIN weather_observations w ON w.id = e.weather_id
+                ORDER BY e.date DESC, e.id DESC LIMIT :limit
+            '''
+            entries = self._cached_read(query, {"limit": limit}, decode=True)
             logger.info(f"Retrieved {len(entries)} entries")
             return entries
         except Exception as e:
-            logger.error(f"Error getting entries: {str(e)}")
-            st.error(f"Error retrieving entries: {str(e)}")
-            return [] 
\ No newline at end of file
+            return self._fail("Error retrieving entries", e, [])
+
+    def analytics_frame(self):
+        """DataFrame of ``id, date, mood, sentiment, mood_factors`` for every entry, oldest first.
+
+        Served from the memory-mapped snapshot when it is enabled (see
+        :mod:`analytics_snapshot`), otherwise read from the journal.
+        """
+        import pandas as pd
+        try:
+            if self.snapshot is not None:
+                return self.snapshot.load(self)
+            query = 'SELECT id, date, mood, sentiment, mood_factors FROM entries ORDER BY date, id'
+            frame = pd.DataFrame(self._cached_read(query, {}), columns=list(ANALYTIC_COLUMNS))
+            frame["date"] = pd.to_datetime(frame["date"], format="ISO8601", errors="coerce")
+            return frame
+        except Exception as e:
+            return self._fail("Error loading analytics", e, pd.DataFrame(columns=list(ANALYTIC_COLUMNS)))
+
+    def entry_stats(self):
+        """Entry count, date range and average mood and sentiment."""
+        try:
+            query = '''
+                SELECT COUNT(*) AS entries, MIN(date) AS first_date, MAX(date) AS last_date,
+                       AVG(mood) AS avg_mood, AVG(sentiment) AS avg_sentiment
+                FROM entries
+            '''
+            return self._cached_read(query, {})[0]
+        except Exception as e:
+            return self._fail("Error computing entry statistics", e, {})
+
+    def search_entries(self, text, limit=50):
+        """Entries whose content or AI insight contains ``text`` (case-insensitive).
+
+        Plain rows are matched with LIKE in SQL. Compressed rows can only be
+        matched once decoded, so they are read and decoded once per data
+        version, independently of ``text``, and matched here. Newest first.
+        """
+        try:
+            select = '''
+                SELECT e.*, w.temperature, w.humidity,
+                       w.description AS weather_description, w.location AS weather_location
+                FROM entries e
+                LEFT JOIN weather_observations w ON w.id = e.weather_id
+            '''
+            is_compressed = "(typeof(e.content) = 'blob' OR typeof(e.ai_insight) = 'blob')"
+            pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            matches = self._cached_read(select + f'''
+                WHERE NOT {is_compressed}
+                  AND (e.content LIKE :pattern ESCAPE '\\' OR e.ai_insight LIKE :pattern ESCAPE '\\')
+                ORDER BY e.date DESC, e.id DESC LIMIT :limit
+            ''', {"pattern": pattern, "limit": limit})
+            compressed = self._cached_read(select + f"WHERE {is_compressed}", {}, decode=True)
+            needle = text.casefold()
+            matches += [row for row in compressed
+                        if needle in (row["content"] or "").casefold()
+                        or needle in (row["ai_insight"] or "").casefold()]
+            matches.sort(key=lambda row: (row["date"], row["id"]), reverse=True)
+            return matches[:limit]
+        except Exception as e:
+            return self._fail("Error searching entries", e, [])
+
+    def backfill_sentiment(self):
+        """Score every entry without a stored sentiment in one batch.
+
+        Returns the number of entries updated.
+        """
+        try:
+            with self.connection() as conn:
+                rows = conn.execute('SELECT id, content FROM entries WHERE sentiment IS NULL').fetchall()
+            if rows:
+                texts = [row["content"] for row in self._decode_rows([{"content": row[1]} for row in rows])]
+                scores = self.sentiment.score_many(texts)
+                self._write(lambda conn: conn.executemany(
+                    'UPDATE entries SET sentiment = ? WHERE id = ?',
+                    [(score, row[0]) for score, row in zip(scores, rows)]
+                ).rowcount)
+            logger.info(f"Backfilled sentiment for {len(rows)} entries")
+            return len(rows)
+        except Exception as e:
+            return self._fail("Error backfilling sentiment", e, 0)
+
+    def backfill_keywords(self, batch=KEYWORD_BACKFILL_BATCH, progress=None):
+        """Extract keywords from entries written before the keyword table existed.
+
+        Works through the pending entries ``batch`` at a time, one transaction
+        each, and records how far it got, so it can be interrupted and resumed.
+        Entries that got keywords meanwhile (edited since) are left alone.
+        ``progress(done, total)`` is called after each batch. Returns the
+        number of entries processed.
+        """
+        try:
+            with self.connection() as conn:
+                done, until = conn.execute('SELECT done_through, pending_through FROM keyword_backfill').fetchone()
+                total = conn.execute('SELECT COUNT(*) FROM entries WHERE id > ? AND id <= ?', (done, until)).fetchone()[0]
+            processed = 0
+            while done < until:
+                with self.connection() as conn:
+                    rows = conn.execute('''
+                        SELECT e.id, e.date, e.content FROM entries e
+                        WHERE e.id > ? AND e.id <= ?
+                          AND NOT EXISTS (SELECT 1 FROM entry_keywords k WHERE k.entry_id = e.id)
+                        ORDER BY e.id LIMIT ?
+                    ''', (done, until, batch)).fetchall()
+                last = rows[-1][0] if len(rows) == batch else until
+                texts = [row["content"] for row in self._decode_rows([{"content": row[2]} for row in rows])]
+                keywords = self.keywords.extract_many(texts)
+
+                def op(conn):
+                    cursor = conn.cursor()
+                    # Skip entries deleted or given keywords since they were read
+                    fresh = [(entry_id, date, words) for (entry_id, date, _), words in zip(rows, keywords)
+                             if cursor.execute('''
+                                 SELECT 1 FROM entries e WHERE e.id = ?
+                                   AND NOT EXISTS (SELECT 1 FROM entry_keywords k WHERE k.entry_id = e.id)
+                             ''', (entry_id,)).fetchone()]
+                    store_keywords(cursor, fresh)
+                    cursor.execute('UPDATE keyword_backfill SET done_through = ?', (last,))
+
+                self._write(op)
+                done = last
+                processed += len(rows)
+                if progress:
+                    progress(processed, total)
+            logger.info(f"Backfilled keywords for {processed} entries")
+            return processed
+        except Exception as e:
+            return self._fail("Error backfilling keywords", e, 0)
+
+    def keyword_backfill_pending(self):
+        """Number of entries still waiting for :meth:`backfill_keywords`."""
+        try:
+            query = '''
+                SELECT COUNT(*) AS pending FROM entries e, keyword_backfill b
+                WHERE e.id > b.done_through AND e.id <= b.pending_through
+            '''
+            return self._cached_read(query, {})[0]["pending"]
+        except Exception as e:
+            return self._fail("Error counting entries without keywords", e, 0)
+
+    @staticmethod
+    def _date_bounds(start, end):
+        """``(start, end)`` as ISO strings; open ends cover every date."""
+        start = "" if start is None else start.isoformat() if hasattr(start, "isoformat") else str(start)
+        end = "9999" if end is None else end.isoformat() if hasattr(end, "isoformat") else str(end)
+        return start, end
+
+    def top_keywords(self, start=None, end=None, limit=10):
+        """The ``limit`` keywords found in most entries dated ``start <= date < end``.
+
+        Returns ``[{"keyword", "entries"}]``, most frequent first. Answered
+        from the keyword indexes alone.
+        """
+        try:
+            start, end = self._date_bounds(start, end)
+            query = '''
+                SELECT keyword, COUNT(*) AS entries
+                FROM entry_keywords
+                WHERE date >= :start AND date < :end
+                GROUP BY keyword
+                ORDER BY entries DESC, keyword
+                LIMIT :limit
+            '''
+            return self._cached_read(query, {"start": start, "end": end, "limit": limit})
+        except Exception as e:
+            return self._fail("Error loading top keywords", e, [])
+
+    def keyword_trends(self, keywords, start=None, end=None, period="month"):
+        """Entries mentioning each of ``keywords`` per ``period`` ("day", "month" or "year").
+
+        Returns ``[{"period", "keyword", "entries"}]`` ordered by period, with
+        periods as ISO prefixes (e.g. "2024-05"). Answered from the keyword
+        indexes alone.
+        """
+        try:
+            width = {"day": 10, "month": 7, "year": 4}[period]
+            keywords = list(keywords)
+            if not keywords:
+                return []
+            start, end = self._date_bounds(start, end)
+            params = {"start": start, "end": end, "width": width}
+            params.update({f"k{i}": keyword for i, keyword in enumerate(keywords)})
+            query = f'''
+                SELECT substr(date, 1, :width) AS period, keyword, COUNT(*) AS entries
+                FROM entry_keywords
+                WHERE keyword IN ({", ".join(f":k{i}" for i in range(len(keywords)))})
+                  AND date >= :start AND date < :end
+                GROUP BY keyword, period
+                ORDER BY period, keyword
+            '''
+            return self._cached_read(query, params)
+        except Exception as e:
+            return self._fail("Error loading keyword trends", e, [])
+
+    def weather_mood_correlations(self):
+        """Pearson correlation of mood with temperature and humidity.
+
+        The sums are aggregated in SQL over ``weather_observations``, so no
+        weather JSON is parsed. Returns ``{"entries": n, "temperature": r,
+        "humidity": r}`` with ``None`` where a correlation is undefined.
+        """
+        try:
+            query = '''
+                SELECT COUNT(*) AS n,
+                       SUM(e.mood) AS sy, SUM(e.mood * e.mood) AS syy,
+                       SUM(w.temperature) AS st, SUM(w.temperature * w.temperature) AS stt,
+                       SUM(w.temperature * e.mood) AS sty,
+                       SUM(w.humidity) AS sh, SUM(w.humidity * w.humidity) AS shh,
+                       SUM(w.humidity * e.mood) AS shy
+                FROM entries e
+                JOIN weather_observations w ON w.id = e.weather_id
+                WHERE w.temperature IS NOT NULL AND w.humidity IS NOT NULL
+            '''
+            row = self._cached_read(query, {})[0]
+            n = row["n"]
+
+            def pearson(sx, sxx, sxy):
+                if n < 2:
+                    return None
+                denominator = ((n * sxx - sx * sx) * (n * row["syy"] - row["sy"] * row["sy"])) ** 0.5
+                if not denominator:
+                    return None
+                return (n * sxy - sx * row["sy"]) / denominator
+
+            return {
+                "entries": n,
+                "temperature": pearson(row["st"], row["stt"], row["sty"]),
+                "humidity": pearson(row["sh"], row["shh"], row["shy"]),
+            }
+        except Exception as e:
+            return self._fail("Error computing weather correlations", e,
+                              {"entries": 0, "temperature": None, "humidity": None})
+
+    def mood_by_temperature(self, band=10):
+        """Average mood per temperature band (e.g. 60-69°F, -10 to -1°F), computed in SQL."""
+        try:
+            # CAST truncates toward zero; step down one band for temperatures below it
+            query = '''
+                SELECT (CAST(w.temperature / :band AS INTEGER)
+                        - (CAST(w.temperature / :band AS INTEGER) * :band > w.temperature)) * :band
+                       AS temperature_band,
+                       AVG(e.mood) AS avg_mood, COUNT(*) AS entries
+                FROM entries e
+                JOIN weather_observations w ON w.id = e.weather_id
+                WHERE w.temperature IS NOT NULL
+                GROUP BY temperature_band
+                ORDER BY temperature_band
+            '''
+            return self._cached_read(query, {"band": band})
+        except Exception as e:
+            return self._fail("Error grouping mood by temperature", e, [])
+
@@ -0,0 +1,85 @@
+"""Bounded-size chart data for long histories.
+
+Plotly sends every point to the browser, so charts of large journals are
+reduced here first: :func:`lttb` keeps the shape of a time series in a fixed
+number of points, and :func:`density_grid` turns a scatter into counts per
+cell.
+"""
+import numpy as np
+import pandas as pd
+
+# Points drawn for a time series, whatever the length of the history
+DEFAULT_POINTS = 2000
+# Sentiment bins of the mood vs. sentiment density
+DEFAULT_SENTIMENT_BINS = 40
+
+
+def lttb(x, y, threshold: int = DEFAULT_POINTS) -> np.ndarray:
+    """Indices of ``threshold`` points chosen by Largest-Triangle-Three-Buckets.
+
+    ``x`` must be sorted. The first and last points are always kept; every
+    bucket in between contributes the point forming the largest triangle with
+    the previously kept point and the average of the next bucket, which keeps
+    peaks and dips visible. Series no longer than ``threshold`` are kept whole.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket i covers [edges[i], edges[i + 1]); the first and last points are their own buckets
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    counts = np.diff(edges)
+    avg_x = np.append(np.add.reduceat(x[:-1], edges[:-1]) / counts, x[-1])
+    avg_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / counts, y[-1])
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Twice the triangle area (a, candidate, next bucket average); the factor doesn't matter
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (avg_y[i + 1] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_series(frame: pd.DataFrame, x: str, y: str, points: int = DEFAULT_POINTS) -> pd.DataFrame:
+    """Rows of ``frame`` (sorted by ``x``) that :func:`lttb` keeps for ``y``."""
+    frame = frame.dropna(subset=[x, y])
+    values = frame[x].to_numpy()
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = (values - values[0]).astype("timedelta64[ms]").astype(np.float64) if len(values) else values
+    return frame.iloc[lttb(values, frame[y].to_numpy(), points)]
+
+
+def window(frame: pd.DataFrame, column: str, start, end) -> pd.DataFrame:
+    """Rows with ``start <= frame[column] < end``, by binary search (``column`` sorted)."""
+    values = frame[column].to_numpy()
+    lo = np.searchsorted(values, np.datetime64(start, "ns").astype(values.dtype), side="left")
+    hi = np.searchsorted(values, np.datetime64(end, "ns").astype(values.dtype), side="left")
+    return frame.iloc[lo:hi]
+
+
+def density_grid(frame: pd.DataFrame, x: str, y: str, x_edges, y_edges) -> pd.DataFrame:
+    """Number of rows per (``x``, ``y``) cell, as ``x, y, entries`` with cell centres.
+
+    Empty cells are left out, so the result has at most
+    ``(len(x_edges) - 1) * (len(y_edges) - 1)`` rows.
+    """
+    frame = frame.dropna(subset=[x, y])
+    counts, x_edges, y_edges = np.histogram2d(frame[x].to_numpy(np.float64), frame[y].to_numpy(np.float64),
+                                              bins=[np.asarray(x_edges), np.asarray(y_edges)])
+    xi, yi = np.nonzero(counts)
+    return pd.DataFrame({
+        x: (x_edges[xi] + x_edges[xi + 1]) / 2,
+        y: (y_edges[yi] + y_edges[yi + 1]) / 2,
+        "entries": counts[xi, yi].astype(np.int64),
+    })
+
+
+def mood_sentiment_density(frame: pd.DataFrame, sentiment_bins: int = DEFAULT_SENTIMENT_BINS) -> pd.DataFrame:
+    """:func:`density_grid` of mood (1-5) against sentiment (-1 to 1)."""
+    return density_grid(frame, "mood", "sentiment", np.arange(0.5, 6), np.linspace(-1, 1, sentiment_bins + 1))
@@ -0,0 +1,29 @@
+"""Exceptions raised by the core modules (no Streamlit dependency).
+
+The Streamlit app turns these into ``st.error`` messages; scripts and the
+``reflections`` CLI let them propagate.
+"""
+
+
+class ReflectionsError(Exception):
+    """Base class for errors raised by the reflections core."""
+
+
+class ConfigError(ReflectionsError):
+    """Settings are missing or malformed."""
+
+
+class DatabaseError(ReflectionsError):
+    """A journal could not be opened, read or written."""
+
+
+class LLMError(ReflectionsError):
+    """The language model could not produce an answer."""
+
+
+class LLMTimeoutError(LLMError, TimeoutError):
+    """An LLM call ran past its deadline."""
+
+
+class CircuitOpenError(LLMError):
+    """The LLM circuit breaker is open, so the call was not attempted."""
@@ -0,0 +1,223 @@
+"""Deterministic local stand-in for the LLM, for offline tests and benchmarks.
+
+:class:`FakeLLM` answers ``invoke(prompt)`` like ``OllamaLLM`` does, with a
+configurable time to first token, token rate and failure rate. The same
+prompt always gets the same answer, and failures follow a seeded sequence, so
+runs are reproducible. :class:`FakeOllamaServer` serves a ``FakeLLM`` over
+Ollama's HTTP API, which exercises the real client and ``ollama_base_url``:
+
+    python fake_llm.py --port 11435 --latency 0.2 --tokens-per-second 40
+"""
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY = 0.2
+DEFAULT_TOKENS_PER_SECOND = 40.0
+
+_QUOTES = [
+    '"The only journey is the one within." - Rainer Maria Rilke',
+    '"Know thyself." - Socrates',
+    '"Self-awareness is the key to self-mastery." - Gretchen Rubin',
+    '"Reflection is the lamp of the heart." - Al-Ghazali',
+    '"Between stimulus and response there is a space." - Viktor Frankl',
+]
+_INSIGHTS = [
+    "It sounds like you are carrying a lot right now, and naming it is a real step.",
+    "Notice what helped you feel steadier today; those moments are worth protecting.",
+    "Be gentle with yourself: mixed feelings are a natural response to a full day.",
+    "Your reflection shows care for the people and things that matter to you.",
+    "Small routines, like a short walk or an early night, can make tomorrow lighter.",
+]
+_QUESTIONS = [
+    "What is one small thing you could do tomorrow to look after yourself?",
+    "When did you feel most like yourself today?",
+    "What would you tell a friend who wrote this entry?",
+]
+
+
+class FakeLLMError(ConnectionError):
+    """Injected failure, shaped like a dropped connection to the LLM server."""
+
+
+class FakeLLM:
+    """Offline LLM with scripted latency and failures.
+
+    A call takes ``latency`` seconds before the first token and then streams
+    the answer at ``tokens_per_second`` (one token per word). A fraction
+    ``failure_rate`` of calls raises :class:`FakeLLMError` after the initial
+    latency; which calls fail is decided by ``seed``. Likewise a fraction
+    ``slow_rate`` of calls waits ``slow_latency`` extra seconds, to model a
+    latency tail.
+    """
+
+    def __init__(self, latency: float = DEFAULT_LATENCY, tokens_per_second: float = DEFAULT_TOKENS_PER_SECOND,
+                 failure_rate: float = 0.0, seed: int = 0, model: str = "fake",
+                 slow_rate: float = 0.0, slow_latency: float = 0.0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.model = model
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def respond(self, prompt: str) -> str:
+        """The (deterministic) answer to ``prompt``, without any delay."""
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+        if "quote" in prompt.lower():
+            return rng.choice(_QUOTES)
+        sentences = rng.sample(_INSIGHTS, 2) + [rng.choice(_QUESTIONS)]
+        return "🤔 " + " ".join(sentences)
+
+    def _draw(self):
+        """Decide (fail, slow) for the next call."""
+        with self._lock:
+            self.calls += 1
+            fail = self._rng.random() < self.failure_rate
+            slow = self._rng.random() < self.slow_rate
+            if fail:
+                self.failures += 1
+            return fail, slow
+
+    def stream(self, prompt: str):
+        """Yield the answer token by token, paced like a real model."""
+        fail, slow = self._draw()
+        time.sleep(self.latency + (self.slow_latency if slow else 0.0))
+        if fail:
+            raise FakeLLMError(f"Injected failure (call {self.calls})")
+        delay = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for i, word in enumerate(self.respond(prompt).split(" ")):
+            if delay:
+                time.sleep(delay)
+            yield word if i == 0 else " " + word
+
+    def invoke(self, prompt: str, **_kwargs) -> str:
+        return "".join(self.stream(prompt))
+
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    server: "FakeOllamaServer"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/api/version":
+            self._send_json(200, {"version": "0.0.0-fake"})
+        elif self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": self.server.llm.model, "model": self.server.llm.model}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self._send_json(404, {"error": "not found"})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        llm = self.server.llm
+        model = request.get("model") or llm.model
+        start = time.perf_counter()
+        try:
+            if not request.get("stream", True):
+                text = llm.invoke(request.get("prompt", ""))
+                self._send_json(200, _final_chunk(model, start, len(text.split()), response=text))
+                return
+            tokens = llm.stream(request.get("prompt", ""))
+            first = next(tokens)
+        except FakeLLMError as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        count = 0
+        for token in _chain(first, tokens):
+            count += 1
+            self._write_line({"model": model, "created_at": _now(), "response": token, "done": False})
+        self._write_line(_final_chunk(model, start, count))
+        self.close_connection = True
+
+    def _write_line(self, body):
+        self.wfile.write(json.dumps(body).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _final_chunk(model, start, eval_count, response=""):
+    duration = int((time.perf_counter() - start) * 1e9)
+    return {"model": model, "created_at": _now(), "response": response, "done": True, "done_reason": "stop",
+            "total_duration": duration, "eval_count": eval_count, "eval_duration": duration}
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """Minimal Ollama-compatible server (``/api/generate``) backed by a FakeLLM.
+
+    Port 0 picks a free port; see :attr:`url`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, llm: FakeLLM | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.llm = llm or FakeLLM()
+        super().__init__((host, port), _OllamaHandler)
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a deterministic fake LLM over Ollama's HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=DEFAULT_TOKENS_PER_SECOND)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    server = FakeOllamaServer(FakeLLM(args.latency, args.tokens_per_second, args.failure_rate, args.seed),
+                              args.host, args.port)
+    print(f"Fake Ollama listening on {server.url} (set REFLECTIONS_LLM_OLLAMA_BASE_URL={server.url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
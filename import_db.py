@@ -4,6 +4,8 @@ from typing import Any
 
 # Import the ReflectionDB class for type hinting and to access the existing encrypted DB connection
 from database import ReflectionDB
+from migrate_db import migrate_weather_observations
+from keywords import mark_for_backfill
 
 logger = logging.getLogger(__name__)
 
@@ -16,8 +18,8 @@ def import_legacy_db(legacy_path: str, db: ReflectionDB) -> int:
     legacy_path: str
         Path to the legacy (plain‑text) SQLite ``.db`` file.
     db: ReflectionDB
-        The current encrypted database instance. Its ``conn`` attribute is an
-        open connection that will be used for the insert statements.
+        The current encrypted database instance. Rows are inserted through
+        its writer queue.
 
     Returns
     -------
@@ -39,9 +41,10 @@ def import_legacy_db(legacy_path: str, db: ReflectionDB) -> int:
         logger.error(f"Failed to read legacy database '{legacy_path}': {e}")
         return 0
 
-    # Insert each row into the encrypted database using the existing connection
-    try:
-        cur = db.conn.cursor()
+    # Insert the rows through the journal's writer in a single transaction
+    def insert_rows(conn):
+        count = 0
+        cur = conn.cursor()
         for row in rows:
             try:
                 cur.execute(
@@ -53,10 +56,19 @@ def import_legacy_db(legacy_path: str, db: ReflectionDB) -> int:
                     """,
                     row,
                 )
-                imported += 1
+                count += 1
             except Exception as row_err:
                 logger.error(f"Failed to import row {row}: {row_err}")
-        db.conn.commit()
+        # Legacy rows carry weather as JSON blobs – move them into weather_observations
+        migrate_weather_observations(conn, commit=False)
+        mark_for_backfill(conn)
+        return count
+
+    try:
+        imported = db.submit_write(insert_rows).result()
+        # Legacy rows may predate sentiment scoring – score them in one batch
+        db.backfill_sentiment()
+        db.backfill_keywords()
     except Exception as e:
         logger.error(f"Error during import into encrypted DB: {e}")
         return imported
@@ -1,4 +1,6 @@
 import os
+import sys
+import json
 import argparse
 import logging
 from typing import Set
@@ -9,26 +11,67 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def open_encrypted_db(db_path: str, password: str | None = None) -> sqlcipher.Connection: # type: ignore[attr-defined]
+def open_encrypted_db(db_path: str, password: str | None = None, **kwargs) -> sqlcipher.Connection: # type: ignore[attr-defined]
     """Open a SQLite (SQLCipher) connection and apply the encryption key if provided.
 
     If ``password`` is ``None`` the connection is opened without a key (useful for testing).
+    Extra keyword arguments (e.g. ``check_same_thread``) are passed to ``connect``.
     """
-    conn = sqlcipher.connect(db_path) # type: ignore[attr-defined]
+    conn = sqlcipher.connect(db_path, **kwargs) # type: ignore[attr-defined]
     if password:
         conn.execute(f"PRAGMA key = '{password}';")
+        # Must be applied after the key and before the first read
+        for name, value in read_cipher_settings(db_path).items():
+            conn.execute(f"PRAGMA {name} = {int(value)};")
     return conn
 
 
+# SQLCipher 4 defaults; a journal migrated to other values records them in a sidecar file
+CIPHER_DEFAULTS = {"cipher_page_size": 4096, "kdf_iter": 256000}
+
+
+def cipher_settings_path(db_path: str) -> str:
+    """Sidecar file holding the SQLCipher settings ``db_path`` was written with.
+
+    The settings are needed before the key can be checked, so they can't be
+    stored inside the encrypted file. They are not secret.
+    """
+    return db_path + ".cipher.json"
+
+
+def read_cipher_settings(db_path: str) -> dict:
+    """SQLCipher settings recorded for ``db_path`` (empty for the defaults)."""
+    try:
+        with open(cipher_settings_path(db_path)) as f:
+            settings = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {name: int(settings[name]) for name in CIPHER_DEFAULTS if name in settings}
+
+
+def write_cipher_settings(db_path: str, settings: dict | None) -> None:
+    """Record ``settings`` for ``db_path``; the sidecar is removed when they are all defaults."""
+    path = cipher_settings_path(db_path)
+    settings = {name: int(value) for name, value in (settings or {}).items()
+                if name in CIPHER_DEFAULTS and CIPHER_DEFAULTS[name] != int(value)}
+    if not settings:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path + ".tmp", "w") as f:
+        json.dump(settings, f)
+    os.replace(path + ".tmp", path)
+
+
 def get_current_columns(db_path: str) -> Set[str]:
     """Return a set of column names for the ``entries`` table.
 
     If the table does not exist the returned set will be empty.
     """
-    # Prefer the password stored in Streamlit session state if available; fall back to env var
+    # Prefer the password stored in Streamlit session state if running in the app; fall back to env var
+    st = sys.modules.get("streamlit")
     try:
-        import streamlit as st
-        password = getattr(st.session_state, "db_password", None)
+        password = getattr(st.session_state, "db_password", None) if st else None
     except Exception:
         password = None
     if not password:
@@ -62,8 +105,23 @@ CREATE TABLE IF NOT EXISTS entries (
     sentiment REAL,
     entry_type TEXT NOT NULL,
     ai_insight TEXT,
-    weather_data TEXT
+    weather_data TEXT,
+    weather_id INTEGER REFERENCES weather_observations(id)
+);
+"""
+
+# Weather readings shared by every entry written at the same location and hour
+WEATHER_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS weather_observations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    location TEXT NOT NULL,
+    observed_hour TEXT NOT NULL,
+    temperature REAL,
+    humidity REAL,
+    description TEXT,
+    UNIQUE (location, observed_hour)
 );
+CREATE INDEX IF NOT EXISTS idx_entries_weather_id ON entries(weather_id);
 """
 
 # Expected column names – must match the CREATE_TABLE_SQL definition exactly
@@ -77,6 +135,7 @@ EXPECTED_COLUMNS: Set[str] = {
     "entry_type",
     "ai_insight",
     "weather_data",
+    "weather_id",
 }
 
 
@@ -87,6 +146,7 @@ def create_database(db_path: str) -> None:
     cur = conn.cursor()
     try:
         cur.executescript(CREATE_TABLE_SQL)
+        cur.executescript(WEATHER_TABLE_SQL)
         conn.commit()
         logger.info("Database file created with full schema.")
     finally:
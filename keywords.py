@@ -0,0 +1,228 @@
+"""Keywords and noun phrases of journal entries, for the Insights themes.
+
+Keywords are extracted once, when an entry is written, and stored in the
+``entry_keywords`` table together with the entry's date, so theme charts are
+aggregate queries over its indexes instead of re-reading every entry.
+Entries written before the table existed are filled in by
+:meth:`database.ReflectionDB.backfill_keywords`.
+"""
+import os
+import re
+import argparse
+import logging
+import threading
+from collections import Counter
+from typing import List, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Environment variable used to pick the extractor ("pattern" or "textblob")
+KEYWORD_BACKEND_ENV = "REFLECTIONS_KEYWORD_BACKEND"
+
+# Keywords kept per entry, most frequent first
+MAX_KEYWORDS = 10
+# Longest noun phrase kept, in words
+MAX_PHRASE_WORDS = 3
+# Entries read, extracted and written per backfill transaction
+KEYWORD_BACKFILL_BATCH = 500
+
+# Nouns too common in journal entries to be a theme
+GENERIC_NOUNS = frozenset({
+    "day", "today", "yesterday", "tomorrow", "tonight", "time", "thing", "lot", "bit", "way", "kind",
+    "sort", "something", "anything", "everything", "nothing", "someone", "everyone", "nobody", "week",
+})
+_WORD = re.compile(r"^[a-z][a-z'-]+$")
+
+# Run one statement at a time: the trigger body contains semicolons
+KEYWORD_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS entry_keywords (
+        entry_id INTEGER NOT NULL REFERENCES entries(id),
+        keyword TEXT NOT NULL,
+        date TEXT NOT NULL,
+        PRIMARY KEY (entry_id, keyword)
+    )
+    """,
+    # Top themes of a period (date range, grouped by keyword) ...
+    "CREATE INDEX IF NOT EXISTS idx_entry_keywords_date ON entry_keywords(date, keyword)",
+    # ... and the trend of a few themes (per keyword, date range)
+    "CREATE INDEX IF NOT EXISTS idx_entry_keywords_keyword ON entry_keywords(keyword, date)",
+    """
+    CREATE TRIGGER IF NOT EXISTS entry_keywords_delete AFTER DELETE ON entries BEGIN
+        DELETE FROM entry_keywords WHERE entry_id = old.id;
+    END
+    """,
+    # Entries in (done_through, pending_through] still need extracting
+    """
+    CREATE TABLE IF NOT EXISTS keyword_backfill (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        done_through INTEGER NOT NULL,
+        pending_through INTEGER NOT NULL
+    )
+    """,
+)
+
+
+class KeywordExtractor:
+    """Base class for keyword extractors.
+
+    Extractors return up to :data:`MAX_KEYWORDS` lowercase keywords and noun
+    phrases per text. Subclasses implement :meth:`extract_many`.
+    """
+
+    name = "base"
+
+    def extract(self, text: str) -> List[str]:
+        return self.extract_many([text])[0]
+
+    def extract_many(self, texts: Sequence[str]) -> List[List[str]]:
+        raise NotImplementedError
+
+
+def _rank(terms: List[str]) -> List[str]:
+    """Most frequent first, ties in order of appearance."""
+    counts = Counter(terms)
+    return sorted(counts, key=lambda term: -counts[term])[:MAX_KEYWORDS]
+
+
+class TextBlobKeywords(KeywordExtractor):
+    """Reference implementation: ``TextBlob.noun_phrases`` plus single nouns.
+
+    Needs the NLTK corpora (``python -m textblob.download_corpora``).
+    """
+
+    name = "textblob"
+
+    def extract_many(self, texts: Sequence[str]) -> List[List[str]]:
+        from textblob import TextBlob
+        results = []
+        for text in texts:
+            blob = TextBlob(text or "")
+            nouns = [word.singularize().lower() for word, tag in blob.tags if tag.startswith("NN")]
+            terms = [str(p) for p in blob.noun_phrases] + [n for n in nouns if n not in GENERIC_NOUNS]
+            results.append(_rank([t for t in terms if _WORD.match(t.split()[-1])]))
+        return results
+
+
+# Sessions extracting their first keywords at the same time load the tagger once
+_tagger_lock = threading.Lock()
+
+
+def _tagger():
+    with _tagger_lock:
+        from textblob.en import tag
+        from textblob.en.inflect import singularize
+        # The lexicon is loaded on first use
+        tag("warm up")
+    return tag, singularize
+
+
+class PatternKeywords(KeywordExtractor):
+    """Nouns and adjective/noun phrases from TextBlob's bundled Brill tagger.
+
+    Unlike :class:`TextBlobKeywords` it needs no NLTK corpora. Plural nouns
+    are singularized and generic nouns ("day", "thing") are skipped.
+    """
+
+    name = "pattern"
+
+    def _terms(self, tagged, singularize) -> List[str]:
+        terms = []
+        run = []  # consecutive adjectives/nouns: a candidate noun phrase
+
+        def close_run():
+            # Keep the phrase up to its last noun
+            while run and not run[-1][1]:
+                run.pop()
+            words = [w for w, _ in run][-MAX_PHRASE_WORDS:]
+            if len(words) > 1 and words[-1] not in GENERIC_NOUNS:
+                terms.append(" ".join(words))
+            run.clear()
+
+        for word, pos in tagged:
+            word = word.lower()
+            if not _WORD.match(word):
+                close_run()
+                continue
+            if pos.startswith("NN"):
+                noun = singularize(word) if pos.endswith("S") else word
+                run.append((noun, True))
+                if noun not in GENERIC_NOUNS:
+                    terms.append(noun)
+            elif pos.startswith("JJ"):
+                if run and run[-1][1]:
+                    close_run()
+                run.append((word, False))
+            else:
+                close_run()
+        close_run()
+        return terms
+
+    def extract_many(self, texts: Sequence[str]) -> List[List[str]]:
+        tag, singularize = _tagger()
+        return [_rank(self._terms(tag(text), singularize)) if text else [] for text in texts]
+
+
+_BACKENDS = {
+    TextBlobKeywords.name: TextBlobKeywords,
+    PatternKeywords.name: PatternKeywords,
+}
+
+
+def get_keyword_extractor(name: str | None = None) -> KeywordExtractor:
+    """Return a keyword extractor by name.
+
+    Falls back to the ``REFLECTIONS_KEYWORD_BACKEND`` environment variable and
+    then to the pattern extractor.
+    """
+    name = (name or os.getenv(KEYWORD_BACKEND_ENV) or PatternKeywords.name).lower()
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown keyword backend '{name}'. Choose from: {', '.join(sorted(_BACKENDS))}")
+    return _BACKENDS[name]()
+
+
+def ensure_keyword_tables(conn) -> bool:
+    """Create the keyword tables if needed; returns True if they were created.
+
+    Entries already in the journal are then marked for the backfill.
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'entry_keywords'").fetchone()
+    for statement in KEYWORD_SCHEMA:
+        conn.execute(statement)
+    conn.execute("INSERT OR IGNORE INTO keyword_backfill (id, done_through, pending_through) "
+                 "SELECT 1, 0, COALESCE(MAX(id), 0) FROM entries")
+    return exists is None
+
+
+def mark_for_backfill(conn):
+    """Mark every entry up to the newest for the backfill (after inserting rows directly)."""
+    conn.execute("UPDATE keyword_backfill SET pending_through = (SELECT COALESCE(MAX(id), 0) FROM entries)")
+
+
+def store_keywords(cursor, rows):
+    """Replace the keywords of each ``(entry_id, date, keywords)`` in ``rows``."""
+    rows = list(rows)
+    cursor.executemany('DELETE FROM entry_keywords WHERE entry_id = ?', [(row[0],) for row in rows])
+    cursor.executemany(
+        'INSERT OR IGNORE INTO entry_keywords (entry_id, keyword, date) VALUES (?, ?, ?)',
+        [(entry_id, keyword, date) for entry_id, date, keywords in rows for keyword in keywords]
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract keywords from journal entries written before themes existed.")
+    parser.add_argument("--password", help="Password (encryption key) for the SQLite database")
+    parser.add_argument("--journal", help="Journal name (default journal if omitted)")
+    args = parser.parse_args()
+    pwd = args.password
+    if not pwd:
+        import getpass
+        pwd = getpass.getpass('Enter database password (leave blank for none): ') or None
+    from database import ReflectionDB
+    journal_db = ReflectionDB(password=pwd, journal=args.journal, raise_errors=True)
+
+    def show(done, total):
+        print(f"\rExtracted keywords from {done:,}/{total:,} entries", end="", flush=True)
+
+    count = journal_db.backfill_keywords(progress=show)
+    print(f"\nBackfilled keywords for {count:,} entries")
@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import numpy as np
+
+from circuit_breaker import CircuitBreaker
+from errors import LLMTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Latency samples kept per model, and how many are needed before hedging on p95
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+DEFAULT_HEDGE_PERCENTILE = 95.0
+
+
+@dataclass
+class Route:
+    """Models serving one task (e.g. "quote" or "analysis").
+
+    ``fallback`` (usually a smaller, faster model) gets a hedged copy of the
+    request once ``model`` has been running longer than its observed
+    ``hedge_percentile`` latency or the ``latency_budget`` (seconds),
+    whichever comes first. The budget keeps the tail bounded when slow calls
+    are frequent enough to drag the percentile into the tail. Without a
+    fallback requests are never hedged.
+    """
+    model: str
+    fallback: str | None = None
+    latency_budget: float | None = None
+    hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE
+    # Seconds the caller waits for an answer in total (None: no limit)
+    deadline: float | None = None
+
+
+class LatencyTracker:
+    """Rolling window of call latencies per model."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: dict = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=self.window)).append(seconds)
+
+    def count(self, model: str) -> int:
+        with self._lock:
+            return len(self._samples.get(model, ()))
+
+    def percentile(self, model: str, p: float) -> float | None:
+        with self._lock:
+            samples = list(self._samples.get(model, ()))
+        return float(np.percentile(samples, p)) if samples else None
+
+
+class ModelRouter:
+    """Sends each task to its model and hedges slow requests to a fallback.
+
+    ``llm_factory(model)`` builds an LLM (anything with ``invoke(prompt)``);
+    instances are cached per model. The first successful answer wins; the
+    other request is left to finish in the background and only contributes
+    its latency. If the primary fails before the hedge point, the fallback is
+    tried straight away.
+
+    A request still unanswered at its route's ``deadline`` raises
+    :class:`~errors.LLMTimeoutError`. With a ``breaker``, requests that time
+    out or fail count towards opening it, and while it is open requests raise
+    :class:`~errors.CircuitOpenError` without calling any model.
+    """
+
+    def __init__(self, llm_factory: Callable[[str], Any], routes: dict, max_workers: int = 16,
+                 breaker: CircuitBreaker | None = None):
+        self.llm_factory = llm_factory
+        self.routes = routes
+        self.breaker = breaker
+        self.latency = LatencyTracker()
+        self.stats: dict = {task: {"requests": 0, "hedged": 0, "fallback_wins": 0, "timeouts": 0}
+                            for task in routes}
+        self._llms: dict = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+
+    def llm(self, model: str):
+        with self._lock:
+            if model not in self._llms:
+                self._llms[model] = self.llm_factory(model)
+            return self._llms[model]
+
+    def hedge_delay(self, route: Route) -> float | None:
+        """Seconds to wait on the primary before hedging (``None``: never)."""
+        if not route.fallback or route.fallback == route.model:
+            return None
+        if self.latency.count(route.model) < MIN_SAMPLES:
+            return route.latency_budget
+        observed = self.latency.percentile(route.model, route.hedge_percentile)
+        return observed if route.latency_budget is None else min(observed, route.latency_budget)
+
+    def _call(self, model: str, prompt: str):
+        start = time.perf_counter()
+        try:
+            return self.llm(model).invoke(prompt)
+        finally:
+            # Failures count too: a model that times out is slow
+            self.latency.record(model, time.perf_counter() - start)
+
+    def invoke(self, task: str, prompt: str, deadline: float | None = None) -> str:
+        """Answer ``prompt`` with the models routed for ``task``.
+
+        ``deadline`` (seconds) overrides the route's deadline for this call.
+        """
+        if self.breaker is not None:
+            self.breaker.check()
+        route = self.routes[task]
+        deadline = route.deadline if deadline is None else deadline
+        try:
+            result = self._invoke(task, route, prompt, deadline)
+        except Exception as e:
+            if self.breaker is not None:
+                self.breaker.record_failure(e)
+            raise
+        if self.breaker is not None:
+            self.breaker.record_success()
+        return result
+
+    def _invoke(self, task: str, route: Route, prompt: str, deadline: float | None) -> str:
+        stats = self.stats[task]
+        with self._lock:
+            stats["requests"] += 1
+        expires = None if deadline is None else time.monotonic() + deadline
+
+        def remaining(limit=None):
+            if expires is None:
+                return limit
+            left = max(0.0, expires - time.monotonic())
+            return left if limit is None else min(left, limit)
+
+        def timed_out():
+            with self._lock:
+                stats["timeouts"] += 1
+            return LLMTimeoutError(f"No answer for {task} within {deadline:g}s")
+
+        delay = self.hedge_delay(route)
+        primary = self._executor.submit(self._call, route.model, prompt)
+        if delay is None:
+            done, _pending = wait([primary], timeout=remaining())
+            if not done:
+                raise timed_out()
+            return primary.result()
+
+        done, _pending = wait([primary], timeout=remaining(delay))
+        if done and primary.exception() is None:
+            return primary.result()
+        if not done and expires is not None and remaining() == 0:
+            raise timed_out()
+        # Slow (or failed): race the fallback against the primary
+        logger.info(f"Hedging {task} request to {route.fallback} after {delay:.2f}s")
+        with self._lock:
+            stats["hedged"] += 1
+        futures = {primary: route.model, self._executor.submit(self._call, route.fallback, prompt): route.fallback}
+        error = None
+        while futures:
+            done, _pending = wait(list(futures), timeout=remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                raise timed_out()
+            for future in done:
+                model = futures.pop(future)
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                if model == route.fallback:
+                    with self._lock:
+                        stats["fallback_wins"] += 1
+                return future.result()
+        raise error
+
+    def snapshot(self) -> dict:
+        """Per-task routing stats, per-model p50/p95 latency and breaker state, for monitoring."""
+        models = {m for route in self.routes.values() for m in (route.model, route.fallback) if m}
+        with self._lock:
+            tasks = {task: dict(stats) for task, stats in self.stats.items()}
+        return {
+            "tasks": tasks,
+            "models": {m: {"samples": self.latency.count(m),
+                           "p50": self.latency.percentile(m, 50),
+                           "p95": self.latency.percentile(m, 95)} for m in sorted(models)},
+            "breaker": self.breaker.snapshot() if self.breaker is not None else None,
+        }
@@ -1,44 +1,115 @@
-import sqlite3
 import os
+import json
 import logging
+from initialize_db import open_encrypted_db, WEATHER_TABLE_SQL
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def weather_observation_id(cursor, weather, fallback_time=None):
+    """Return the id of the observation for ``weather``'s location and hour.
+
+    The row is created on first use; later readings for the same location and
+    hour reuse it. Returns ``None`` if ``weather`` is empty.
+    """
+    if not weather:
+        return None
+    location = str(weather.get("location") or "")
+    observed = weather.get("timestamp") or fallback_time or ""
+    observed_hour = observed[:13]  # YYYY-MM-DDTHH
+    cursor.execute('''
+        INSERT OR IGNORE INTO weather_observations (
+            location, observed_hour, temperature, humidity, description
+        )
+        VALUES (?, ?, ?, ?, ?)
+    ''', (
+        location, observed_hour, weather.get("temperature"),
+        weather.get("humidity"), weather.get("description")
+    ))
+    cursor.execute(
+        'SELECT id FROM weather_observations WHERE location = ? AND observed_hour = ?',
+        (location, observed_hour)
+    )
+    return cursor.fetchone()[0]
+
+
+def migrate_weather_observations(conn, commit=True):
+    """Move ``entries.weather_data`` JSON blobs into ``weather_observations``.
+
+    Adds the ``weather_id`` column and table if needed, links each entry to its
+    deduplicated observation and clears the blob. Returns the number of
+    entries migrated. The caller's connection is committed (unless ``commit``
+    is false, e.g. inside the writer's transaction) but not closed.
+    """
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(entries)")
+    columns = [column[1] for column in cursor.fetchall()]
+    if 'weather_id' not in columns:
+        logger.info("Adding weather_id column to entries table...")
+        cursor.execute('ALTER TABLE entries ADD COLUMN weather_id INTEGER REFERENCES weather_observations(id)')
+    # Statement by statement: executescript() would commit the caller's transaction
+    for statement in WEATHER_TABLE_SQL.split(";"):
+        if statement.strip():
+            cursor.execute(statement)
+
+    cursor.execute('SELECT id, date, weather_data FROM entries WHERE weather_data IS NOT NULL')
+    rows = cursor.fetchall()
+    migrated = 0
+    for entry_id, date, weather_data in rows:
+        try:
+            weather = json.loads(weather_data)
+        except (TypeError, ValueError):
+            logger.warning(f"Skipping unreadable weather data on entry {entry_id}")
+            continue
+        weather_id = weather_observation_id(cursor, weather, fallback_time=date)
+        cursor.execute(
+            'UPDATE entries SET weather_id = ?, weather_data = NULL WHERE id = ?',
+            (weather_id, entry_id)
+        )
+        migrated += 1
+    if commit:
+        conn.commit()
+    if migrated:
+        logger.info(f"Moved weather data of {migrated} entries into weather_observations")
+    return migrated
+
+
 def migrate_database():
     try:
         # Connect to the database
         # Ensure data directory exists
         data_dir = os.path.join(os.getcwd(), "data")
         os.makedirs(data_dir, exist_ok=True)
-        db_path = os.path.join(data_dir, "reflections.db")
+        db_path = os.getenv("REFLECTIONS_DB_PATH") or os.path.join(data_dir, "reflections.db")
         logger.info(f"Connecting to database at: {db_path}")
-        conn = sqlite3.connect(db_path)
+        conn = open_encrypted_db(db_path, os.getenv("REFLECTIONS_DB_PASSWORD"))
         cursor = conn.cursor()
 
         # Check if column exists
         cursor.execute("PRAGMA table_info(entries)")
         columns = [column[1] for column in cursor.fetchall()]
-        
+
         if 'ai_insight' not in columns:
             logger.info("Adding ai_insight column to entries table...")
-            
+
             # Add the new column
             cursor.execute('''
                 ALTER TABLE entries
                 ADD COLUMN ai_insight TEXT
             ''')
-            
+
         if 'weather_data' not in columns:
             logger.info("Adding weather_data column to entries table...")
             cursor.execute('ALTER TABLE entries ADD COLUMN weather_data TEXT')
-            
+
         conn.commit()
+        migrate_weather_observations(conn)
         logger.info("Database migration completed successfully")
-        
+
         conn.close()
-        
+
     except Exception as e:
         logger.error(f"Error during database migration: {str(e)}")
         raise e
@@ -48,4 +119,4 @@ if __name__ == "__main__":
         migrate_database()
         print("Migration completed successfully!")
     except Exception as e:
-        print(f"Migration failed: {str(e)}") 
\ No newline at end of file
+        print(f"Migration failed: {str(e)}")
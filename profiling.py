@@ -0,0 +1,164 @@
+import os
+import re
+import time
+import logging
+import cProfile
+import threading
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# "off" (default), "timing" (per-section wall time) or "cprofile" (also dump .prof files)
+PROFILE_ENV = "REFLECTIONS_PROFILE"
+PROFILE_MODES = ("off", "timing", "cprofile")
+DEFAULT_HISTORY = int(os.getenv("REFLECTIONS_PROFILE_HISTORY", "50"))
+# Number of slowest reruns whose .prof dumps are kept
+DEFAULT_KEEP_PROFILES = int(os.getenv("REFLECTIONS_PROFILE_KEEP", "5"))
+
+# The rerun being recorded on this thread (Streamlit runs each session's script on its own thread)
+_active = threading.local()
+
+
+@dataclass
+class RerunRecord:
+    """Timings of one rerun of the app script."""
+    page: str
+    started: datetime
+    total: float = 0.0
+    # Wall time per section name (inclusive of nested sections)
+    sections: dict = field(default_factory=dict)
+    # Time spent in outermost sections, to derive the unaccounted remainder
+    top_level: float = 0.0
+    profile_path: str | None = None
+    _depth: int = 0
+
+    @property
+    def other(self) -> float:
+        return max(0.0, self.total - self.top_level)
+
+
+@contextmanager
+def section(name: str):
+    """Time a named part of the current rerun; a no-op when not profiling."""
+    record = getattr(_active, "record", None)
+    if record is None:
+        yield
+        return
+    record._depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        record._depth -= 1
+        record.sections[name] = record.sections.get(name, 0.0) + elapsed
+        if record._depth == 0:
+            record.top_level += elapsed
+
+
+class RerunProfiler:
+    """Records the wall time of each rerun, split by :func:`section`.
+
+    In ``"cprofile"`` mode every rerun also runs under :mod:`cProfile`, and the
+    stats of the ``keep_profiles`` slowest reruns so far are written to
+    ``profile_dir`` as ``.prof`` files (open them with ``python -m pstats`` or
+    snakeviz); faster dumps are deleted as slower reruns replace them.
+    """
+
+    def __init__(self, mode: str | None = None, profile_dir: str | None = None,
+                 history: int = DEFAULT_HISTORY, keep_profiles: int = DEFAULT_KEEP_PROFILES):
+        mode = (mode or os.getenv(PROFILE_ENV) or "off").lower()
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}'. Choose from: {', '.join(PROFILE_MODES)}")
+        self.mode = mode
+        self.profile_dir = profile_dir or os.getenv("REFLECTIONS_PROFILE_DIR") or \
+            os.path.join(os.getcwd(), 'data', 'profiles')
+        self.keep_profiles = keep_profiles
+        self.records: "deque[RerunRecord]" = deque(maxlen=history)
+        # Dumped profiles, slowest first: [(total, path)]
+        self._dumps: list = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def rerun(self, page=None):
+        """Context manager wrapping one rerun of the app.
+
+        ``page`` is a label or a callable returning one, evaluated when the
+        rerun ends (navigation may change the page mid-run). The rerun is
+        recorded even if it ends with an exception, e.g. ``st.rerun()``.
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._rerun(page)
+
+    @contextmanager
+    def _rerun(self, page):
+        record = RerunRecord(page="", started=datetime.now())
+        profiler = cProfile.Profile() if self.mode == "cprofile" else None
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:  # another profiler is active on this thread
+                profiler = None
+        _active.record = record
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.total = time.perf_counter() - start
+            _active.record = None
+            if profiler is not None:
+                profiler.disable()
+            record.page = str((page() if callable(page) else page) or "")
+            if profiler is not None:
+                self._maybe_dump(record, profiler)
+            self.records.append(record)
+            logger.debug(f"Rerun of {record.page or 'app'} took {record.total * 1000:.0f} ms")
+
+    def _maybe_dump(self, record, profiler):
+        if len(self._dumps) >= self.keep_profiles and record.total <= self._dumps[-1][0]:
+            return
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", record.page).strip("-").lower() or "app"
+        path = os.path.join(self.profile_dir,
+                            f"rerun-{record.started:%Y%m%d-%H%M%S-%f}-{slug}-{record.total * 1000:.0f}ms.prof")
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profiler.dump_stats(path)
+        except OSError as e:
+            logger.warning(f"Could not write profile {path}: {str(e)}")
+            return
+        record.profile_path = path
+        self._dumps.append((record.total, path))
+        self._dumps.sort(key=lambda item: item[0], reverse=True)
+        for _total, stale in self._dumps[self.keep_profiles:]:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+        del self._dumps[self.keep_profiles:]
+
+    def slowest(self, n: int = 5) -> list:
+        """The ``n`` slowest of the recent reruns, slowest first."""
+        return sorted(self.records, key=lambda r: r.total, reverse=True)[:n]
+
+    def summary(self, n: int = 5) -> list:
+        """Rows describing the slowest recent reruns (for display)."""
+        rows = []
+        for record in self.slowest(n):
+            sections = sorted(record.sections.items(), key=lambda item: item[1], reverse=True)
+            rows.append({
+                "time": record.started.strftime("%H:%M:%S"),
+                "page": record.page,
+                "total_ms": round(record.total * 1000, 1),
+                "sections": ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in sections[:4]),
+                "other_ms": round(record.other * 1000, 1),
+                # Dumps of reruns pushed out by slower ones have been deleted
+                "profile": os.path.basename(record.profile_path)
+                if record.profile_path and os.path.exists(record.profile_path) else "",
+            })
+        return rows
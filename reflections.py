@@ -0,0 +1,203 @@
+"""Headless command line interface to a reflections journal.
+
+Usage: python -m reflections [--journal NAME] <command> ...
+
+Commands: add, list, search, export, analyze. The password comes from
+``--password``, ``REFLECTIONS_DB_PASSWORD`` or an interactive prompt. Nothing
+here imports Streamlit.
+"""
+import os
+import sys
+import csv
+import json
+import logging
+import argparse
+from errors import ReflectionsError
+from database import ReflectionDB
+from write_queue import close_all_writers
+
+logger = logging.getLogger(__name__)
+
+# Columns written by `export` and `list --format json`
+EXPORT_COLUMNS = [
+    "id", "date", "content", "mood", "mood_factors", "sentiment", "entry_type", "ai_insight",
+    "temperature", "humidity", "weather_description", "weather_location",
+]
+
+
+def open_journal(args):
+    password = args.password or os.getenv("REFLECTIONS_DB_PASSWORD")
+    if password is None and sys.stdin.isatty():
+        import getpass
+        password = getpass.getpass('Enter database password (leave blank for none): ') or None
+    return ReflectionDB(password=password, journal=args.journal, raise_errors=True)
+
+
+def _entry_record(content, mood=3, mood_factors=None, ai_insight=None):
+    mood = int(mood)
+    if not 1 <= mood <= 5:
+        raise ReflectionsError(f"Mood must be between 1 and 5, got {mood}")
+    if not content or not content.strip():
+        raise ReflectionsError("Entry content is empty")
+    if isinstance(mood_factors, list):
+        mood_factors = ", ".join(mood_factors)
+    return {"content": content, "mood": mood, "mood_factors": mood_factors or None, "ai_insight": ai_insight}
+
+
+def _read_jsonl(path):
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield _entry_record(**json.loads(line))
+            except (ValueError, TypeError) as e:
+                raise ReflectionsError(f"{path}:{line_no}: invalid entry: {str(e)}") from e
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def cmd_add(db, args):
+    if args.jsonl:
+        records = list(_read_jsonl(args.jsonl))
+    else:
+        content = args.content if args.content is not None else sys.stdin.read().rstrip("\n")
+        records = [_entry_record(content, args.mood, args.factors)]
+    if args.insight:
+        from ai_services import AIService
+        ai_service = AIService()
+        for record in records:
+            if not record["ai_insight"]:
+                record["ai_insight"] = ai_service.analyze_entry(record["content"], record["mood"],
+                                                                record["mood_factors"])
+    # One transaction for the whole batch
+    ids = db.add_entries(records)
+    if len(ids) == 1:
+        print(f"Added entry {ids[0]}")
+    else:
+        print(f"Added {len(ids)} entries")
+
+
+def _print_entries(entries, fmt):
+    if fmt == "json":
+        print(json.dumps([{c: e.get(c) for c in EXPORT_COLUMNS} for e in entries], indent=2, ensure_ascii=False))
+        return
+    for entry in entries:
+        sentiment = f"{entry['sentiment']:+.2f}" if entry.get("sentiment") is not None else "  n/a"
+        first_line = (entry["content"] or "").strip().splitlines()[0] if entry["content"] else ""
+        if len(first_line) > 60:
+            first_line = first_line[:57] + "..."
+        print(f"{entry['id']:>6}  {entry['date'][:16]}  mood {entry['mood']}  {sentiment}  {first_line}")
+
+
+def cmd_list(db, args):
+    _print_entries(db.get_entries(limit=args.limit), args.format)
+
+
+def cmd_search(db, args):
+    _print_entries(db.search_entries(args.text, limit=args.limit), args.format)
+
+
+def cmd_export(db, args):
+    entries = db.get_entries(limit=-1)
+    out = sys.stdout if args.output in (None, "-") else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        if args.format == "csv":
+            writer = csv.DictWriter(out, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(entries)
+        else:
+            json.dump([{c: e.get(c) for c in EXPORT_COLUMNS} for e in entries], out, indent=2, ensure_ascii=False)
+            out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if out is not sys.stdout:
+        print(f"Exported {len(entries)} entries to {args.output}", file=sys.stderr)
+
+
+def cmd_analyze(db, args):
+    report = {
+        "stats": db.entry_stats(),
+        "weather_correlations": db.weather_mood_correlations(),
+        "mood_by_temperature": db.mood_by_temperature(),
+    }
+    if args.format == "json":
+        print(json.dumps(report, indent=2))
+        return
+    stats = report["stats"]
+    print(f"Entries:           {stats['entries']}")
+    if stats["entries"]:
+        print(f"Period:            {stats['first_date'][:10]} – {stats['last_date'][:10]}")
+        print(f"Average mood:      {stats['avg_mood']:.2f} / 5")
+        if stats["avg_sentiment"] is not None:
+            print(f"Average sentiment: {stats['avg_sentiment']:+.2f}")
+    correlations = report["weather_correlations"]
+    for name in ("temperature", "humidity"):
+        value = correlations[name]
+        shown = f"{value:+.2f}" if value is not None else "n/a"
+        print(f"Mood vs {name + ':':<13} {shown} ({correlations['entries']} entries with weather)")
+    for band in report["mood_by_temperature"]:
+        print(f"  {band['temperature_band']:>4}–{band['temperature_band'] + 9}°F: "
+              f"mood {band['avg_mood']:.2f} ({band['entries']} entries)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="reflections", description="Work with a reflections journal from the shell.")
+    parser.add_argument("--journal", help="Journal name (default journal if omitted)")
+    parser.add_argument("--password", help="Password (encryption key); defaults to REFLECTIONS_DB_PASSWORD")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show info logging")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Add an entry (text argument, stdin or --jsonl)")
+    add.add_argument("content", nargs="?", help="Entry text; read from stdin if omitted")
+    add.add_argument("--mood", type=int, default=3, help="Mood from 1 to 5 (default 3)")
+    add.add_argument("--factors", help="Comma-separated mood factors")
+    add.add_argument("--jsonl", metavar="FILE",
+                     help="Add one entry per JSON line ({content, mood, mood_factors, ai_insight}); '-' for stdin")
+    add.add_argument("--insight", action="store_true", help="Generate an AI insight for each entry")
+    add.set_defaults(func=cmd_add)
+
+    for name, func, help_text in (("list", cmd_list, "Show the newest entries"),
+                                  ("search", cmd_search, "Find entries containing some text")):
+        sub = commands.add_parser(name, help=help_text)
+        if name == "search":
+            sub.add_argument("text")
+        sub.add_argument("--limit", type=int, default=10 if name == "list" else 50)
+        sub.add_argument("--format", choices=["table", "json"], default="table")
+        sub.set_defaults(func=func)
+
+    export = commands.add_parser("export", help="Export every entry as JSON or CSV")
+    export.add_argument("--format", choices=["json", "csv"], default="json")
+    export.add_argument("-o", "--output", help="Output file (default stdout)")
+    export.set_defaults(func=cmd_export)
+
+    analyze = commands.add_parser("analyze", help="Mood statistics and weather correlations")
+    analyze.add_argument("--format", choices=["text", "json"], default="text")
+    analyze.set_defaults(func=cmd_analyze)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    # Core modules log at INFO; keep the CLI's output clean unless asked
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    try:
+        db = open_journal(args)
+        args.func(db, args)
+        return 0
+    except ReflectionsError as e:
+        print(f"error: {str(e)}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # Output piped into e.g. `head`; silence the flush at interpreter exit
+        sys.stdout = open(os.devnull, "w")
+        return 0
+    finally:
+        close_all_writers()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
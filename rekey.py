@@ -0,0 +1,219 @@
+"""Re-encrypt a journal with a new password or SQLCipher settings, online.
+
+The rows are copied in chunks into a new file keyed with the target password
+and ``cipher_page_size`` / ``kdf_iter``, from a read snapshot of the journal,
+so the app keeps reading and writing meanwhile (WAL mode). The copy is then
+verified and swapped in while the journal's writer is paused. If the journal
+changed during the copy it is copied again; the last attempt holds writes.
+"""
+import os
+import re
+import time
+import argparse
+import logging
+import hashlib
+from initialize_db import CIPHER_DEFAULTS, open_encrypted_db, read_cipher_settings, write_cipher_settings
+from backup import rebind_scheduler, verify_snapshot
+from connection_pool import get_pool
+from write_queue import discard_writer
+
+logger = logging.getLogger(__name__)
+
+# Rows copied per step; progress is reported after each step
+REKEY_ROWS_PER_CHUNK = 5000
+# Online copies tried before the final copy is made with writes held
+REKEY_ONLINE_ATTEMPTS = 3
+VALID_PAGE_SIZES = (1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+_CREATE = re.compile(r"^(CREATE (?:UNIQUE )?(?:TABLE|INDEX|TRIGGER|VIEW) )", re.IGNORECASE)
+
+
+def target_settings(db, page_size: int | None = None, kdf_iter: int | None = None) -> dict:
+    """The journal's current cipher settings with ``page_size`` / ``kdf_iter`` applied."""
+    if page_size is not None and page_size not in VALID_PAGE_SIZES:
+        raise ValueError(f"cipher_page_size must be one of {', '.join(map(str, VALID_PAGE_SIZES))}")
+    if kdf_iter is not None and kdf_iter < 1:
+        raise ValueError("kdf_iter must be positive")
+    settings = {**CIPHER_DEFAULTS, **read_cipher_settings(db.db_path)}
+    if page_size is not None:
+        settings["cipher_page_size"] = page_size
+    if kdf_iter is not None:
+        settings["kdf_iter"] = kdf_iter
+    return settings
+
+
+def _data_version(conn) -> int:
+    return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+def _in_target(sql: str) -> str:
+    """``sql`` (a CREATE statement from ``sqlite_master``) creating the object in the ``rekey`` schema."""
+    qualified, found = _CREATE.subn(r"\1rekey.", sql, count=1)
+    if not found:
+        raise ValueError(f"Unsupported schema object: {sql.splitlines()[0]}")
+    return qualified
+
+
+def _copy(src, dest: str, password: str | None, settings: dict, rows_per_chunk: int, progress=None) -> dict:
+    """Copy every object of ``src`` into a new database at ``dest``; returns the rows per table.
+
+    Everything is read inside one transaction, i.e. from a single snapshot.
+    """
+    for path in (dest, dest + "-journal"):
+        if os.path.exists(path):
+            os.remove(path)
+    src.execute("ATTACH DATABASE ? AS rekey KEY ?", (dest, password or ""))
+    try:
+        if password:
+            for name, value in settings.items():
+                src.execute(f"PRAGMA rekey.{name} = {int(value)}")
+        # The file is verified before use and deleted on failure, so it needs no rollback journal
+        src.execute("PRAGMA rekey.journal_mode = OFF")
+        src.execute("BEGIN")
+        try:
+            schema = src.execute("SELECT type, name, sql FROM main.sqlite_master "
+                                 "WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'").fetchall()
+            tables = [name for kind, name, _ in schema if kind == "table"]
+            counts = {name: src.execute(f'SELECT COUNT(*) FROM main."{name}"').fetchone()[0] for name in tables}
+            total, copied = sum(counts.values()), 0
+            for kind, _, sql in schema:
+                if kind == "table":
+                    src.execute(_in_target(sql))
+            for name in tables:
+                last = None
+                while True:
+                    after = "" if last is None else "WHERE rowid > ?"
+                    params = () if last is None else (last,)
+                    end, rows = src.execute(f'SELECT MAX(rowid), COUNT(*) FROM (SELECT rowid FROM main."{name}" '
+                                            f'{after} ORDER BY rowid LIMIT ?)', params + (rows_per_chunk,)).fetchone()
+                    if not rows:
+                        break
+                    bounds = "rowid <= ?" if last is None else "rowid > ? AND rowid <= ?"
+                    src.execute(f'INSERT INTO rekey."{name}" SELECT * FROM main."{name}" WHERE {bounds}',
+                                params + (end,))
+                    last = end
+                    copied += rows
+                    if progress:
+                        progress(copied, total)
+            if src.execute("SELECT 1 FROM main.sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+                # AUTOINCREMENT counters survive deletes of the newest rows
+                src.execute("DELETE FROM rekey.sqlite_sequence")
+                src.execute("INSERT INTO rekey.sqlite_sequence SELECT * FROM main.sqlite_sequence")
+            # Indexes are built once the rows are in; triggers must not fire during the copy
+            for kind, _, sql in schema:
+                if kind != "table":
+                    src.execute(_in_target(sql))
+            src.execute(f"PRAGMA rekey.user_version = {src.execute('PRAGMA main.user_version').fetchone()[0]}")
+            src.execute("COMMIT")
+        except Exception:
+            src.execute("ROLLBACK")
+            raise
+    finally:
+        src.execute("DETACH DATABASE rekey")
+    if progress and not total:
+        progress(0, 0)
+    return counts
+
+
+def _verify(path: str, password: str | None, counts: dict):
+    """Raise ``RuntimeError`` unless ``path`` passes :func:`backup.verify_snapshot` and has every row."""
+    verify_snapshot(path, password)
+    conn = open_encrypted_db(path, password)
+    try:
+        for name, expected in counts.items():
+            actual = conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+            if actual != expected:
+                raise RuntimeError(f"Re-encrypted copy of {name} has {actual} rows, expected {expected}")
+        conn.execute("PRAGMA journal_mode = WAL")
+    finally:
+        conn.close()
+
+
+def rekey_database(db, new_password: str | None = None, page_size: int | None = None,
+                   kdf_iter: int | None = None, rows_per_chunk: int = REKEY_ROWS_PER_CHUNK,
+                   attempts: int = REKEY_ONLINE_ATTEMPTS, progress=None) -> dict:
+    """Re-encrypt ``db`` with ``new_password`` (default: keep it) and the given cipher settings.
+
+    ``progress(copied_rows, total_rows)`` is called after each chunk. The
+    swap closes the journal's connections; with a new password, sessions
+    still using the old one can no longer open the journal and must sign in
+    again. Returns ``{"settings", "rows", "attempts", "bytes", "seconds"}``.
+    """
+    start = time.perf_counter()
+    password = new_password or db.password
+    settings = target_settings(db, page_size, kdf_iter) if password else {}
+    tmp = db.db_path + ".rekey"
+    src = open_encrypted_db(db.db_path, db.password)
+    src.isolation_level = None  # transactions are managed explicitly
+    try:
+        for attempt in range(1, attempts + 1):
+            version = _data_version(src)
+            counts = _copy(src, tmp, password, settings, rows_per_chunk, progress)
+            with db.writer.paused():
+                with db.connection() as conn:
+                    changed = _data_version(src) != version
+                    if changed and attempt < attempts:
+                        logger.info(f"{db.db_path} changed during re-encryption; copying again")
+                        continue
+                    if changed:
+                        # Still changing: make the last copy while writes wait
+                        counts = _copy(src, tmp, password, settings, rows_per_chunk, progress)
+                    write_cipher_settings(tmp, settings)
+                    _verify(tmp, password, counts)
+                    # Nothing of the old file may survive in a WAL next to the new one
+                    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                    conn.close()
+                    src.close()
+                    os.replace(tmp, db.db_path)
+                    write_cipher_settings(db.db_path, settings)
+                    write_cipher_settings(tmp, None)
+            break
+    except Exception:
+        for path in (tmp, tmp + "-journal"):
+            if os.path.exists(path):
+                os.remove(path)
+        write_cipher_settings(tmp, None)
+        raise
+    finally:
+        src.close()
+    if password != db.password:
+        # Connections opened with the old key are useless now
+        discard_writer(db._pool_key)
+        get_pool().discard(db._pool_key)
+        db.password = password
+        db._pool_key = (os.path.abspath(db.db_path), hashlib.sha256(password.encode()).hexdigest())
+        # Scheduled backups of this journal need the new key too
+        rebind_scheduler(db)
+    report = {"settings": settings, "rows": sum(counts.values()), "attempts": attempt,
+              "bytes": os.path.getsize(db.db_path), "seconds": time.perf_counter() - start}
+    logger.info(f"Re-encrypted {db.db_path} ({report['rows']} rows, {report['bytes']} bytes) "
+                f"in {report['seconds']:.2f}s")
+    return report
+
+
+if __name__ == "__main__":
+    import getpass
+    parser = argparse.ArgumentParser(description="Re-encrypt a reflections journal with a new password or cipher settings.")
+    parser.add_argument("--password", help="Current password (encryption key) for the SQLite database")
+    parser.add_argument("--journal", help="Journal name (default journal if omitted)")
+    parser.add_argument("--new-password", action="store_true", help="Prompt for a new password")
+    parser.add_argument("--page-size", type=int, choices=VALID_PAGE_SIZES, help="Target cipher_page_size")
+    parser.add_argument("--kdf-iter", type=int, help="Target kdf_iter (PBKDF2 iterations)")
+    args = parser.parse_args()
+    pwd = args.password or getpass.getpass('Enter database password (leave blank for none): ') or None
+    new_pwd = None
+    if args.new_password:
+        new_pwd = getpass.getpass('New password: ')
+        if not new_pwd or new_pwd != getpass.getpass('Repeat new password: '):
+            parser.error("the new passwords are empty or don't match")
+    from database import ReflectionDB
+    journal_db = ReflectionDB(password=pwd, journal=args.journal, raise_errors=True)
+
+    def show(copied, total):
+        print(f"\rCopied {copied:,}/{total:,} rows ({copied / total if total else 1:.0%})", end="", flush=True)
+
+    result = rekey_database(journal_db, new_pwd, args.page_size, args.kdf_iter, progress=show)
+    print()
+    settings = ", ".join(f"{k}={v}" for k, v in result["settings"].items()) or "unencrypted"
+    print(f"Re-encrypted {result['rows']:,} rows ({result['bytes']:,} bytes, {settings}) "
+          f"in {result['seconds']:.2f}s")
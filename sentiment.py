@@ -0,0 +1,230 @@
+import os
+import re
+import json
+import logging
+import threading
+from importlib import metadata
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Environment variable used to pick the default backend ("lexicon" or "textblob")
+SENTIMENT_BACKEND_ENV = "REFLECTIONS_SENTIMENT_BACKEND"
+
+# Characters TextBlob's tokenizer splits off the start/end of a word
+_PUNCTUATION = ".,;:!?()[]{}`''\"@#$^&*+-|=~_"
+_QUOTES = re.compile("([“”‘’'\"])")
+
+
+class SentimentBackend:
+    """Base class for sentiment scorers.
+
+    Backends return a polarity between -1.0 and 1.0 for each text. Subclasses
+    implement :meth:`score_many`; :meth:`score` is a convenience wrapper.
+    """
+
+    name = "base"
+
+    def score(self, text: str) -> float:
+        return self.score_many([text])[0]
+
+    def score_many(self, texts: Sequence[str]) -> List[float]:
+        raise NotImplementedError
+
+
+class TextBlobSentiment(SentimentBackend):
+    """Reference implementation: one ``TextBlob`` per text."""
+
+    name = "textblob"
+
+    def score_many(self, texts: Sequence[str]) -> List[float]:
+        from textblob import TextBlob
+        return [float(TextBlob(t or "").sentiment.polarity) for t in texts]  # type: ignore[attr-defined]
+
+
+# Sessions scoring their first entry at the same time compile the lexicon once
+_lexicon_lock = threading.Lock()
+
+
+def _lexicon():
+    with _lexicon_lock:
+        return _compiled_lexicon()
+
+
+@lru_cache(maxsize=1)
+def _compiled_lexicon() -> Tuple[Dict[str, Tuple[float, float, bool]], Dict[str, float], frozenset]:
+    """Flatten TextBlob's pattern lexicon into plain lookup tables.
+
+    Returns ``(words, emoticons, negations)`` where ``words`` maps a lowercase
+    word to ``(polarity, intensity, is_modifier)``. The tables are cached as
+    JSON per TextBlob version (see :func:`_lexicon_cache_path`), since importing
+    TextBlob costs more than all the scoring a short script does.
+    """
+    cache_path = _lexicon_cache_path()
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            words = {w: (p, i, bool(m)) for w, (p, i, m) in cached["words"].items()}
+            return words, cached["emoticons"], frozenset(cached["negations"])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable sentiment lexicon cache: {str(e)}")
+
+    from textblob.en import sentiment as pattern_sentiment
+    from textblob._text import EMOTICONS
+
+    pattern_sentiment.load()
+    words = {}
+    for word, tags in pattern_sentiment.items():
+        if " " in word or None not in tags:
+            continue
+        polarity, _subjectivity, intensity = tags[None]
+        words[word] = (float(polarity), float(intensity), "RB" in tags)
+    emoticons = {}
+    for (_label, polarity), faces in EMOTICONS.items():
+        for face in faces:
+            emoticons[face.lower()] = float(polarity)
+    negations = frozenset(pattern_sentiment.negations)
+    logger.info(f"Compiled sentiment lexicon with {len(words)} words")
+    if cache_path:
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"words": words, "emoticons": emoticons, "negations": sorted(negations)}, f)
+            os.replace(tmp, cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write sentiment lexicon cache: {str(e)}")
+    return words, emoticons, negations
+
+
+def _lexicon_cache_path() -> str | None:
+    """``REFLECTIONS_CACHE_DIR`` (default ``data/cache``)/lexicon-<textblob version>.json.
+
+    ``None`` (no caching) if TextBlob isn't installed or the directory is set to "".
+    """
+    cache_dir = os.getenv("REFLECTIONS_CACHE_DIR", os.path.join(os.getcwd(), "data", "cache"))
+    if not cache_dir:
+        return None
+    try:
+        version = metadata.version("textblob")
+    except metadata.PackageNotFoundError:
+        return None
+    return os.path.join(cache_dir, f"lexicon-textblob-{version}.json")
+
+
+class LexiconSentiment(SentimentBackend):
+    """Batch scorer built from TextBlob's lexicon.
+
+    Applies the same rules as TextBlob's pattern analyzer (modifiers such as
+    "very", negations, exclamation boosts and emoticons) with a lightweight
+    tokenizer, then averages the polarity of every text in a single numpy pass.
+    """
+
+    name = "lexicon"
+
+    def _tokens(self, text: str, emoticons) -> List[str]:
+        tokens = []
+        for raw in _QUOTES.sub(r" \1 ", text.lower()).split():
+            if raw in emoticons or raw == "(!)":
+                tokens.append(raw)
+                continue
+            tail = []
+            while raw and raw[0] in _PUNCTUATION:
+                tokens.append(raw[0])
+                raw = raw[1:]
+            while raw and raw[-1] in _PUNCTUATION:
+                if raw.endswith("..."):
+                    tail.append("...")
+                    raw = raw[:-3].rstrip(".")
+                else:
+                    tail.append(raw[-1])
+                    raw = raw[:-1]
+            if raw:
+                tokens.append(raw)
+            tokens.extend(reversed(tail))
+        return tokens
+
+    def score_many(self, texts: Sequence[str]) -> List[float]:
+        # Built on first use: reading the lexicon imports TextBlob, which is slow
+        words, emoticons, negations = _lexicon()
+        # One row per assessment: owning text, polarity, intensity, negated
+        docs: List[int] = []
+        pols: List[float] = []
+        intens: List[float] = []
+        negs: List[bool] = []
+        for doc, text in enumerate(texts):
+            first = len(pols)
+            modifier = None
+            negation = None
+            for w in self._tokens(text or "", emoticons):
+                known = words.get(w)
+                if known is not None:
+                    p, i, is_modifier = known
+                    if modifier is None:
+                        docs.append(doc)
+                        pols.append(p)
+                        intens.append(i)
+                        negs.append(False)
+                    else:
+                        pols[-1] = max(-1.0, min(p * intens[-1], 1.0))
+                        intens[-1] = i
+                    if negation is not None:
+                        intens[-1] = 1.0 / intens[-1]
+                        negs[-1] = True
+                    modifier = w if is_modifier else None
+                    negation = w if w in negations else None
+                    continue
+                if w in negations:
+                    negation = w
+                elif negation and len(w.strip("'")) > 1:
+                    negation = None
+                if negation is not None and modifier is not None and modifier.endswith("ly"):
+                    negs[-1] = True
+                    negation = None
+                elif modifier and len(w) > 2:
+                    modifier = None
+                if w == "!" and len(pols) > first:
+                    pols[-1] = max(-1.0, min(pols[-1] * 1.25, 1.0))
+                elif w == "(!)":
+                    docs.append(doc)
+                    pols.append(0.0)
+                    intens.append(1.0)
+                    negs.append(False)
+                elif w in emoticons and not w.isalpha():
+                    docs.append(doc)
+                    pols.append(emoticons[w])
+                    intens.append(1.0)
+                    negs.append(False)
+
+        n = len(texts)
+        if not pols:
+            return [0.0] * n
+        doc_idx = np.asarray(docs, dtype=np.intp)
+        polarity = np.asarray(pols, dtype=np.float64)
+        # "not good" = slightly bad, "not bad" = slightly good
+        polarity = np.where(np.asarray(negs), polarity * -0.5, polarity)
+        totals = np.bincount(doc_idx, weights=polarity, minlength=n)
+        counts = np.bincount(doc_idx, minlength=n)
+        return (totals / np.maximum(counts, 1)).tolist()
+
+
+_BACKENDS = {
+    TextBlobSentiment.name: TextBlobSentiment,
+    LexiconSentiment.name: LexiconSentiment,
+}
+
+
+def get_sentiment_backend(name: str | None = None) -> SentimentBackend:
+    """Return a sentiment backend by name.
+
+    Falls back to the ``REFLECTIONS_SENTIMENT_BACKEND`` environment variable and
+    then to the lexicon scorer.
+    """
+    name = (name or os.getenv(SENTIMENT_BACKEND_ENV) or LexiconSentiment.name).lower()
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown sentiment backend '{name}'. Choose from: {', '.join(sorted(_BACKENDS))}")
+    return _BACKENDS[name]()
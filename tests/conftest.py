@@ -16,3 +16,8 @@ def set_db_path(temp_dir, monkeypatch):
         os.remove(db_path)
     monkeypatch.setenv("REFLECTIONS_DB_PATH", db_path)
     yield db_path
+
+@pytest.fixture(autouse=True)
+def isolate_cache_dir(temp_dir, monkeypatch):
+    """Keep derived caches (e.g. the compiled sentiment lexicon) out of the working tree."""
+    monkeypatch.setenv("REFLECTIONS_CACHE_DIR", os.path.join(temp_dir, "cache"))
@@ -0,0 +1,113 @@
+import sys, os
+import sqlite3
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import analytics_snapshot
+from analytics_snapshot import AnalyticsSnapshot, get_snapshot
+from database import ReflectionDB
+from connection_pool import get_pool
+from write_queue import close_all_writers
+
+@pytest.fixture
+def db(set_db_path, temp_dir, monkeypatch):
+    monkeypatch.setattr("database.open_encrypted_db", lambda db_path, pwd=None, **kwargs: sqlite3.connect(db_path, **kwargs))
+    monkeypatch.setenv("REFLECTIONS_ANALYTICS_SNAPSHOT", "1")
+    monkeypatch.setenv("REFLECTIONS_SNAPSHOT_DIR", os.path.join(temp_dir, "snapshots"))
+    get_snapshot(set_db_path).remove()
+    yield ReflectionDB()
+    close_all_writers()
+    get_pool().close_all()
+
+def fresh_load(db):
+    # A new snapshot object has no in-memory frame: this reads the segment files
+    return AnalyticsSnapshot(db.snapshot.directory).load(db)
+
+def test_snapshot_matches_journal(db):
+    db.add_entry("A good day", 4, "work, sleep")
+    db.add_entry("A hard day", 2, None)
+    frame = db.analytics_frame()
+    assert list(frame.columns) == ["id", "date", "mood", "sentiment", "mood_factors"]
+    assert frame["mood"].tolist() == [4, 2]
+    assert frame["mood_factors"].tolist()[0] == "work, sleep"
+    assert frame["date"].is_monotonic_increasing
+    assert os.path.exists(db.snapshot.manifest_path)
+
+def test_changes_are_appended_incrementally(db):
+    for mood in (1, 2, 3):
+        db.add_entry(f"Entry {mood}", mood, None)
+    first = db.analytics_frame()
+    assert db.analytics_frame() is first  # unchanged: served from memory
+    ids = first["id"].tolist()
+    db.add_entry("Entry 4", 4, None)
+    db.update_entry(ids[0], "Edited", 5, "family")
+    db.delete_entry(ids[1])
+    manifest = db.snapshot.refresh(db)
+    assert len(manifest["segments"]) == 2 and manifest["dedup"]
+    frame = fresh_load(db)
+    assert frame["mood"].tolist() == [5, 3, 4]
+    assert frame["mood_factors"].tolist()[0] == "family"
+    # The change log is pruned once the snapshot has caught up
+    close_all_writers()
+    with db.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM entry_changes").fetchone()[0] == 0
+
+def test_text_only_updates_are_not_logged(db):
+    db.add_entry("Entry", 3, None)
+    db.analytics_frame()
+    seq = db.snapshot.refresh(db)["seq"]
+    db._write(lambda conn: conn.execute("UPDATE entries SET content = 'Recompressed'"))
+    assert db.snapshot.refresh(db)["seq"] == seq
+
+def test_segments_are_compacted(db, monkeypatch):
+    monkeypatch.setattr(analytics_snapshot, "MAX_SEGMENTS", 3)
+    db.add_entry("Entry", 3, None)
+    for mood in (1, 2, 3, 4):
+        db.analytics_frame()
+        db.update_entry(int(db.analytics_frame()["id"].iloc[0]), "Entry", mood, None)
+    manifest = db.snapshot.refresh(db)
+    assert len(manifest["segments"]) <= 3
+    assert fresh_load(db)["mood"].tolist() == [4]
+    # Superseded segment files are gone
+    assert sorted(os.listdir(db.snapshot.directory)) == sorted(manifest["segments"] + ["manifest.json", ".lock"])
+
+def test_replaced_journal_is_rebuilt(db):
+    db.add_entry("Entry", 3, None)
+    db.analytics_frame()
+    manifest = db.snapshot.refresh(db)
+    manifest["seq"] += 100  # as if the journal were restored from an older backup
+    db.snapshot._write_manifest(manifest)
+    assert fresh_load(db)["mood"].tolist() == [3]
+    assert db.snapshot.refresh(db)["seq"] < manifest["seq"]
+
+def test_disabling_removes_snapshot(db, monkeypatch):
+    db.add_entry("Entry", 3, None)
+    db.analytics_frame()
+    directory = db.snapshot.directory
+    monkeypatch.setenv("REFLECTIONS_ANALYTICS_SNAPSHOT", "0")
+    plain = ReflectionDB()
+    assert plain.snapshot is None and not os.path.exists(directory)
+    assert plain.analytics_frame()["mood"].tolist() == [3]
+    with plain.connection() as conn:
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'entry_changes'").fetchone() is None
+
+def test_reset_on_open_does_not_hold_the_journal(db, monkeypatch):
+    # Refreshes take the snapshot lock and then the journal, so reset must not run under a lease
+    import threading
+    reset = AnalyticsSnapshot.reset
+    leased = []
+    def reset_checking_lease(self):
+        def lease():
+            with db.connection():
+                leased.append(True)
+        other = threading.Thread(target=lease)
+        other.start()
+        other.join(timeout=2)
+        reset(self)
+    monkeypatch.setattr(AnalyticsSnapshot, "reset", reset_checking_lease)
+    with db.connection() as conn:
+        # As if written by a version without the change log: the snapshot is reset on open
+        conn.execute("DROP TRIGGER entry_changes_update")
+        conn.commit()
+    ReflectionDB()
+    assert leased == [True]
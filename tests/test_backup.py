@@ -0,0 +1,108 @@
+import sys, os
+import sqlite3
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from database import ReflectionDB
+from backup import backup_database, compact_database, prune_backups
+from connection_pool import get_pool
+from write_queue import close_all_writers
+
+def _plain_connect(db_path, pwd=None, **kwargs):
+    return sqlite3.connect(db_path, **kwargs)
+
+@pytest.fixture
+def db(set_db_path, monkeypatch):
+    monkeypatch.setattr("database.open_encrypted_db", _plain_connect)
+    monkeypatch.setattr("backup.open_encrypted_db", _plain_connect)
+    db = ReflectionDB()
+    for i in range(200):
+        db.add_entry_async(content=f"Entry {i} " + "reflection " * 50, mood=3, mood_factors=None)
+    db.add_entry(content="Last", mood=4, mood_factors=None)
+    yield db
+    close_all_writers()
+    get_pool().close_all()
+
+def test_backup_snapshot_contains_all_rows(db, tmp_path):
+    steps = []
+    report = backup_database(db, str(tmp_path), pages=2, step_sleep=0,
+                             progress=lambda remaining, total: steps.append(remaining))
+    assert os.path.exists(report["path"])
+    assert len(steps) > 1 and steps[-1] == 0
+    snapshot = sqlite3.connect(report["path"])
+    assert snapshot.execute("SELECT COUNT(*) FROM entries").fetchone() == (201,)
+    snapshot.close()
+
+def test_backup_finishes_under_steady_writes(db, tmp_path):
+    written = []
+    def write_every_step(remaining, total):
+        # Each write from the journal's writer restarts the stepped copy
+        db.add_entry(content=f"Written during backup {len(written)}", mood=3, mood_factors=None)
+        written.append(remaining)
+    report = backup_database(db, str(tmp_path), pages=2, step_sleep=0, max_restarts=2,
+                             progress=write_every_step)
+    assert report["restarts"] == 3 and len(written) == 3
+    snapshot = sqlite3.connect(report["path"])
+    assert snapshot.execute("SELECT COUNT(*) FROM entries").fetchone()[0] >= 201 + 2
+    snapshot.close()
+    assert backup_database(db, str(tmp_path), step_sleep=0)["restarts"] == 0
+
+def test_prune_keeps_newest_snapshots(db, tmp_path):
+    paths = [backup_database(db, str(tmp_path), step_sleep=0)["path"] for _ in range(4)]
+    for age, path in enumerate(reversed(paths)):
+        os.utime(path, (1_000_000 + (4 - age) * 100, 1_000_000 + (4 - age) * 100))
+    removed = prune_backups(str(tmp_path), "reflections_test", keep_last=2, max_age_days=100000)
+    assert sorted(removed) == sorted(paths[:2])
+    assert len(os.listdir(tmp_path)) == 2
+
+def test_compaction_reclaims_space_after_deletes(db):
+    skipped = compact_database(db, min_free_ratio=0.25)
+    assert not skipped["compacted"]
+    db.submit_write(lambda conn: conn.execute("DELETE FROM entries WHERE content LIKE 'Entry%'")).result()
+    report = compact_database(db, min_free_ratio=0.25)
+    assert report["compacted"]
+    assert report["reclaimed_bytes"] > 0
+    # The swapped-in file keeps working for both readers and the writer
+    assert [e["content"] for e in db.get_entries()] == ["Last"]
+    assert db.add_entry(content="After compaction", mood=5, mood_factors=None)
+    assert len(db.get_entries()) == 2
+
+def test_encrypted_snapshot_needs_the_key(set_db_path, tmp_path):
+    from initialize_db import open_encrypted_db
+    db = ReflectionDB(password="secret")
+    try:
+        db.add_entry(content="Private", mood=3, mood_factors=None)
+        report = backup_database(db, str(tmp_path), step_sleep=0)
+        keyed = open_encrypted_db(report["path"], "secret")
+        assert keyed.execute("SELECT content FROM entries").fetchall() == [("Private",)]
+        keyed.close()
+        unkeyed = open_encrypted_db(report["path"], None)
+        with pytest.raises(Exception):
+            unkeyed.execute("SELECT * FROM entries").fetchall()
+        unkeyed.close()
+    finally:
+        close_all_writers()
+        get_pool().close_all()
+
+def test_scheduler_only_for_opened_journals_and_one_per_file(set_db_path, monkeypatch):
+    import backup
+    monkeypatch.setattr(backup, "_schedulers", {})
+    monkeypatch.setattr(backup.BackupScheduler, "start", lambda self: None)
+    try:
+        owner = ReflectionDB(password="secret")
+        scheduler = backup.ensure_scheduler(owner)
+        errors = []
+        for attempt in range(3):
+            wrong = ReflectionDB(password=f"wrong {attempt}", on_error=errors.append)
+            assert not wrong.opened and backup.ensure_scheduler(wrong) is None
+        assert len(errors) == 3
+        # Another session of the same journal shares the scheduler ...
+        other = ReflectionDB(password="secret")
+        assert backup.ensure_scheduler(other) is scheduler and scheduler.db is owner
+        # ... and takes it over if the scheduler's journal object stopped working
+        scheduler.last_report = {"error": "file is not a database"}
+        assert backup.ensure_scheduler(other) is scheduler and scheduler.db is other
+        assert list(backup._schedulers) == [os.path.abspath(set_db_path)]
+    finally:
+        close_all_writers()
+        get_pool().close_all()
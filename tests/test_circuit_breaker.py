@@ -0,0 +1,110 @@
+import sys, os
+import time
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ai_services import FALLBACK_INSIGHT, AIService, get_router, llm_status, reset_routers
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from errors import CircuitOpenError, LLMTimeoutError
+from fake_llm import FakeLLM
+from llm_router import ModelRouter, Route
+
+@pytest.fixture(autouse=True)
+def fresh_routers():
+    reset_routers()
+    yield
+    reset_routers()
+
+def failing_router(breaker, **route):
+    llm = FakeLLM(latency=0, tokens_per_second=0, failure_rate=1.0)
+    return ModelRouter(lambda model: llm, {"analysis": Route("big", **route)}, breaker=breaker), llm
+
+def test_breaker_opens_after_consecutive_failures():
+    router, llm = failing_router(CircuitBreaker("test", failure_threshold=3, reset_timeout=60))
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            router.invoke("analysis", "Journal Entry: ok")
+    assert router.breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        router.invoke("analysis", "Journal Entry: ok")
+    # Rejected without calling the model
+    assert llm.calls == 3
+    assert router.snapshot()["breaker"]["rejected"] == 1
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    breaker.record_failure(ValueError("boom"))
+    breaker.record_success()
+    breaker.record_failure(ValueError("boom"))
+    assert breaker.state == CLOSED
+
+def test_half_open_trial_without_probe():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure(ValueError("down"))
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    # Only one trial at a time; a failed trial reopens the breaker
+    assert not breaker.allow()
+    breaker.record_failure(ValueError("still down"))
+    assert breaker.state == OPEN
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+def test_background_probe_closes_breaker():
+    healthy = []
+    def probe():
+        if not healthy:
+            raise ConnectionError("refused")
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.02, probe=probe)
+    breaker.record_failure(ValueError("down"))
+    time.sleep(0.1)
+    # With a probe, no trial calls are let through while it is failing
+    assert breaker.state == OPEN and not breaker.allow()
+    assert "failed" in breaker.snapshot()["last_probe"]
+    healthy.append(True)
+    deadline = time.monotonic() + 2
+    while breaker.state != CLOSED and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert breaker.state == CLOSED and breaker.snapshot()["consecutive_failures"] == 0
+
+def test_deadline_bounds_slow_calls():
+    llm = FakeLLM(latency=1.0, tokens_per_second=0)
+    router = ModelRouter(lambda model: llm, {"analysis": Route("big", deadline=0.1)},
+                         breaker=CircuitBreaker("test", failure_threshold=1, reset_timeout=60))
+    start = time.perf_counter()
+    with pytest.raises(LLMTimeoutError):
+        router.invoke("analysis", "Journal Entry: ok")
+    assert time.perf_counter() - start < 0.5
+    assert router.stats["analysis"]["timeouts"] == 1
+    # Timeouts count as failures
+    assert router.breaker.state == OPEN
+    # A per-call deadline overrides the route's
+    router.breaker.record_success()
+    llm.latency = 0.15
+    assert router.invoke("analysis", "Journal Entry: ok", deadline=2).startswith("🤔")
+
+def test_deadline_applies_while_hedging():
+    def factory(model):
+        return FakeLLM(latency=1.0, tokens_per_second=0, model=model)
+    router = ModelRouter(factory, {"analysis": Route("big", fallback="tiny", latency_budget=0.05, deadline=0.2)})
+    start = time.perf_counter()
+    with pytest.raises(LLMTimeoutError):
+        router.invoke("analysis", "Journal Entry: ok")
+    assert time.perf_counter() - start < 0.6
+    assert router.stats["analysis"]["hedged"] == 1
+
+def test_service_fails_fast_to_fallback_text(monkeypatch):
+    monkeypatch.setenv("REFLECTIONS_LLM_FAKE_LATENCY", "0")
+    monkeypatch.setenv("REFLECTIONS_LLM_FAKE_FAILURE_RATE", "1")
+    monkeypatch.setenv("REFLECTIONS_LLM_BREAKER_FAILURE_THRESHOLD", "2")
+    monkeypatch.setenv("REFLECTIONS_LLM_BREAKER_RESET_TIMEOUT", "60")
+    for _ in range(3):
+        assert AIService(provider="fake").analyze_entry("A long day", 3, None) == FALLBACK_INSIGHT
+    # Shared by every service of the provider
+    router = get_router("fake")
+    assert router.llm(router.routes["analysis"].model).calls == 2
+    status = llm_status()["fake"]
+    assert status["breaker"]["state"] == OPEN and status["breaker"]["rejected"] == 1
@@ -0,0 +1,106 @@
+import sys, os
+import sqlite3
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from compression import Compressor, compress_existing_rows, is_compressed, train_dictionary, zstandard
+from database import ReflectionDB
+from connection_pool import get_pool
+from write_queue import close_all_writers
+
+INSIGHT = ("🤔 It sounds like today brought a mix of pressure at work and moments of calm. "
+           "Consider noticing what helped you feel grounded, and be gentle with yourself. "
+           "What is one small thing you could do tomorrow to protect that sense of calm?")
+
+CODECS = ["zlib"] + (["zstd"] if zstandard is not None else [])
+
+@pytest.fixture
+def db(set_db_path, monkeypatch):
+    monkeypatch.setattr("database.open_encrypted_db", lambda db_path, pwd=None, **kwargs: sqlite3.connect(db_path, **kwargs))
+    yield lambda **kwargs: ReflectionDB(**kwargs)
+    close_all_writers()
+    get_pool().close_all()
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_round_trip(codec):
+    compressor = Compressor(codec)
+    stored = compressor.encode(INSIGHT * 3)
+    assert is_compressed(stored)
+    assert len(stored) < len((INSIGHT * 3).encode())
+    assert compressor.decode(stored) == INSIGHT * 3
+    # Short values and plain text pass through untouched
+    assert compressor.encode("Short") == "Short"
+    assert compressor.decode("plain text") == "plain text"
+    assert compressor.encode(None) is None
+
+def test_zlib_dictionary_shrinks_small_values():
+    samples = [INSIGHT.replace("work", word) for word in ("work", "home", "school", "family") * 4]
+    zdict = train_dictionary("zlib", samples)
+    assert zdict
+    compressor = Compressor("zlib")
+    plain = compressor.encode(INSIGHT)
+    compressor._dicts = {1: ("zlib", zdict)}
+    compressor._dict_id = 1
+    with_dict = compressor.encode(INSIGHT)
+    assert len(with_dict) < len(plain)
+    assert compressor.decode(with_dict) == INSIGHT
+
+def test_reflectiondb_compresses_transparently(db):
+    journal = db(compression="zlib")
+    journal.add_entry(content=INSIGHT, mood=3, mood_factors=None, ai_insight=INSIGHT * 2)
+    stored = journal.conn.execute("SELECT content, ai_insight FROM entries").fetchone()
+    assert all(is_compressed(value) for value in stored)
+    entry = journal.get_entries()[0]
+    assert entry["content"] == INSIGHT
+    assert entry["ai_insight"] == INSIGHT * 2
+
+def test_migration_compresses_existing_rows(db):
+    plain = db()
+    for i in range(20):
+        plain.add_entry(content=f"Entry {i}: " + INSIGHT, mood=3, mood_factors=None, ai_insight=INSIGHT)
+    result = compress_existing_rows(plain, "zlib")
+    assert result["rows"] == 20 and result["dictionary_id"]
+    stored = plain.conn.execute("SELECT content FROM entries").fetchall()
+    assert all(is_compressed(row[0]) for row in stored)
+    # Another session (new ReflectionDB) reads rows written with the trained dictionary
+    reader = db()
+    contents = sorted(e["content"] for e in reader.get_entries(limit=50))
+    assert contents == sorted(f"Entry {i}: " + INSIGHT for i in range(20))
+    # ...and can migrate back to plain text
+    compress_existing_rows(reader, "off")
+    assert not any(is_compressed(row[0]) for row in reader.conn.execute("SELECT content FROM entries"))
+
+def test_migration_keeps_edits_made_between_batches(db):
+    journal = db()
+    for i in range(6):
+        journal.add_entry(content=f"Entry {i}: " + INSIGHT, mood=3, mood_factors=None)
+    ids = sorted(e["id"] for e in journal.get_entries(limit=-1))
+    edited = []
+    def edit_once(done, total):
+        if not edited:
+            # One entry already migrated, one still waiting for its batch
+            for entry_id in (ids[0], ids[-1]):
+                journal.update_entry(entry_id, f"Edited {entry_id}: " + INSIGHT, 4, None)
+            edited.append(done)
+    result = compress_existing_rows(journal, "zlib", train=False, batch_size=2, progress=edit_once)
+    assert result["rows"] == 6 and edited == [2]
+    contents = {e["id"]: e["content"] for e in db().get_entries(limit=-1)}
+    assert contents[ids[0]] == f"Edited {ids[0]}: " + INSIGHT
+    assert contents[ids[-1]] == f"Edited {ids[-1]}: " + INSIGHT
+    # The first entry was edited after its batch, so it is stored with the journal's own codec
+    stored = dict(journal.conn.execute("SELECT id, content FROM entries"))
+    assert not is_compressed(stored.pop(ids[0]))
+    assert all(is_compressed(value) for value in stored.values())
+
+def test_search_decodes_compressed_rows_once(db):
+    journal = db(compression="zlib")
+    journal.add_entry(content="Walked by the river. " + INSIGHT, mood=3, mood_factors=None)
+    journal.add_entry(content="River swim", mood=4, mood_factors=None)  # too short to compress
+    journal.add_entry(content="Quiet evening at home. " + INSIGHT, mood=3, mood_factors=None)
+    assert [e["content"][:10] for e in journal.search_entries("RIVER")] == ["River swim", "Walked by "]
+    for typed in ("r", "ri", "riv", "rive", "river"):
+        journal.search_entries(typed)
+    # One decoded copy of the compressed rows, whatever was typed; plain hits are capped by the limit
+    decoded = [key for key in journal._read_cache if key[2]]
+    assert len(decoded) == 1
+    assert journal.search_entries("calm", limit=1)[0]["content"].startswith("Quiet evening")
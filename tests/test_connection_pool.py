@@ -0,0 +1,85 @@
+import sys, os
+import sqlite3
+import threading
+import time
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from connection_pool import ConnectionPool
+
+def _connect():
+    return sqlite3.connect(":memory:", check_same_thread=False)
+
+def test_reuses_connection_per_key():
+    pool = ConnectionPool(max_connections=2)
+    with pool.connection("a", _connect) as first:
+        pass
+    with pool.connection("a", _connect) as second:
+        assert second is first
+    assert len(pool) == 1
+
+def test_evicts_least_recently_used_at_cap():
+    pool = ConnectionPool(max_connections=2)
+    with pool.connection("a", _connect) as a:
+        pass
+    with pool.connection("b", _connect) as b:
+        pass
+    with pool.connection("a", _connect):
+        pass
+    with pool.connection("c", _connect):
+        pass
+    assert len(pool) == 2
+    # "b" was least recently used, so it is closed and "a" survives
+    with pytest.raises(sqlite3.ProgrammingError):
+        b.execute("SELECT 1")
+    with pool.connection("a", _connect) as again:
+        assert again is a
+
+def test_idle_connections_are_closed():
+    pool = ConnectionPool(max_connections=4, idle_timeout=0.01)
+    with pool.connection("a", _connect) as conn:
+        pass
+    time.sleep(0.02)
+    pool.evict_idle()
+    assert len(pool) == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+
+def test_closed_connection_is_reopened():
+    pool = ConnectionPool()
+    with pool.connection("a", _connect) as conn:
+        conn.close()
+    with pool.connection("a", _connect) as conn:
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+
+def test_journal_lock_serialises_callers():
+    pool = ConnectionPool(max_connections=1)
+    active, overlaps = [], []
+    def worker():
+        with pool.connection("journal", _connect):
+            active.append(1)
+            if len(active) > 1:
+                overlaps.append(True)
+            time.sleep(0.005)
+            active.pop()
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert overlaps == []
+    assert len(pool) == 1
+
+def test_waits_for_a_free_slot_when_all_leased():
+    pool = ConnectionPool(max_connections=1)
+    opened = threading.Event()
+    def holder():
+        with pool.connection("a", _connect):
+            opened.set()
+            time.sleep(0.05)
+    t = threading.Thread(target=holder)
+    t.start()
+    opened.wait()
+    with pool.connection("b", _connect):
+        assert len(pool) == 1
+    t.join()
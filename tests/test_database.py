@@ -3,15 +3,24 @@ import pytest
 import sqlite3
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from database import ReflectionDB
+from database import ReflectionDB, journal_db_path
 from initialize_db import open_encrypted_db
+from connection_pool import get_pool
+from write_queue import close_all_writers
 
 # ------------------------------------------------
 # Patch the encrypted helper to use a plain SQLite connection for testing.
 # ------------------------------------------------
 @pytest.fixture(autouse=True)
 def patch_encrypted_connect(monkeypatch):
-    monkeypatch.setattr("database.open_encrypted_db", lambda db_path, pwd=None: sqlite3.connect(db_path))
+    monkeypatch.setattr("database.open_encrypted_db", lambda db_path, pwd=None, **kwargs: sqlite3.connect(db_path, **kwargs))
+
+@pytest.fixture(autouse=True)
+def close_pooled_connections():
+    """Each test recreates the DB file, so don't let pooled or writer connections outlive it."""
+    yield
+    close_all_writers()
+    get_pool().close_all()
 
 def test_reflectiondb_initialises_and_creates_tables(set_db_path):
     """Construction should create the DB and the ``entries`` table."""
@@ -30,6 +39,7 @@ def test_reflectiondb_initialises_and_creates_tables(set_db_path):
         "entry_type",
         "ai_insight",
         "weather_data",
+        "weather_id",
     }
     assert cols == expected
     db.conn.close()
@@ -81,3 +91,153 @@ def test_delete_entry(set_db_path):
     df = db.get_entries()
     assert df.empty
     db.conn.close()
+
+def test_get_entries_served_from_cache_until_write(set_db_path):
+    db = ReflectionDB()
+    db.add_entry(content="Cached", mood=3, mood_factors=None)
+    first = db.get_entries()
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    def entry_queries():
+        return [sql for sql in statements if "FROM entries e" in sql]
+    assert db.get_entries() == first
+    assert entry_queries() == []
+    db.add_entry(content="Fresh", mood=4, mood_factors=None)
+    assert len(db.get_entries()) == 2
+    assert len(entry_queries()) == 1
+    db.conn.close()
+
+def test_read_cache_is_bounded(set_db_path, monkeypatch):
+    monkeypatch.setattr("database.READ_CACHE_SIZE", 3)
+    db = ReflectionDB()
+    db.add_entry(content="Cached", mood=3, mood_factors=None)
+    for limit in range(1, 6):
+        db.get_entries(limit=limit)
+    assert len(db._read_cache) == 3
+    # The most recently used results stay; results from before a write are dropped
+    db.get_entries(limit=3)
+    db.get_entries(limit=6)
+    assert [dict(key[1])["limit"] for key in db._read_cache] == [5, 3, 6]
+    db.add_entry(content="Fresh", mood=4, mood_factors=None)
+    db.get_entries(limit=1)
+    assert len(db._read_cache) == 1
+    db.conn.close()
+
+def test_cache_sees_writes_from_other_connections(set_db_path):
+    db = ReflectionDB()
+    db.add_entry(content="One", mood=3, mood_factors=None)
+    assert len(db.get_entries()) == 1
+    other = sqlite3.connect(set_db_path)
+    other.execute("INSERT INTO entries (date, content, mood, entry_type) VALUES ('2024-01-01', 'Two', 2, 'text')")
+    other.commit()
+    other.close()
+    assert len(db.get_entries()) == 2
+    db.conn.close()
+
+def test_weather_observations_deduplicated_by_location_and_hour(set_db_path):
+    db = ReflectionDB()
+    weather = {"temperature": 70, "description": "Sunny", "humidity": 30,
+               "location": "20871", "timestamp": "2024-05-01T10:15:00"}
+    db.add_entry(content="Morning", mood=4, mood_factors=None, weather_data=weather)
+    db.add_entry(content="Later", mood=2, mood_factors=None, weather_data=dict(weather, timestamp="2024-05-01T10:45:00"))
+    entries = db.get_entries()
+    assert entries[0]["weather_id"] == entries[1]["weather_id"]
+    assert entries[0]["temperature"] == 70
+    assert entries[0]["weather_data"] is None
+    assert db.conn.execute("SELECT COUNT(*) FROM weather_observations").fetchone()[0] == 1
+    db.conn.close()
+
+def test_weather_blobs_migrated_and_correlated(set_db_path):
+    import json
+    conn = sqlite3.connect(set_db_path)
+    conn.execute("""CREATE TABLE entries (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL,
+        content TEXT NOT NULL, mood INTEGER NOT NULL, mood_factors TEXT, sentiment REAL,
+        entry_type TEXT NOT NULL, ai_insight TEXT, weather_data TEXT)""")
+    for day, (temp, humidity, mood) in enumerate([(50, 80, 1), (60, 60, 2), (70, 50, 4), (80, 40, 5)], start=1):
+        blob = json.dumps({"temperature": temp, "humidity": humidity, "description": "Clear",
+                           "timestamp": f"2024-05-0{day}T09:00:00"})
+        conn.execute("INSERT INTO entries (date, content, mood, entry_type, weather_data) VALUES (?, 'x', ?, 'text', ?)",
+                     (f"2024-05-0{day}T09:00:00", mood, blob))
+    conn.commit()
+    conn.close()
+
+    db = ReflectionDB()
+    entries = db.get_entries()
+    assert all(e["weather_data"] is None and e["weather_id"] for e in entries)
+    correlations = db.weather_mood_correlations()
+    assert correlations["entries"] == 4
+    assert correlations["temperature"] > 0.9
+    assert correlations["humidity"] < -0.9
+    bands = db.mood_by_temperature()
+    assert [b["temperature_band"] for b in bands] == [50, 60, 70, 80]
+    db.conn.close()
+
+def test_mood_by_temperature_floors_sub_zero_bands(set_db_path):
+    db = ReflectionDB()
+    for i, temp in enumerate([-15, -10, -5, -0.5, 0, 5, 10.5]):
+        db.add_entry(f"Cold day {i}", 3, None, weather_data={"temperature": temp, "humidity": None,
+                                                              "description": "Snow", "location": f"loc{i}"})
+    bands = {b["temperature_band"]: b["entries"] for b in db.mood_by_temperature()}
+    assert bands == {-20: 1, -10: 3, 0: 2, 10: 1}
+
+def test_journals_use_separate_files(set_db_path, temp_dir, monkeypatch):
+    monkeypatch.setenv("REFLECTIONS_JOURNAL_DIR", os.path.join(temp_dir, "journals"))
+    alice = ReflectionDB(journal="alice")
+    bob = ReflectionDB(journal="bob")
+    alice.add_entry(content="Alice's entry", mood=4, mood_factors=None)
+    assert alice.db_path != bob.db_path
+    assert [e["content"] for e in alice.get_entries()] == ["Alice's entry"]
+    assert bob.get_entries() == []
+    with pytest.raises(ValueError):
+        journal_db_path("../escape")
+
+def test_sessions_share_one_pooled_connection(set_db_path):
+    first = ReflectionDB()
+    second = ReflectionDB()
+    assert first.conn is second.conn
+    first.add_entry(content="Shared", mood=3, mood_factors=None)
+    assert len(second.get_entries()) == 1
+
+def test_concurrent_sessions_write_through_one_writer(set_db_path):
+    from concurrent.futures import ThreadPoolExecutor
+    db = ReflectionDB()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [db.add_entry_async(content=f"Entry {i}", mood=3, mood_factors=None) for i in range(40)]
+        ok = list(pool.map(lambda i: db.add_entry(content=f"Sync {i}", mood=2, mood_factors=None), range(20)))
+    ids = [f.result() for f in futures]
+    assert all(ok)
+    assert len(set(ids)) == 40
+    assert len(db.get_entries(limit=100)) == 60
+
+def test_bulk_insert_is_one_transaction(set_db_path):
+    db = ReflectionDB()
+    writes = db.writer.operations
+    ids = db.add_entries([
+        {"content": "A wonderful day", "mood": 5, "mood_factors": "Work"},
+        {"content": "An awful day", "mood": 1, "date": "2024-01-01T09:00:00",
+         "weather_data": {"temperature": 40, "humidity": 70, "description": "Rain", "location": "20871"}},
+    ])
+    assert len(ids) == 2 and db.writer.operations == writes + 1
+    entries = {e["id"]: e for e in db.get_entries()}
+    assert entries[ids[0]]["sentiment"] == db.sentiment.score("A wonderful day")
+    assert entries[ids[1]]["date"] == "2024-01-01T09:00:00" and entries[ids[1]]["temperature"] == 40
+    # A bad row rolls back the whole batch
+    with pytest.raises(Exception):
+        db.add_entries_async([{"content": "Fine", "mood": 3}, {"content": "No mood", "mood": None}]).result()
+    assert len(db.get_entries()) == 2
+
+def test_bulk_update_and_delete(set_db_path):
+    db = ReflectionDB()
+    ids = db.add_entries([{"content": f"Entry {i}", "mood": 3, "mood_factors": "Work, Sleep",
+                           "date": f"2024-0{i}-15T12:00:00"} for i in range(1, 6)])
+    sentiments = {e["id"]: e["sentiment"] for e in db.get_entries()}
+    assert db.update_entries(ids[:2], mood=1, add_factors=["Health"], remove_factors=["Work"]) == 2
+    assert db.update_entries(ids[2:3], remove_factors=["Work", "Sleep"]) == 1
+    entries = {e["id"]: e for e in db.get_entries()}
+    assert entries[ids[0]]["mood"] == 1 and entries[ids[0]]["mood_factors"] == "Sleep, Health"
+    assert entries[ids[2]]["mood"] == 3 and entries[ids[2]]["mood_factors"] is None
+    assert {i: e["sentiment"] for i, e in entries.items()} == sentiments
+    assert db.delete_entries([ids[0], ids[1], 12345]) == 2
+    # Half-open date range: March and April
+    assert db.delete_entries_between("2024-03-01", "2024-05-01") == 2
+    assert [e["id"] for e in db.get_entries()] == [ids[4]]
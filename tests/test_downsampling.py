@@ -0,0 +1,53 @@
+import sys, os
+from datetime import date
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from downsampling import density_grid, downsample_series, lttb, mood_sentiment_density, window
+
+def history(entries):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "date": pd.date_range("2020-01-01", periods=entries, freq="h"),
+        "mood": rng.integers(1, 6, entries),
+        "sentiment": rng.uniform(-1, 1, entries),
+    })
+
+def test_lttb_keeps_endpoints_and_extremes():
+    y = np.zeros(10_000)
+    y[1234], y[8765] = 5, -5
+    selected = lttb(np.arange(len(y)), y, 100)
+    assert len(selected) == 100
+    assert selected[0] == 0 and selected[-1] == len(y) - 1
+    assert np.all(np.diff(selected) > 0)
+    assert 1234 in selected and 8765 in selected
+
+def test_lttb_short_series_are_kept_whole():
+    assert lttb([1, 2, 3], [3, 1, 2], 100).tolist() == [0, 1, 2]
+
+def test_downsampled_series_is_bounded():
+    frame = history(50_000)
+    points = downsample_series(frame, "date", "mood", 500)
+    assert len(points) == 500
+    assert points["date"].is_monotonic_increasing
+    assert points["date"].iloc[0] == frame["date"].iloc[0] and points["date"].iloc[-1] == frame["date"].iloc[-1]
+
+def test_window_is_half_open():
+    frame = history(24 * 10)
+    day = window(frame, "date", date(2020, 1, 3), date(2020, 1, 4))
+    assert len(day) == 24
+    assert day["date"].min() == pd.Timestamp("2020-01-03") and day["date"].max() < pd.Timestamp("2020-01-04")
+
+def test_density_counts_every_entry_in_bounded_cells():
+    frame = history(100_000)
+    frame.loc[0, "sentiment"] = np.nan
+    density = mood_sentiment_density(frame, sentiment_bins=20)
+    assert len(density) <= 5 * 20
+    assert density["entries"].sum() == len(frame) - 1
+    assert set(density["mood"]) == {1, 2, 3, 4, 5}
+
+def test_density_grid_cell_centres():
+    frame = pd.DataFrame({"x": [0.2, 0.3, 1.7], "y": [0.1, 0.1, 0.9]})
+    grid = density_grid(frame, "x", "y", [0, 1, 2], [0, 0.5, 1])
+    assert grid.to_dict("records") == [{"x": 0.5, "y": 0.25, "entries": 2}, {"x": 1.5, "y": 0.75, "entries": 1}]
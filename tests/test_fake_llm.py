@@ -0,0 +1,66 @@
+import sys, os
+import time
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ai_services import AIService, reset_routers
+from fake_llm import FakeLLM, FakeLLMError, FakeOllamaServer
+
+@pytest.fixture(autouse=True)
+def fresh_routers():
+    # Routers are process-wide and read settings once
+    reset_routers()
+    yield
+    reset_routers()
+
+def test_responses_are_deterministic():
+    llm = FakeLLM(latency=0, tokens_per_second=0)
+    first = llm.invoke("Journal Entry: a long day at work")
+    assert first == FakeLLM(latency=0, tokens_per_second=0, seed=7).invoke("Journal Entry: a long day at work")
+    assert first.startswith("🤔")
+    assert llm.invoke("Generate an inspiring quote").startswith('"')
+
+def test_latency_and_token_rate():
+    llm = FakeLLM(latency=0.05, tokens_per_second=1000)
+    start = time.perf_counter()
+    text = llm.invoke("Journal Entry: fine")
+    elapsed = time.perf_counter() - start
+    assert elapsed >= 0.05 + len(text.split()) / 1000
+
+def test_failure_injection_is_seeded_and_falls_back():
+    def outcomes(seed):
+        llm = FakeLLM(latency=0, tokens_per_second=0, failure_rate=0.5, seed=seed)
+        results = []
+        for _ in range(20):
+            try:
+                llm.invoke("x")
+                results.append(True)
+            except FakeLLMError:
+                results.append(False)
+        return results
+    assert outcomes(1) == outcomes(1)
+    assert 0 < outcomes(1).count(False) < 20
+
+    service = AIService(provider="fake", llm=FakeLLM(latency=0, tokens_per_second=0, failure_rate=1.0))
+    assert "unable to provide insights" in service.analyze_entry("Rough day", 2, None)
+
+def test_fake_provider_from_settings(monkeypatch):
+    monkeypatch.setenv("REFLECTIONS_LLM_FAKE_LATENCY", "0")
+    monkeypatch.setenv("REFLECTIONS_LLM_FAKE_TOKENS_PER_SECOND", "0")
+    service = AIService(provider="fake")
+    assert service.llm.latency == 0
+    assert service.analyze_entry("Good day", 4, "Family").startswith("🤔")
+    assert AIService(provider="unknown").llm is None
+
+def test_ollama_client_against_fake_server(monkeypatch):
+    pytest.importorskip("langchain_ollama")
+    server = FakeOllamaServer(FakeLLM(latency=0, tokens_per_second=0)).start()
+    try:
+        monkeypatch.setenv("REFLECTIONS_LLM_OLLAMA_BASE_URL", server.url)
+        service = AIService(provider="ollama")
+        insight = service.analyze_entry("Walked by the river", 4, None)
+        assert insight.startswith("🤔") and server.llm.calls == 1
+        server.llm.failure_rate = 1.0
+        assert "unable to provide insights" in service.analyze_entry("Walked by the river", 4, None)
+    finally:
+        server.stop()
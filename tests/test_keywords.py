@@ -0,0 +1,86 @@
+import sys, os
+import sqlite3
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from database import ReflectionDB
+from keywords import get_keyword_extractor
+from connection_pool import get_pool
+from write_queue import close_all_writers
+
+@pytest.fixture(autouse=True)
+def patch_encrypted_connect(monkeypatch):
+    monkeypatch.setattr("database.open_encrypted_db", lambda db_path, pwd=None, **kwargs: sqlite3.connect(db_path, **kwargs))
+    yield
+    close_all_writers()
+    get_pool().close_all()
+
+def keywords_of(db, entry_id):
+    with db.connection() as conn:
+        return {row[0] for row in conn.execute("SELECT keyword FROM entry_keywords WHERE entry_id = ?", (entry_id,))}
+
+def test_pattern_extractor_finds_nouns_and_phrases():
+    words = get_keyword_extractor("pattern").extract(
+        "Today my new manager set two deadlines. The evening yoga class helped, and my sister called.")
+    assert {"manager", "new manager", "deadline", "yoga", "evening yoga class", "sister"} <= set(words)
+    # Generic nouns are not themes
+    assert "today" not in words
+    assert get_keyword_extractor("pattern").extract_many(["", "Feeling great!"]) == [[], []]
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        get_keyword_extractor("nope")
+
+def test_writes_keep_keywords_in_sync(set_db_path):
+    db = ReflectionDB()
+    db.add_entry("A long hike in the mountains with my brother", 4, None)
+    entry_id = db.get_entries()[0]["id"]
+    assert {"hike", "mountain", "brother"} <= keywords_of(db, entry_id)
+    db.update_entry(entry_id, "Quiet evening reading a novel", 3, None)
+    assert "novel" in keywords_of(db, entry_id) and "mountain" not in keywords_of(db, entry_id)
+    ids = db.add_entries([{"content": "Work deadline again", "mood": 2}, {"content": "Garden work", "mood": 4}])
+    assert all("work" in keywords_of(db, i) for i in ids)
+    db.delete_entries(ids + [entry_id])
+    with db.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM entry_keywords").fetchone()[0] == 0
+
+def test_backfill_fills_entries_from_before_the_table(set_db_path):
+    conn = sqlite3.connect(set_db_path)
+    conn.execute("""CREATE TABLE entries (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL,
+        content TEXT NOT NULL, mood INTEGER NOT NULL, mood_factors TEXT, sentiment REAL,
+        entry_type TEXT NOT NULL, ai_insight TEXT, weather_data TEXT)""")
+    conn.executemany("INSERT INTO entries (date, content, mood, entry_type) VALUES (?, ?, 3, 'text')",
+                     [(f"2024-0{m}-01T09:00:00", "Coffee with a friend") for m in range(1, 8)])
+    conn.commit()
+    conn.close()
+    db = ReflectionDB()
+    assert db.keyword_backfill_pending() == 7
+    db.add_entry("Coffee alone", 3, None)
+    # Entry 2 was edited meanwhile and already has its keywords
+    db.update_entry(2, "Tea at the library", 3, None)
+    steps = []
+    assert db.backfill_keywords(batch=3, progress=lambda done, total: steps.append(done)) == 6
+    assert steps == [3, 6]
+    assert db.keyword_backfill_pending() == 0
+    assert "library" in keywords_of(db, 2) and "coffee" not in keywords_of(db, 2)
+    assert db.top_keywords(limit=2) == [{"keyword": "coffee", "entries": 7}, {"keyword": "friend", "entries": 6}]
+    assert db.backfill_keywords() == 0
+
+def test_theme_queries_use_the_keyword_indexes(set_db_path):
+    db = ReflectionDB()
+    db.add_entries([{"content": text, "mood": 3, "date": date} for text, date in [
+        ("Yoga in the park", "2024-01-05T08:00:00"), ("Park picnic", "2024-01-20T12:00:00"),
+        ("Yoga class", "2024-02-03T07:00:00"), ("Yoga with a friend", "2024-03-01T07:00:00"),
+    ]])
+    top = db.top_keywords("2024-01-01", "2024-02-01")
+    assert top[0] == {"keyword": "park", "entries": 2}
+    assert {t["keyword"] for t in top} == {"park", "park picnic", "picnic", "yoga"}
+    trends = db.keyword_trends(["yoga", "park"], end="2024-03-01")
+    assert [(t["period"], t["keyword"], t["entries"]) for t in trends] == [
+        ("2024-01", "park", 2), ("2024-01", "yoga", 1), ("2024-02", "yoga", 1)]
+    with db.connection() as conn:
+        for sql in ("SELECT keyword, COUNT(*) FROM entry_keywords WHERE date >= '' AND date < '9' GROUP BY keyword",
+                    "SELECT substr(date, 1, 7) AS period, keyword, COUNT(*) FROM entry_keywords "
+                    "WHERE keyword IN ('yoga', 'park') AND date >= '' AND date < '9' GROUP BY keyword, period"):
+            plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql))
+            assert "COVERING INDEX idx_entry_keywords" in plan
@@ -0,0 +1,69 @@
+import sys, os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ai_services import AIService, reset_routers, routes_from_settings
+from fake_llm import FakeLLM
+from llm_router import MIN_SAMPLES, ModelRouter, Route
+
+def fake_models(**latencies):
+    return lambda model: FakeLLM(latency=latencies[model], tokens_per_second=0, model=model)
+
+def test_tasks_use_their_own_model():
+    router = ModelRouter(fake_models(tiny=0, big=0), {"quote": Route("tiny"), "analysis": Route("big")})
+    router.invoke("quote", "Generate a quote")
+    router.invoke("analysis", "Journal Entry: ok")
+    assert router.llm("tiny").calls == 1 and router.llm("big").calls == 1
+
+def test_slow_primary_is_hedged_to_fallback():
+    router = ModelRouter(fake_models(big=0.5, tiny=0.01),
+                         {"analysis": Route("big", fallback="tiny", latency_budget=0.05)})
+    start = time.perf_counter()
+    assert router.invoke("analysis", "Journal Entry: ok").startswith("🤔")
+    assert time.perf_counter() - start < 0.3
+    assert router.stats["analysis"] == {"requests": 1, "hedged": 1, "fallback_wins": 1, "timeouts": 0}
+
+def test_fast_primary_is_not_hedged():
+    router = ModelRouter(fake_models(big=0, tiny=0),
+                         {"analysis": Route("big", fallback="tiny", latency_budget=0.5)})
+    router.invoke("analysis", "Journal Entry: ok")
+    assert router.stats["analysis"]["hedged"] == 0 and router.llm("tiny").calls == 0
+
+def test_failed_primary_falls_back_immediately():
+    def factory(model):
+        return FakeLLM(latency=0, tokens_per_second=0, failure_rate=1.0 if model == "big" else 0.0)
+    router = ModelRouter(factory, {"analysis": Route("big", fallback="tiny", latency_budget=5)})
+    start = time.perf_counter()
+    assert router.invoke("analysis", "Journal Entry: ok").startswith("🤔")
+    assert time.perf_counter() - start < 1
+
+def test_hedge_point_follows_observed_p95():
+    router = ModelRouter(fake_models(big=0.01, tiny=0), {"analysis": Route("big", fallback="tiny", latency_budget=5)})
+    assert router.hedge_delay(router.routes["analysis"]) == 5
+    for _ in range(MIN_SAMPLES):
+        router.invoke("analysis", "Journal Entry: ok")
+    delay = router.hedge_delay(router.routes["analysis"])
+    assert 0.01 <= delay < 0.5
+    # The budget caps the hedge point when the observed percentile is slower
+    router.routes["analysis"].latency_budget = 0.005
+    assert router.hedge_delay(router.routes["analysis"]) == 0.005
+    assert router.snapshot()["models"]["big"]["samples"] == MIN_SAMPLES
+
+def test_routes_from_settings(monkeypatch):
+    monkeypatch.setenv("REFLECTIONS_LLM_OLLAMA_MODEL", "base")
+    monkeypatch.setenv("REFLECTIONS_LLM_QUOTE_MODEL", "tiny")
+    monkeypatch.setenv("REFLECTIONS_LLM_ANALYSIS_FALLBACK_MODEL", "tiny")
+    monkeypatch.setenv("REFLECTIONS_LLM_ANALYSIS_LATENCY_BUDGET", "1.5")
+    routes = routes_from_settings()
+    assert routes["quote"] == Route("tiny", hedge_percentile=95.0, deadline=15.0)
+    assert routes["analysis"] == Route("base", fallback="tiny", latency_budget=1.5, hedge_percentile=95.0,
+                                       deadline=60.0)
+    monkeypatch.setenv("REFLECTIONS_LLM_FAKE_LATENCY", "0")
+    monkeypatch.setenv("REFLECTIONS_LLM_FAKE_TOKENS_PER_SECOND", "0")
+    reset_routers()
+    try:
+        service = AIService(provider="fake")
+        service.generate_daily_quote()
+        assert service.router.llm("tiny").calls == 1 and service.llm.model == "base"
+    finally:
+        reset_routers()
@@ -0,0 +1,52 @@
+import sys, os
+import time
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from profiling import RerunProfiler, section
+
+def test_off_mode_records_nothing():
+    profiler = RerunProfiler(mode="off")
+    with profiler.rerun(page="Insights"):
+        with section("charts"):
+            pass
+    assert not profiler.enabled and len(profiler.records) == 0
+
+def test_sections_split_wall_time():
+    profiler = RerunProfiler(mode="timing")
+    page = {"name": "New Entry"}
+    with profiler.rerun(page=lambda: page["name"]):
+        with section("page"):
+            with section("get_entries"):
+                time.sleep(0.02)
+        page["name"] = "Insights"  # navigation mid-rerun
+    record = profiler.records[-1]
+    assert record.page == "Insights"
+    assert record.sections["get_entries"] >= 0.02
+    assert record.sections["page"] >= record.sections["get_entries"]
+    # Nested sections don't count twice towards the remainder
+    assert record.other == pytest.approx(record.total - record.sections["page"], abs=1e-6)
+    # Outside a rerun sections are no-ops
+    with section("ignored"):
+        pass
+    assert "ignored" not in record.sections
+
+def test_rerun_recorded_when_interrupted():
+    profiler = RerunProfiler(mode="timing")
+    with pytest.raises(RuntimeError):
+        with profiler.rerun(page="Past Entries"):
+            raise RuntimeError("st.rerun()")
+    assert profiler.records[-1].page == "Past Entries"
+
+def test_cprofile_keeps_slowest_dumps(tmp_path):
+    profiler = RerunProfiler(mode="cprofile", profile_dir=str(tmp_path), keep_profiles=2)
+    for delay in (0.001, 0.03, 0.002, 0.02, 0.01):
+        with profiler.rerun(page="Insights"):
+            time.sleep(delay)
+    dumps = sorted(p.name for p in tmp_path.glob("*.prof"))
+    assert len(dumps) == 2
+    slowest = profiler.slowest(2)
+    assert sorted(os.path.basename(r.profile_path) for r in slowest) == dumps
+    summary = profiler.summary(5)
+    assert [row["total_ms"] for row in summary] == sorted((row["total_ms"] for row in summary), reverse=True)
+    assert sum(1 for row in summary if row["profile"]) == 2
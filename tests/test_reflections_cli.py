@@ -0,0 +1,82 @@
+import sys, os
+import io
+import json
+import sqlite3
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import config
+import reflections
+from database import ReflectionDB
+from errors import DatabaseError
+from connection_pool import get_pool
+from write_queue import close_all_writers
+
+@pytest.fixture(autouse=True)
+def journal_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("REFLECTIONS_JOURNAL_DIR", str(tmp_path))
+    monkeypatch.setenv("REFLECTIONS_DB_PASSWORD", "cli-secret")
+    monkeypatch.setattr("database.open_encrypted_db", lambda db_path, pwd=None, **kwargs: sqlite3.connect(db_path, **kwargs))
+    yield tmp_path
+    close_all_writers()
+    get_pool().close_all()
+
+def run(capsys, *argv, stdin=None, monkeypatch=None):
+    if stdin is not None:
+        monkeypatch.setattr(sys, "stdin", io.StringIO(stdin))
+    code = reflections.main(["--journal", "cli", *argv])
+    out, err = capsys.readouterr()
+    return code, out, err
+
+def test_add_list_search_export(capsys, monkeypatch, tmp_path):
+    assert run(capsys, "add", "A calm walk in the park", "--mood", "4")[0] == 0
+    lines = '{"content": "Stressful meeting at work", "mood": 2, "mood_factors": ["Work"]}\n' \
+            '{"content": "Dinner with family", "mood": 5}\n'
+    code, out, _err = run(capsys, "add", "--jsonl", "-", stdin=lines, monkeypatch=monkeypatch)
+    assert code == 0 and "Added 2 entries" in out
+
+    code, out, _err = run(capsys, "list", "--format", "json")
+    entries = json.loads(out)
+    assert [e["content"] for e in entries][::-1] == ["A calm walk in the park", "Stressful meeting at work",
+                                                     "Dinner with family"]
+    assert entries[1]["mood_factors"] == "Work"
+
+    code, out, _err = run(capsys, "search", "WORK", "--format", "json")
+    assert [e["content"] for e in json.loads(out)] == ["Stressful meeting at work"]
+
+    export = tmp_path / "export.csv"
+    assert run(capsys, "export", "--format", "csv", "-o", str(export))[0] == 0
+    assert len(export.read_text().strip().splitlines()) == 4
+
+    code, out, _err = run(capsys, "analyze", "--format", "json")
+    assert json.loads(out)["stats"]["entries"] == 3
+
+def test_invalid_input_is_reported(capsys, monkeypatch):
+    code, _out, err = run(capsys, "add", "Too happy", "--mood", "9")
+    assert code == 1 and "Mood must be between 1 and 5" in err
+    code, _out, err = reflections.main(["--journal", "../escape", "list"]), *capsys.readouterr()
+    assert code == 1 and "Journal names" in err
+
+def test_raise_errors(monkeypatch):
+    def broken_connect(*args, **kwargs):
+        raise sqlite3.DatabaseError("file is not a database")
+    monkeypatch.setattr("database.open_encrypted_db", broken_connect)
+    reported = []
+    db = ReflectionDB(journal="broken", on_error=reported.append)
+    assert reported and "file is not a database" in reported[0]
+    assert db.get_entries() == []
+    with pytest.raises(DatabaseError):
+        ReflectionDB(journal="broken", raise_errors=True)
+
+def test_settings_file_and_env_override(tmp_path, monkeypatch):
+    secrets = tmp_path / "secrets.toml"
+    secrets.write_text('[weather]\nzip_code = "10001"\n[llm]\nollama_model = "tiny"\n')
+    monkeypatch.setenv("REFLECTIONS_SECRETS_FILE", str(secrets))
+    config.load_settings.cache_clear()
+    try:
+        assert config.get_setting("weather", "zip_code") == "10001"
+        assert config.get_setting("weather", "api_key", "none") == "none"
+        monkeypatch.setenv("REFLECTIONS_LLM_OLLAMA_MODEL", "override")
+        assert config.get_setting("llm", "ollama_model") == "override"
+    finally:
+        config.load_settings.cache_clear()
@@ -0,0 +1,84 @@
+import sys, os
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from database import ReflectionDB
+from backup import backup_database, compact_database
+from initialize_db import cipher_settings_path, open_encrypted_db, read_cipher_settings
+from rekey import rekey_database
+from connection_pool import get_pool
+from write_queue import close_all_writers
+
+@pytest.fixture
+def db(set_db_path):
+    db = ReflectionDB(password="old secret", raise_errors=True)
+    db.add_entries([{"content": f"Entry {i}", "mood": 3, "mood_factors": "Work"} for i in range(50)])
+    yield db
+    close_all_writers()
+    get_pool().close_all()
+    for path in (cipher_settings_path(set_db_path), set_db_path + "-wal", set_db_path + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+def can_open(path, password):
+    conn = open_encrypted_db(path, password)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    except Exception:
+        return None
+    finally:
+        conn.close()
+
+def test_rekey_changes_password_and_cipher_settings(db):
+    steps = []
+    report = rekey_database(db, "new secret", page_size=8192, kdf_iter=64000, rows_per_chunk=20,
+                            progress=lambda copied, total: steps.append(copied))
+    assert report["rows"] >= 50 and report["attempts"] == 1
+    assert len(steps) > 2 and steps[-1] == report["rows"]
+    assert read_cipher_settings(db.db_path) == {"cipher_page_size": 8192, "kdf_iter": 64000}
+    assert can_open(db.db_path, "old secret") is None
+    assert can_open(db.db_path, "new secret") == 50
+    with db.connection() as conn:
+        assert int(conn.execute("PRAGMA page_size").fetchone()[0]) == 8192
+    # The same object keeps working with the new key, and so do new sessions
+    assert db.add_entry(content="After rekey", mood=4, mood_factors=None)
+    assert len(ReflectionDB(password="new secret").get_entries(limit=-1)) == 51
+    assert not os.path.exists(db.db_path + ".rekey")
+
+def test_writes_during_the_copy_are_not_lost(db):
+    written = []
+    def write_once(copied, total):
+        if copied == total and not written:
+            written.append(db.add_entry(content="Late entry", mood=5, mood_factors=None))
+    report = rekey_database(db, page_size=16384, rows_per_chunk=10, progress=write_once)
+    assert report["attempts"] == 2
+    assert can_open(db.db_path, "old secret") == 51
+
+def test_migrated_journal_backs_up_and_compacts(db, tmp_path):
+    rekey_database(db, page_size=16384)
+    snapshot = backup_database(db, str(tmp_path), step_sleep=0)["path"]
+    assert read_cipher_settings(snapshot) == {"cipher_page_size": 16384}
+    assert can_open(snapshot, "old secret") == 50
+    db.delete_entries([e["id"] for e in db.get_entries(limit=-1)][:40])
+    report = compact_database(db, force=True)
+    assert report["compacted"] and report["reclaimed_bytes"] > 0
+    assert can_open(db.db_path, "old secret") == 10
+    # Changing back to the defaults removes the sidecar file
+    rekey_database(db, page_size=4096)
+    assert not os.path.exists(cipher_settings_path(db.db_path))
+    assert can_open(db.db_path, "old secret") == 10
+
+def test_invalid_page_size_is_rejected(db):
+    with pytest.raises(ValueError):
+        rekey_database(db, page_size=5000)
+
+def test_password_change_keeps_a_single_scheduler(db, monkeypatch):
+    import backup
+    monkeypatch.setattr(backup, "_schedulers", {})
+    monkeypatch.setattr(backup.BackupScheduler, "start", lambda self: None)
+    other_session = ReflectionDB(password="old secret")
+    scheduler = backup.ensure_scheduler(other_session)
+    rekey_database(db, "new secret")
+    assert scheduler.db is db
+    assert backup.ensure_scheduler(db) is scheduler and len(backup._schedulers) == 1
+    assert scheduler.run_once()["backup"]["path"]
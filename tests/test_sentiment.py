@@ -0,0 +1,51 @@
+import sys, os
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+pytest.importorskip("textblob")
+
+from sentiment import LexiconSentiment, TextBlobSentiment, get_sentiment_backend
+
+SAMPLES = [
+    "Today was a long day at work, but I felt really productive and happy with my progress. Not bad at all!",
+    "I am so tired and sad. Nothing went right.",
+    "Feeling anxious about the exam, but hopeful.",
+    "The weather was terrible and I was not happy with it.",
+    "My family visited and it was wonderful, truly amazing.",
+    "Slept badly. Work was stressful, never ending meetings.",
+    "really not good",
+    "very very happy. not bad",
+    "Great!!! :D",
+    "It's (!) fine... I guess :(",
+    "extremely beautiful sunset, absolutely perfect",
+    "",
+]
+
+def test_lexicon_agrees_with_textblob():
+    """The batch scorer should reproduce TextBlob's polarity."""
+    expected = TextBlobSentiment().score_many(SAMPLES)
+    actual = LexiconSentiment().score_many(SAMPLES)
+    assert actual == pytest.approx(expected, abs=1e-9)
+
+def test_batch_matches_single_scores():
+    backend = LexiconSentiment()
+    batch = backend.score_many(SAMPLES)
+    assert batch == [backend.score(text) for text in SAMPLES]
+
+def test_get_sentiment_backend(monkeypatch):
+    monkeypatch.setenv("REFLECTIONS_SENTIMENT_BACKEND", "textblob")
+    assert isinstance(get_sentiment_backend(), TextBlobSentiment)
+    assert isinstance(get_sentiment_backend("lexicon"), LexiconSentiment)
+    with pytest.raises(ValueError):
+        get_sentiment_backend("unknown")
+
+def test_lexicon_cache_round_trip(tmp_path, monkeypatch):
+    from sentiment import _compiled_lexicon
+    monkeypatch.setenv("REFLECTIONS_CACHE_DIR", str(tmp_path))
+    _compiled_lexicon.cache_clear()
+    compiled = _compiled_lexicon()
+    assert len(list(tmp_path.glob("lexicon-textblob-*.json"))) == 1
+    _compiled_lexicon.cache_clear()
+    assert _compiled_lexicon() == compiled
+    assert LexiconSentiment().score_many(SAMPLES) == pytest.approx(TextBlobSentiment().score_many(SAMPLES), abs=1e-9)
+    _compiled_lexicon.cache_clear()
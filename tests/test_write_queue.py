@@ -0,0 +1,58 @@
+import sys, os
+import sqlite3
+import threading
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from write_queue import WriteQueue
+
+@pytest.fixture
+def writer(set_db_path):
+    conn = sqlite3.connect(set_db_path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, value TEXT UNIQUE)")
+    conn.commit()
+    conn.close()
+    queue = WriteQueue(lambda: sqlite3.connect(set_db_path, check_same_thread=False))
+    yield queue
+    queue.close()
+
+def _insert(value):
+    return lambda conn: conn.execute("INSERT INTO items (value) VALUES (?)", (value,)).lastrowid
+
+def test_futures_resolve_after_commit(writer, set_db_path):
+    entry_id = writer.submit(_insert("a")).result(timeout=5)
+    other = sqlite3.connect(set_db_path)
+    assert other.execute("SELECT id FROM items WHERE value = 'a'").fetchone() == (entry_id,)
+    other.close()
+
+def test_pending_writes_share_a_commit(writer):
+    # Hold the writer on a slow operation so the rest pile up behind it
+    gate = threading.Event()
+    first = writer.submit(lambda conn: gate.wait(5))
+    futures = [writer.submit(_insert(str(i))) for i in range(20)]
+    gate.set()
+    first.result(timeout=5)
+    assert len({f.result(timeout=5) for f in futures}) == 20
+    assert writer.operations == 21
+    assert writer.batches <= 2
+
+def test_failed_operation_is_isolated(writer, set_db_path):
+    gate = threading.Event()
+    writer.submit(lambda conn: gate.wait(5))
+    good = writer.submit(_insert("x"))
+    duplicate = writer.submit(_insert("x"))
+    also_good = writer.submit(_insert("y"))
+    gate.set()
+    assert good.result(timeout=5)
+    assert also_good.result(timeout=5)
+    with pytest.raises(sqlite3.IntegrityError):
+        duplicate.result(timeout=5)
+    other = sqlite3.connect(set_db_path)
+    assert other.execute("SELECT COUNT(*) FROM items").fetchone() == (2,)
+    other.close()
+
+def test_close_drains_queue_and_restarts_on_demand(writer):
+    futures = [writer.submit(_insert(f"c{i}")) for i in range(5)]
+    writer.close()
+    assert all(f.done() for f in futures)
+    assert writer.submit(_insert("after")).result(timeout=5)
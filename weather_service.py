@@ -1,7 +1,7 @@
 import requests
 import logging
 from datetime import datetime
-import streamlit as st
+from config import get_setting
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +14,7 @@ class WeatherService:
         try:
             # use provided location or fallback to secrets
             if not location:
-                location = st.secrets.get("weather", {}).get("zip_code", "20871")
+                location = get_setting("weather", "zip_code", "20871")
             
             params = {
                 "key": self.api_key,
@@ -30,6 +30,7 @@ class WeatherService:
                 "temperature": round(data["current"]["temp_f"]),
                 "description": data["current"]["condition"]["text"].capitalize(),
                 "humidity": data["current"]["humidity"],
+                "location": location,
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -43,5 +44,6 @@ class WeatherService:
                 "temperature": 72,
                 "description": "Clear (Simulated)",
                 "humidity": 45,
+                "location": location,
                 "timestamp": datetime.now().isoformat()
             } 
\ No newline at end of file
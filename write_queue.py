@@ -0,0 +1,225 @@
+import os
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH = int(os.getenv("REFLECTIONS_WRITE_BATCH", "64"))
+DEFAULT_IDLE_TIMEOUT = float(os.getenv("REFLECTIONS_WRITER_IDLE_SECONDS", "30"))
+
+
+# Queue sentinel asking the writer thread to exit
+_STOP = object()
+
+
+class WriteQueue:
+    """Single writer thread for one database with group commit.
+
+    Write operations are callables taking a connection; :meth:`submit` queues
+    one and returns a :class:`~concurrent.futures.Future` for its result. The
+    writer thread drains up to ``max_batch`` pending operations and runs them
+    in one transaction, each inside its own savepoint so a failing operation is
+    rolled back (and its future gets the exception) without affecting the rest
+    of the batch. Futures resolve only after the batch has committed.
+
+    Operations must not call ``commit()`` themselves. The writer owns its
+    connection, opened with ``connect()`` on the writer thread, and exits
+    (closing it) after ``idle_timeout`` seconds without work; the next submit
+    starts it again.
+    """
+
+    def __init__(self, connect: Callable[[], Any], max_batch: int = DEFAULT_MAX_BATCH,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT, name: str = "reflections-writer"):
+        self.connect = connect
+        self.max_batch = max_batch
+        self.idle_timeout = idle_timeout
+        self.name = name
+        self.batches = 0
+        self.operations = 0
+        self._queue: "queue.Queue[tuple[Callable[[Any], Any], Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        # Held by the writer around every batch; see paused()
+        self._gate = threading.Lock()
+        self._conn = None
+
+    def submit(self, fn: Callable[[Any], Any]) -> Future:
+        """Queue ``fn(conn)`` for the writer thread and return its future."""
+        future: Future = Future()
+        with self._lock:
+            self._queue.put((fn, future))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        return future
+
+    def close(self, timeout: float | None = None):
+        """Commit everything already queued, then stop the writer thread."""
+        with self._lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return
+            self._queue.put(_STOP)
+        thread.join(timeout)
+
+    @contextmanager
+    def paused(self):
+        """Hold off the writer and close its connection for the duration.
+
+        Writes submitted meanwhile stay queued (their futures simply wait). The
+        writer reopens its connection afterwards, so the database file may be
+        replaced while paused.
+        """
+        with self._gate:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            yield
+
+    def _open(self):
+        conn = self.connect()
+        conn.isolation_level = None  # transactions are managed explicitly below
+        return conn
+
+    def _run(self):
+        try:
+            with self._gate:
+                self._conn = self._open()
+        except Exception as e:
+            logger.error(f"Writer could not open the database: {str(e)}")
+            self._fail_pending(e)
+            return
+        try:
+            while True:
+                try:
+                    first = self._queue.get(timeout=self.idle_timeout)
+                except queue.Empty:
+                    with self._lock:
+                        if self._queue.empty():
+                            self._thread = None
+                            return
+                    continue
+                stop = first is _STOP
+                batch = [] if stop else [first]
+                while not stop and len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                    else:
+                        batch.append(item)
+                if batch:
+                    with self._gate:
+                        if self._reopen(batch):
+                            self._commit_batch(self._conn, batch)
+                if stop:
+                    with self._lock:
+                        self._thread = None
+                        restart = not self._queue.empty()
+                    if restart:
+                        # Writes submitted while stopping get a fresh writer
+                        self.submit(lambda conn: None)
+                    return
+        finally:
+            with self._gate:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+
+    def _reopen(self, batch):
+        """Reopen the connection after a pause; fail ``batch`` if that's impossible."""
+        if self._conn is not None:
+            return True
+        try:
+            self._conn = self._open()
+            return True
+        except Exception as e:
+            logger.error(f"Writer could not reopen the database: {str(e)}")
+            for _fn, future in batch:
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(e)
+            return False
+
+    def _commit_batch(self, conn, batch):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    outcomes.append(None)
+                    continue
+                conn.execute("SAVEPOINT op")
+                try:
+                    result = fn(conn)
+                    conn.execute("RELEASE op")
+                    outcomes.append((True, result))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op")
+                    conn.execute("RELEASE op")
+                    outcomes.append((False, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            # The whole transaction failed (e.g. disk full) – every operation fails with it
+            logger.error(f"Group commit of {len(batch)} writes failed: {str(e)}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            outcomes = [None if future.done() else (False, e) for _fn, future in batch]
+        self.batches += 1
+        self.operations += len(batch)
+        for (_fn, future), outcome in zip(batch, outcomes):
+            if outcome is None or future.done():
+                continue
+            ok, value = outcome
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _fail_pending(self, error):
+        with self._lock:
+            self._thread = None
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    return
+                if item is _STOP:
+                    continue
+                _fn, future = item
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(error)
+
+
+_writers: dict = {}
+_writers_lock = threading.Lock()
+
+
+def get_write_queue(key: Hashable, connect: Callable[[], Any]) -> WriteQueue:
+    """Return the process-wide writer for ``key`` (one per journal)."""
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = WriteQueue(connect)
+        return writer
+
+
+def close_all_writers(timeout: float | None = None):
+    """Drain and stop every writer thread (used before swapping database files)."""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.close(timeout)
+
+
+def discard_writer(key: Hashable, timeout: float | None = None):
+    """Drain, stop and forget the writer for ``key`` (e.g. after the journal was re-keyed)."""
+    with _writers_lock:
+        writer = _writers.pop(key, None)
+    if writer is not None:
+        writer.close(timeout)